@@ -0,0 +1,106 @@
+// Redesenho dos cards interativos no navegador (ver filtros.py): filtra e soma
+// as linhas pré-agregadas da dcc.Store e devolve a figura do plotly, sem ida ao servidor
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    filtros: {
+        // Opções dos dropdowns, faixa e marcas do slider e seleção inicial de um card,
+        // a partir dos domínios da versão dos dados que acabou de chegar na Store
+        controles: function (dados, idGrafico) {
+            if (!dados) {
+                var nada = window.dash_clientside.no_update;
+                return [nada, nada, nada, nada, nada, nada, nada, nada];
+            }
+            var opcoes = dados.opcoes[idGrafico.replace(/-grafico$/, '')];
+            var marcas = {};
+            for (var ano = dados.anos[0]; ano <= dados.anos[1]; ano++) {
+                marcas[ano] = String(ano);
+            }
+            return [dados.paises, opcoes.paises, dados.categorias, opcoes.categorias,
+                    dados.anos[0], dados.anos[1], marcas, opcoes.anos || dados.anos];
+        },
+
+        figura: function (paises, categorias, anos, dados, idGrafico) {
+            if (!dados) {
+                return window.dash_clientside.no_update;
+            }
+            var id = idGrafico.replace(/-grafico$/, '');
+            var cartao = dados.cartoes[id];
+            var opcoes = dados.opcoes[id];
+
+            // Seleção vazia = sem filtro; nomes viram posições no dicionário da Store
+            function selecao(nomes, dominio) {
+                if (!nomes || nomes.length === 0) {
+                    return null;
+                }
+                var marcados = new Uint8Array(dominio.length);
+                var posicao = {};
+                dominio.forEach(function (nome, i) { posicao[nome] = i; });
+                nomes.forEach(function (nome) {
+                    if (nome in posicao) {
+                        marcados[posicao[nome]] = 1;
+                    }
+                });
+                return marcados;
+            }
+            var filtroPais = selecao(paises, dados.paises);
+            var filtroCategoria = selecao(categorias, dados.categorias);
+            var inicio = anos ? anos[0] : dados.anos[0];
+            var fim = anos ? anos[1] : dados.anos[1];
+
+            var totais = new Float64Array(cartao.rotulos.length);
+            var presentes = new Uint8Array(cartao.rotulos.length);
+            var p = cartao.p, c = cartao.c, a = cartao.a, r = cartao.r, v = cartao.v;
+            for (var i = 0; i < v.length; i++) {
+                if (a[i] < inicio || a[i] > fim) continue;
+                if (filtroPais && !filtroPais[p[i]]) continue;
+                if (filtroCategoria && !filtroCategoria[c[i]]) continue;
+                totais[r[i]] += v[i];
+                presentes[r[i]] = 1;
+            }
+
+            var grupos = [];
+            for (var j = 0; j < totais.length; j++) {
+                if (presentes[j]) {
+                    grupos.push(j);
+                }
+            }
+            if (opcoes.ordem === 'desc') {
+                grupos.sort(function (x, y) { return totais[y] - totais[x]; });
+            } else if (opcoes.ordem === 'asc') {
+                grupos.sort(function (x, y) { return totais[x] - totais[y]; });
+            }
+            if (opcoes.n) {
+                grupos = opcoes.ordem === 'asc' ? grupos.slice(-opcoes.n) : grupos.slice(0, opcoes.n);
+            }
+            var rotulos = grupos.map(function (g) { return cartao.rotulos[g]; });
+            var valores = grupos.map(function (g) { return Math.round(totais[g] * 100) / 100; });
+
+            var layout = {
+                title: {text: opcoes.titulo},
+                margin: {l: 60, r: 20, t: 50, b: 40},
+                xaxis: {automargin: true},
+                yaxis: {automargin: true},
+            };
+            if (grupos.length === 0) {
+                layout.xaxis.visible = false;
+                layout.yaxis.visible = false;
+                layout.annotations = [{text: 'Sem dados', showarrow: false, font: {size: 16},
+                                       xref: 'paper', yref: 'paper', x: 0.5, y: 0.5}];
+                return {data: [], layout: layout};
+            }
+            var traco;
+            if (opcoes.tipo === 'line') {
+                traco = {type: 'scatter', mode: 'lines+markers', x: rotulos, y: valores};
+                layout.xaxis.type = 'category';
+                traco.line = {color: opcoes.cor};
+                traco.marker = {color: opcoes.cor};
+            } else if (opcoes.horizontal) {
+                traco = {type: 'bar', orientation: 'h', x: valores, y: rotulos, marker: {color: opcoes.cor}};
+                layout.yaxis.type = 'category';
+            } else {
+                traco = {type: 'bar', x: rotulos, y: valores, marker: {color: opcoes.cor}};
+                layout.xaxis.type = 'category';
+            }
+            return {data: [traco], layout: layout};
+        }
+    }
+});
@@ -0,0 +1,259 @@
+import glob
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+from metricas import metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos, cada processo atualiza sozinho
+    fcntl = None
+
+log = logging.getLogger("bi.atualizacao")
+
+# Intervalo (s) da atualização agendada, mesmo sem mudança detectada nos arquivos
+INTERVALO_ATUALIZACAO = float(os.environ.get("INTERVALO_ATUALIZACAO", 300))
+
+# Intervalo (s) entre as verificações de mudança nos arquivos (stat do CSV e da pasta de deltas)
+INTERVALO_VERIFICACAO = float(os.environ.get("INTERVALO_VERIFICACAO", 1.0))
+
+# Pasta padrão dos instantâneos compartilhados entre processos (no cache, fora do git);
+# cada dashboard usa uma subpasta própria
+PASTA_INSTANTANEOS = os.environ.get("PASTA_INSTANTANEOS", os.path.join("csv", ".cache", "instantaneos"))
+
+# Instantâneos antigos mantidos na pasta além do atual (um processo pode estar lendo o anterior)
+INSTANTANEOS_MANTIDOS = 1
+
+
+# Instantâneo imutável do que os pedidos leem: a versão dos dados e uma cópia do
+# cubo. Os gráficos pré-renderizados desta versão ficam no cache de gráficos,
+# cuja chave inclui a versão. Nada aqui é alterado depois de publicado
+class Instantaneo:
+    def __init__(self, versao, cubo):
+        self.versao = versao
+        self.cubo = cubo
+        self.criado = time.time()
+
+
+# Atualização em segundo plano com troca atômica de instantâneos.
+# Uma thread própria roda a ingestão (ingestao.IngestorIncremental) sobre o cubo de
+# trabalho do ingestor, que nenhum pedido lê. Quando a versão muda, monta um
+# instantâneo novo com uma cópia do cubo, chama `construir(instantaneo)` (ex.: para
+# pré-renderizar os gráficos da versão nova) e só então o publica, numa única
+# atribuição. Cada pedido fixa o instantâneo atual no início (registrar) e o usa até
+# o fim, mesmo que outro seja publicado no meio; o antigo é liberado quando o
+# último pedido que o usa termina. A memória extra é a de um cubo (agregados) e a
+# dos gráficos da versão nova; a tabela fato só é duplicada durante uma recarga completa.
+# A atualização roda quando os arquivos mudam (CSV ou pasta de deltas, verificados
+# a cada `verificacao` segundos), a cada `intervalo` segundos ou em notificar().
+# Com `pasta`, os processos que servem o mesmo dashboard (workers do gunicorn)
+# compartilham as versões: só o que segura a trava `lider.lock` da pasta roda a
+# ingestão, e grava cada instantâneo novo em `pasta` (cubo em pickle, nomeado pela
+# versão) e aponta para ele em `atual.json`. Os demais leem o ponteiro a cada
+# verificação e carregam o instantâneo quando ele muda, então todos servem a mesma
+# versão (e os mesmos ETags) em vez de cada um ingerir por conta própria. Se o
+# líder morre, a trava é liberada e outro processo assume. O ponteiro leva a versão
+# de partida (a do ingestor ao criar o atualizador), para ignorar o de uma execução anterior
+class AtualizadorDados:
+    def __init__(self, ingestor, construir=None, intervalo=INTERVALO_ATUALIZACAO,
+                 verificacao=INTERVALO_VERIFICACAO, pasta=None):
+        self.ingestor = ingestor
+        self.construir = construir
+        self.intervalo = intervalo
+        self.verificacao = verificacao
+        self._fixado = threading.local()
+        self._sinal = threading.Event()
+        self._parar = threading.Event()
+        self._trava = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._assinatura = self._assinatura_arquivos()
+        self._ultima = time.monotonic()
+        self.pasta = pasta
+        self._trava_lider = None
+        self._pid_lider = None
+        self.base = ingestor.versao
+        self.atual = Instantaneo(ingestor.versao, ingestor.cubo.copiar())
+
+    # Instantâneo fixado pelo pedido (ou pela construção) em andamento nesta thread,
+    # ou o atual
+    def instantaneo(self):
+        return getattr(self._fixado, "instantaneo", None) or self.atual
+
+    @contextmanager
+    def fixar(self, instantaneo=None):
+        anterior = getattr(self._fixado, "instantaneo", None)
+        self._fixado.instantaneo = instantaneo or self.atual
+        try:
+            yield self._fixado.instantaneo
+        finally:
+            self._fixado.instantaneo = anterior
+
+    # Fixa o instantâneo atual durante cada pedido do servidor Flask do app e inicia
+    # a thread de atualização no primeiro pedido (em cada worker: threads não
+    # sobrevivem ao fork do gunicorn com preload). Sem `pasta`, cada worker ingere
+    # sozinho e as versões dos workers podem divergir por algum tempo
+    def registrar(self, app):
+        servidor = app.server
+
+        @servidor.before_request
+        def _fixar_instantaneo():
+            self.iniciar()
+            self._fixado.instantaneo = self.atual
+
+        @servidor.teardown_request
+        def _soltar_instantaneo(_erro):
+            self._fixado.instantaneo = None
+
+        return self
+
+    def iniciar(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._trava:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._laco, name="atualizacao-dados", daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        self._sinal.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # Pede uma atualização já (ex.: um processo externo avisou que há dados novos)
+    def notificar(self):
+        self._sinal.set()
+
+    def _assinatura_arquivos(self):
+        arquivos = [self.ingestor.caminho]
+        if self.ingestor.pasta_deltas and os.path.isdir(self.ingestor.pasta_deltas):
+            arquivos += sorted(glob.glob(os.path.join(self.ingestor.pasta_deltas, "*.csv")))
+        assinatura = []
+        for arquivo in arquivos:
+            try:
+                st = os.stat(arquivo)
+            except OSError:
+                continue
+            assinatura.append((arquivo, st.st_mtime_ns, st.st_size))
+        return tuple(assinatura)
+
+    def _laco(self):
+        while not self._parar.is_set():
+            notificado = self._sinal.wait(self.verificacao)
+            self._sinal.clear()
+            if self._parar.is_set():
+                break
+            try:
+                self.verificar(notificado)
+            except Exception:
+                # Falha na leitura (ex.: arquivo sendo gravado): o instantâneo atual
+                # continua publicado e a próxima verificação tenta de novo
+                log.exception("Falha na atualização dos dados (versão publicada: %s)", self.atual.versao)
+                metricas.contar("atualizacoes_total", 1, "Atualizações dos dados", resultado="erro")
+
+    # Uma verificação do laço: o líder (ou o processo sozinho, sem `pasta`) ingere se
+    # os arquivos mudaram, se foi notificado ou se passou o intervalo; os demais
+    # seguem o ponteiro do líder. Devolve o instantâneo publicado (ou None)
+    def verificar(self, notificado=False):
+        if not self._lider():
+            return self._seguir()
+        assinatura = self._assinatura_arquivos()
+        if notificado or assinatura != self._assinatura or time.monotonic() - self._ultima >= self.intervalo:
+            self._assinatura = assinatura
+            return self.atualizar()
+        return None
+
+    # Tenta ficar com a trava da pasta (sem esperar); quem a tem a mantém até sair
+    def _lider(self):
+        if self.pasta is None or fcntl is None:
+            return True
+        if self._trava_lider is not None and self._pid_lider == os.getpid():
+            return True
+        os.makedirs(self.pasta, exist_ok=True)
+        arquivo = open(os.path.join(self.pasta, "lider.lock"), "a")
+        try:
+            fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            arquivo.close()
+            return False
+        self._trava_lider, self._pid_lider = arquivo, os.getpid()
+        # Quem assume pode estar atrás (seguia o líder anterior): ingere já na primeira verificação
+        self._assinatura = None
+        log.info("Processo %d assumiu a atualização dos dados em %s", os.getpid(), self.pasta)
+        return True
+
+    def _ponteiro(self):
+        return os.path.join(self.pasta, "atual.json")
+
+    # Grava o instantâneo e troca o ponteiro, ambos por arquivo temporário + os.replace
+    def _gravar(self, instantaneo):
+        arquivo = f"{instantaneo.versao}.pkl"
+        tmp = os.path.join(self.pasta, f"{arquivo}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump((instantaneo.versao, instantaneo.cubo), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, os.path.join(self.pasta, arquivo))
+        tmp = f"{self._ponteiro()}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"base": self.base, "versao": instantaneo.versao, "arquivo": arquivo}, f)
+        os.replace(tmp, self._ponteiro())
+        antigos = sorted((os.path.getmtime(c), c) for c in glob.glob(os.path.join(self.pasta, "*.pkl"))
+                         if os.path.basename(c) != arquivo)
+        for _, caminho in antigos[:max(0, len(antigos) - INSTANTANEOS_MANTIDOS)]:
+            os.remove(caminho)
+
+    # Carrega o instantâneo apontado pelo líder, se for de outra versão
+    def _seguir(self):
+        try:
+            with open(self._ponteiro(), encoding="utf-8") as f:
+                ponteiro = json.load(f)
+        except FileNotFoundError:
+            return None
+        if ponteiro["base"] != self.base or ponteiro["versao"] == self.atual.versao:
+            return None
+        try:
+            with open(os.path.join(self.pasta, ponteiro["arquivo"]), "rb") as f:
+                versao, cubo = pickle.load(f)
+        except FileNotFoundError:
+            # Já substituído por um mais novo: a próxima verificação lê o ponteiro de novo
+            return None
+        with metricas.etapa("atualizacao_seguida") as medida:
+            novo = self._publicar(Instantaneo(versao, cubo))
+            medida["resultado"] = novo.cubo.tamanho()
+        metricas.contar("atualizacoes_total", 1, "Atualizações dos dados", resultado="seguida")
+        return novo
+
+    def _publicar(self, novo):
+        if self.construir is not None:
+            with self.fixar(novo):
+                self.construir(novo)
+        self.atual = novo
+        return novo
+
+    # Ingere o que houver de novo e, se a versão mudou, constrói e publica um
+    # instantâneo novo (e, com `pasta`, o grava para os outros processos).
+    # Devolve o instantâneo publicado (ou None se nada mudou)
+    def atualizar(self):
+        self._ultima = time.monotonic()
+        with metricas.etapa("atualizacao") as medida:
+            resumo = self.ingestor.atualizar(forcar=True)
+            medida["linhas"] = resumo["linhas"]
+            if self.ingestor.versao == self.atual.versao:
+                metricas.contar("atualizacoes_total", 1, "Atualizações dos dados", resultado="sem_mudanca")
+                return None
+            novo = Instantaneo(self.ingestor.versao, self.ingestor.cubo.copiar())
+            if self.pasta is not None:
+                self._gravar(novo)
+            self._publicar(novo)
+            medida["resultado"] = novo.cubo.tamanho()
+        metricas.contar("atualizacoes_total", 1, "Atualizações dos dados", resultado="publicada")
+        return novo
@@ -0,0 +1,367 @@
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from blocos import MEMORIA_MAX_PADRAO, _Acumulador, ler_em_blocos
+from consultas import QUESTOES
+from cubo import AGRUPAMENTOS_PADRAO, COLUNA_LINHAS, MEDIDAS
+from dados import (CAMINHO_VENDAS, CATEGORICAS_VENDAS, MEDIDAS_VENDAS, PASTA_CACHE, arquivos_fonte, carregar_dimensao,
+                   impressao_digital)
+from dimensoes import DIMENSOES
+from filtros import DIMENSOES_FILTRO
+from geografia import regioes
+
+# Banco SQLite padrão, no cache ao lado dos CSVs (fora do git)
+CAMINHO_BANCO = os.environ.get(
+    "BANCO_VENDAS", os.path.join(os.path.dirname(CAMINHO_VENDAS), PASTA_CACHE, "vendas.sqlite"))
+
+# Versão do formato do banco; mudar invalida bancos antigos
+VERSAO_BANCO = 2
+
+# Linhas da tabela de vendas lidas por vez nas somas que não saem de um resumo
+LINHAS_BLOCO_BANCO = 100_000
+
+# Colunas de filtro e chaves estrangeiras indexadas na tabela de vendas
+COLUNAS_INDEXADAS = ["ClientePaís", "ClientePaísID", "CategoriaNome", "Ano", "Região", "VendedorID", "FornecedorID",
+                     "TransportadoraID"]
+
+# Tabelas de resumo: os agrupamentos do cubo (dez questões e hierarquia
+# geográfica) e os dos cards interativos dos dashboards (país x categoria x ano
+# mais as dimensões do eixo de cada card)
+AGRUPAMENTOS_BANCO = AGRUPAMENTOS_PADRAO + [DIMENSOES_FILTRO] + [
+    DIMENSOES_FILTRO + dims for dims in [("ClienteNome",), ("ClienteNome", "ClienteCidade"), ("TransportadoraID",),
+                                         ("VendedorID",), ("FornecedorID",)]
+]
+
+
+def _q(nome):
+    return '"' + nome.replace('"', '""') + '"'
+
+
+def _tabela_dimensao(chave):
+    caminho, _ = DIMENSOES[chave]
+    return os.path.splitext(os.path.basename(caminho))[0].lower()
+
+
+def _tipo_sql(dtype):
+    if pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _valor_sql(valor):
+    return valor.item() if hasattr(valor, "item") else valor
+
+
+def _impressao(fonte):
+    return impressao_digital(fonte, *(caminho for caminho, _ in DIMENSOES.values()))
+
+
+# Ano e Região materializados em cada bloco de vendas
+def _derivar(bloco):
+    bloco["Ano"] = bloco["Data"].dt.year
+    bloco["Região"] = regioes(bloco["ClientePaísID"])
+    return bloco
+
+
+# Tipos SQL das colunas de vendas: os do primeiro bloco com linhas ou, numa fonte
+# sem linhas, os do cabeçalho (medidas REAL, Ano INTEGER, o resto TEXT)
+def _tipos_vendas(bloco, fonte):
+    if bloco is not None:
+        return {c: _tipo_sql(bloco[c].dtype) for c in bloco.columns}
+    colunas = pd.read_csv(arquivos_fonte(fonte)[0], nrows=0).columns
+    return dict({c: "REAL" if c in MEDIDAS_VENDAS else "TEXT" for c in colunas}, Ano="INTEGER", Região="TEXT")
+
+
+# Constrói o banco a partir do CSV de vendas (ou pasta/glob de CSVs) e dos CSVs das
+# dimensões. As vendas são lidas em blocos de memória limitada (blocos.ler_em_blocos)
+# e gravadas com colunas tipadas, mais "Ano" e "Região" materializadas; depois vêm os
+# índices das colunas de filtro e de chave estrangeira e as tabelas de resumo
+# (somas das medidas e número de linhas por agrupamento). As somas dos resumos são
+# acumuladas bloco a bloco (blocos._Acumulador), iguais bit a bit às do groupby do
+# pandas; linhas com chave nula ficam fora do resumo, que então é marcado como
+# incompleto e não é usado nas consultas. O banco é montado num
+# arquivo temporário e trocado atomicamente: quem já o tem aberto continua lendo o antigo
+def construir_banco(caminho=CAMINHO_BANCO, fonte=CAMINHO_VENDAS, agrupamentos=AGRUPAMENTOS_BANCO,
+                    memoria_max=MEMORIA_MAX_PADRAO):
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    impressao = _impressao(fonte)
+    conexao = sqlite3.connect(tmp)
+    try:
+        conexao.execute("PRAGMA journal_mode = OFF")
+        conexao.execute("PRAGMA synchronous = OFF")
+        acumuladores = [_Acumulador(dims, MEDIDAS) for dims in agrupamentos]
+        # Blocos vazios (ex.: só linhas em branco) não definem tipos nem são gravados
+        blocos = (_derivar(bloco) for arquivo in arquivos_fonte(fonte)
+                  for bloco in ler_em_blocos(arquivo, memoria_max) if len(bloco))
+        primeiro = next(blocos, None)
+        tipos = _tipos_vendas(primeiro, fonte)
+        conexao.execute(f"CREATE TABLE vendas ({', '.join(f'{_q(c)} {t}' for c, t in tipos.items())})")
+        linhas = 0
+        for bloco in itertools.chain([primeiro] if primeiro is not None else [], blocos):
+            bloco.to_sql("vendas", conexao, if_exists="append", index=False)
+            for acumulador in acumuladores:
+                acumulador.adicionar(bloco)
+            linhas += len(bloco)
+
+        for i, coluna in enumerate(COLUNAS_INDEXADAS):
+            conexao.execute(f"CREATE INDEX vendas_{i} ON vendas ({_q(coluna)})")
+
+        for chave in DIMENSOES:
+            caminho_dimensao, _ = DIMENSOES[chave]
+            tabela = _tabela_dimensao(chave)
+            carregar_dimensao(caminho_dimensao).to_sql(tabela, conexao, index=False)
+            conexao.execute(f"CREATE INDEX {tabela}_chave ON {tabela} ({_q(chave)})")
+
+        conexao.execute("CREATE TABLE resumos (tabela TEXT, dimensoes TEXT, linhas INTEGER, completo INTEGER)")
+        for i, (dims, acumulador) in enumerate(zip(agrupamentos, acumuladores)):
+            resumo = acumulador.resultado(COLUNA_LINHAS).reset_index().infer_objects()
+            colunas = ([f"{_q(d)} {tipos[d]}" for d in dims] + [f"{_q(m)} REAL" for m in MEDIDAS]
+                       + [f"{_q(COLUNA_LINHAS)} INTEGER"])
+            conexao.execute(f"CREATE TABLE resumo_{i} ({', '.join(colunas)})")
+            if len(resumo):
+                resumo.to_sql(f"resumo_{i}", conexao, if_exists="append", index=False)
+            completo = int(resumo[COLUNA_LINHAS].sum()) == linhas
+            conexao.execute("INSERT INTO resumos VALUES (?, ?, ?, ?)",
+                            (f"resumo_{i}", json.dumps(list(dims)), len(resumo), completo))
+
+        meta = {"versao": VERSAO_BANCO, "impressao_digital": impressao, "linhas": linhas,
+                "agrupamentos": json.dumps([list(d) for d in agrupamentos])}
+        conexao.execute("CREATE TABLE meta (chave TEXT PRIMARY KEY, valor TEXT)")
+        conexao.executemany("INSERT INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+        conexao.execute("ANALYZE")
+        conexao.commit()
+    finally:
+        conexao.close()
+    os.replace(tmp, caminho)
+    return caminho
+
+
+def _ler_meta(caminho):
+    try:
+        conexao = sqlite3.connect(f"{Path(os.path.abspath(caminho)).as_uri()}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        return dict(conexao.execute("SELECT chave, valor FROM meta").fetchall())
+    except sqlite3.Error:
+        return None
+    finally:
+        conexao.close()
+
+
+# Banco pronto para `fonte`: reaproveita o existente se foi construído a partir dos
+# mesmos arquivos (impressão digital) com o mesmo formato e agrupamentos; senão reconstrói
+def abrir_banco(caminho=CAMINHO_BANCO, fonte=CAMINHO_VENDAS, agrupamentos=AGRUPAMENTOS_BANCO, reconstruir=False):
+    meta = None if reconstruir or not os.path.exists(caminho) else _ler_meta(caminho)
+    if (meta is None or meta.get("versao") != str(VERSAO_BANCO)
+            or meta.get("impressao_digital") != _impressao(fonte)
+            or meta.get("agrupamentos") != json.dumps([list(d) for d in agrupamentos])):
+        construir_banco(caminho, fonte, agrupamentos)
+    return caminho
+
+
+# Backend SQLite das consultas: os mesmos resultados do caminho pandas, sem carregar
+# a tabela fato em memória. consultar/top têm a interface do cubo.Cubo (os cards e os
+# geradores de gráfico dos dashboards rodam sobre ele); executar responde uma
+# consultas.Consulta como o MotorConsultas, com os nomes das dimensões por JOIN.
+# Cada consulta lê a menor tabela de resumo que cobre as suas colunas (ou a tabela
+# de vendas, pelos índices). As somas e os tipos do índice são os do pandas, bit a
+# bit: um resumo só responde se cada grupo do resultado é uma única linha dele (a
+# soma já feita no pandas); senão as linhas de vendas são lidas em blocos, na ordem
+# do CSV, e somadas como no groupby (_somar). Uma conexão somente leitura por thread
+class BancoVendas:
+    def __init__(self, caminho=CAMINHO_BANCO, fonte=CAMINHO_VENDAS, agrupamentos=AGRUPAMENTOS_BANCO,
+                 reconstruir=False):
+        self.caminho = abrir_banco(caminho, fonte, agrupamentos, reconstruir)
+        self._local = threading.local()
+        self.meta = _ler_meta(self.caminho)
+        self.resumos = {
+            tuple(json.loads(dims)): (tabela, linhas)
+            for tabela, dims, linhas in self.conexao().execute(
+                "SELECT tabela, dimensoes, linhas FROM resumos WHERE completo")
+        }
+        self.tipos = {nome: tipo for _, nome, tipo, *_ in self.conexao().execute("PRAGMA table_info(vendas)")}
+        self._categorias = {}
+
+    def conexao(self):
+        if getattr(self._local, "conexao", None) is None:
+            uri = f"{Path(os.path.abspath(self.caminho)).as_uri()}?mode=ro"
+            self._local.conexao = sqlite3.connect(uri, uri=True)
+        return self._local.conexao
+
+    # Categorias de uma coluna categórica do cache: os valores distintos da tabela
+    # inteira, em ordem (a ordem BINARY do SQLite é a dos pontos de código, como no Python)
+    def categorias(self, coluna):
+        if coluna not in self._categorias:
+            self._categorias[coluna] = [valor for valor, in self.conexao().execute(
+                f"SELECT DISTINCT {_q(coluna)} FROM vendas WHERE {_q(coluna)} IS NOT NULL ORDER BY 1")]
+        return self._categorias[coluna]
+
+    def linhas(self):
+        return int(self.meta["linhas"])
+
+    # Menor tabela de resumo com todas as `colunas` e a medida; senão a tabela de vendas
+    def _tabela_para(self, colunas, medida):
+        if medida in MEDIDAS or medida == COLUNA_LINHAS:
+            candidatos = [dims for dims in self.resumos if set(colunas) <= set(dims)]
+            if candidatos:
+                return self.resumos[min(candidatos, key=lambda d: (self.resumos[d][1], len(d)))][0], True
+        return "vendas", False
+
+    # SQL da soma de `medida` por `por` com `filtros` (mesma semântica do cubo:
+    # lista/tupla/conjunto/range -> IN, demais -> igualdade). Grupos com chave nula
+    # ficam de fora, como no groupby do pandas. `nomes`: {chave: (tabela, coluna)} das
+    # dimensões cujos IDs saem trocados pelo nome (JOIN, que descarta IDs sem nome).
+    # Um resumo em que algum grupo junta mais de uma linha é trocado pela tabela de
+    # vendas: somar somas parciais não dá a soma do pandas (contagens podem juntar).
+    # Devolve (sql, parâmetros, rótulos, linhas): com `linhas`, o SQL traz as linhas
+    # de vendas em ordem de rowid, sem somar, para _somar
+    def _sql(self, medida, por, filtros, nomes=None):
+        nomes = nomes or {}
+        tabela, resumo = self._tabela_para(list(por) + list(filtros), medida)
+        chaves = [f"d{i}.{_q(nomes[c][1])}" if c in nomes else f"t.{_q(c)}" for i, c in enumerate(por)]
+        juncoes = [f"JOIN {nomes[c][0]} AS d{i} ON d{i}.{_q(c)} = t.{_q(c)}" for i, c in enumerate(por) if c in nomes]
+        condicoes = [f"{chave} IS NOT NULL" for chave in chaves]
+        parametros = []
+        for coluna, valor in filtros.items():
+            if isinstance(valor, (list, tuple, set, frozenset, range)):
+                valores = [_valor_sql(v) for v in valor]
+                condicoes.append(f"t.{_q(coluna)} IN ({', '.join('?' * len(valores))})" if valores else "0")
+                parametros += valores
+            else:
+                condicoes.append(f"t.{_q(coluna)} = ?")
+                parametros.append(_valor_sql(valor))
+        filtro = f"{' '.join(juncoes)} WHERE {' AND '.join(condicoes) or '1'}"
+        corpo = f"{filtro} GROUP BY {', '.join(chaves)}"
+        if resumo and medida != COLUNA_LINHAS:
+            partes, = self.conexao().execute(
+                f"SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM {tabela} AS t {corpo})", parametros).fetchone()
+            if partes is not None and partes > 1:
+                tabela, resumo = "vendas", False
+        rotulos = [nomes[c][1] if c in nomes else c for c in por]
+        colunas = ", ".join(f"{chave} AS {_q(rotulo)}" for chave, rotulo in zip(chaves, rotulos))
+        rotulos = {rotulo: None if c in nomes else c for c, rotulo in zip(por, rotulos)}
+        if not resumo and medida != COLUNA_LINHAS:
+            sql = f"SELECT {colunas}, t.{_q(medida)} AS {_q(medida)} FROM vendas AS t {filtro} ORDER BY t.rowid"
+            return sql, parametros, rotulos, True
+        soma = f"TOTAL(t.{_q(medida)})" if resumo else "COUNT(*)"
+        return f"SELECT {colunas}, {soma} AS {_q(medida)} FROM {tabela} AS t {corpo}", parametros, rotulos, False
+
+    # Série de `medida` por `por`, na ordem das chaves ou do valor ("desc"/"asc",
+    # empates na ordem das chaves) e com no máximo `limite` grupos
+    def _resultado(self, medida, por, filtros, nomes=None, ordem=None, limite=None):
+        sql, parametros, rotulos, linhas = self._sql(medida, list(por), dict(filtros or {}), nomes)
+        if linhas:
+            return _ordenar(self._somar(sql, parametros, rotulos, medida), ordem, limite)
+        chaves = ", ".join(str(i + 1) for i in range(len(rotulos)))
+        valor = len(rotulos) + 1
+        sql += " ORDER BY " + {"desc": f"{valor} DESC, {chaves}", "asc": f"{valor}, {chaves}"}.get(ordem, chaves)
+        if limite is not None:
+            sql += f" LIMIT {int(limite)}"
+        return self._ler(sql, parametros, rotulos, medida)
+
+    # Soma compensada por grupo das linhas de vendas, lidas em blocos de
+    # LINHAS_BLOCO_BANCO na ordem do rowid (a do CSV) e acumuladas como no groupby
+    # do pandas (blocos._Acumulador, igual bit a bit): TOTAL/SUM do SQLite somam
+    # sem compensação e na ordem em que o plano visita as linhas. A memória é a de
+    # um bloco mais a dos grupos, não a das linhas
+    def _somar(self, sql, parametros, rotulos, medida):
+        acumulador = _Acumulador(list(rotulos), [medida])
+        for bloco in pd.read_sql_query(sql, self.conexao(), params=parametros, chunksize=LINHAS_BLOCO_BANCO):
+            acumulador.adicionar(bloco)
+        if acumulador.indice is None:
+            tabela = pd.DataFrame({coluna: [] for coluna in [*rotulos, medida]})
+        else:
+            tabela = acumulador.resultado().reset_index()
+            tabela.columns = [*rotulos, medida]
+        return self._tipar(tabela, rotulos).set_index(list(rotulos))[medida].astype("float64")
+
+    def _ler(self, sql, parametros, rotulos, medida):
+        tabela = pd.read_sql_query(sql, self.conexao(), params=parametros)
+        return self._tipar(tabela, rotulos).set_index(list(rotulos))[medida]
+
+    # Colunas das chaves nos tipos do índice do caminho pandas: Ano int32, as colunas
+    # categóricas do cache com as categorias da tabela inteira, IDs int64 e texto
+    # (inclusive os nomes das dimensões) como object
+    def _tipar(self, tabela, rotulos):
+        for rotulo, coluna in rotulos.items():
+            if coluna == "Ano":
+                tabela[rotulo] = tabela[rotulo].astype("int32")
+            elif coluna in CATEGORICAS_VENDAS:
+                tabela[rotulo] = pd.Categorical(tabela[rotulo], categories=self.categorias(coluna))
+            elif self.tipos.get(coluna) == "INTEGER":
+                tabela[rotulo] = tabela[rotulo].astype("int64")
+            else:
+                tabela[rotulo] = tabela[rotulo].astype(object)
+        return tabela
+
+    # Soma de uma medida agrupada por `por`, com filtros (como Cubo.consultar), em ordem das chaves
+    def consultar(self, medida, por, filtros=None):
+        return self._resultado(medida, por, filtros)
+
+    # Maiores n grupos (como Cubo.top); empates na ordem das chaves
+    def top(self, medida, por, n, filtros=None):
+        return self._resultado(medida, por, filtros, ordem="desc", limite=n)
+
+    # Resposta de uma consultas.Consulta com a ordem e o limite dela; IDs de
+    # Vendedor/Fornecedor/Transportadora em `por` saem com os nomes da dimensão
+    def executar(self, consulta):
+        nomes = {c: (_tabela_dimensao(c), DIMENSOES[c][1]) for c in consulta.por if c in DIMENSOES}
+        return self._resultado(consulta.medida, consulta.por, consulta.filtros, nomes, consulta.ordem,
+                               consulta.limite)
+
+
+# A ordem do ORDER BY de BancoVendas._resultado num resultado já somado (em ordem das chaves)
+def _ordenar(serie, ordem, limite):
+    if ordem in ("desc", "asc"):
+        tabela = serie.reset_index()
+        chaves = list(tabela.columns[:-1])
+        tabela = tabela.sort_values([serie.name] + chaves, ascending=[ordem == "asc"] + [True] * len(chaves),
+                                    kind="stable")
+        serie = tabela.set_index(chaves)[serie.name]
+    return serie if limite is None else serie.iloc[:int(limite)]
+
+
+# Responde as questões pelo nome (ex.: responder_sql("q9", "q9_cidades")) no banco
+# SQLite; devolve a Series ou uma tupla de Series, na ordem pedida, como consultas.responder
+def responder_sql(*nomes, banco=None):
+    banco = banco or BancoVendas()
+    questoes = {consulta.nome: consulta for consulta in QUESTOES}
+    resultados = [banco.executar(questoes[nome]) for nome in nomes]
+    return resultados[0] if len(resultados) == 1 else tuple(resultados)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banco SQLite das vendas (tabela tipada, índices e resumos)")
+    parser.add_argument("--fonte", default=CAMINHO_VENDAS, help="CSV de vendas, ou pasta/glob de CSVs no mesmo formato")
+    parser.add_argument("--banco", default=CAMINHO_BANCO, help="arquivo do banco")
+    parser.add_argument("--reconstruir", action="store_true", help="reconstruir mesmo se o banco estiver atualizado")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    banco = BancoVendas(args.banco, args.fonte, reconstruir=args.reconstruir)
+    print(json.dumps({
+        "banco": banco.caminho,
+        "linhas": banco.linhas(),
+        "resumos": len(banco.resumos),
+        "bytes": os.path.getsize(banco.caminho),
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,460 @@
+import argparse
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from dados import (
+    CAMINHO_FORNECEDORES,
+    CAMINHO_TRANSPORTADORAS,
+    CAMINHO_VENDAS,
+    CAMINHO_VENDEDORES,
+    DATAS_VENDAS,
+    ESQUEMA_VENDAS,
+    MEDIDAS_VENDAS,
+    carregar_dimensao,
+    carregar_vendas,
+    memoria_projecao,
+    tipar,
+)
+from blocos import agregar_arquivos, top_aproximado_em_blocos, top_em_blocos
+from dimensoes import Dimensoes
+from esbocos import top_aproximado
+from consultas import MotorConsultas
+from cubo import Cubo
+from geografia import AGRUPAMENTOS_GEOGRAFIA, PAISES_EUROPEUS, detalhar, regioes
+from renderizacao import renderizar
+from indices import IndicesVendas
+from nucleos import Grupos, top_por
+from sintetico import gravar_vendas, gravar_vendas_mensais
+
+
+# Mede tempo (melhor de `repeticoes`, sem rastreamento) e, numa execução à parte,
+# o pico de memória alocada com tracemalloc, que deixaria a cronometragem mais lenta
+def medir(etapa, funcao, *args, repeticoes=1, **kwargs):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(*args, **kwargs)
+        segundos = time.perf_counter() - inicio
+        melhor = segundos if melhor is None else min(melhor, segundos)
+    tracemalloc.start()
+    funcao(*args, **kwargs)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return resultado, {"etapa": etapa, "segundos": round(melhor, 6), "pico_bytes": pico}
+
+
+# Merge das três dimensões na tabela fato inteira (como os dashboards faziam)
+def mesclar_dimensoes(vendas, vendedores, fornecedores, transportadoras):
+    df = vendas.merge(vendedores, on="VendedorID", how="left")
+    df = df.merge(fornecedores, on="FornecedorID", how="left")
+    return df.merge(transportadoras, on="TransportadoraID", how="left")
+
+
+# Caminho antigo dos dashboards: merge das três dimensões na tabela fato e groupby por nome
+def questoes_com_merge(vendas, vendedores, fornecedores, transportadoras):
+    df = mesclar_dimensoes(vendas, vendedores, fornecedores, transportadoras)
+    q4 = df.groupby("TransportadoraNome")["Frete"].sum()
+    q6 = df[df["ClientePaís"] == "USA"].groupby("VendedorNome")["Desconto"].sum()
+    q7 = df[df["CategoriaNome"] == "Womens wear"].groupby("FornecedorNome")["Margem Bruta"].sum()
+    return df, (q4, q6, q7)
+
+
+# Esquema estrela: agrupa pelos IDs e resolve os nomes só nas linhas do resultado
+def questoes_estrela(vendas, dimensoes):
+    q4 = dimensoes.resolver(vendas.groupby("TransportadoraID")["Frete"].sum())
+    q6 = dimensoes.resolver(vendas[vendas["ClientePaís"] == "USA"].groupby("VendedorID")["Desconto"].sum())
+    q7 = dimensoes.resolver(vendas[vendas["CategoriaNome"] == "Womens wear"].groupby("FornecedorID")["Margem Bruta"].sum())
+    return vendas, (q4, q6, q7)
+
+
+# Compara merge + groupby por nome com o esquema estrela (tempo, pico e tamanho da tabela)
+def comparar_dimensoes(vendas, repeticoes=3):
+    vendedores = carregar_dimensao(CAMINHO_VENDEDORES)
+    fornecedores = carregar_dimensao(CAMINHO_FORNECEDORES)
+    transportadoras = carregar_dimensao(CAMINHO_TRANSPORTADORAS)
+    dimensoes = Dimensoes()
+
+    (mesclada, _), merge = medir("dimensoes_merge", questoes_com_merge, vendas, vendedores,
+                                 fornecedores, transportadoras, repeticoes=repeticoes)
+    (fato, _), estrela = medir("dimensoes_estrela", questoes_estrela, vendas, dimensoes, repeticoes=repeticoes)
+    merge["tabela_bytes"] = int(mesclada.memory_usage(deep=True).sum())
+    estrela["tabela_bytes"] = int(fato.memory_usage(deep=True).sum())
+    economia = {
+        "etapa": "dimensoes_economia",
+        "segundos": round(merge["segundos"] - estrela["segundos"], 6),
+        "pico_bytes": merge["pico_bytes"] - estrela["pico_bytes"],
+        "tabela_bytes": merge["tabela_bytes"] - estrela["tabela_bytes"],
+    }
+    return [merge, estrela, economia]
+
+
+# Carga de uma pasta com um CSV por mês com 1, 2 e 4 processos: interpretação dos
+# arquivos (sem cache) unindo as tabelas tipadas, e a soma sobre a pasta com os caches
+# dos arquivos construídos em paralelo (blocos.agregar_arquivos)
+def comparar_carga_paralela(fator, semente=0, repeticoes=3, processos=(1, 2, 4)):
+    registros = []
+    pasta = gravar_vendas_mensais(fator, semente)
+    for n in processos:
+        vendas, registro = medir(f"carga_paralela_{n}", carregar_vendas, pasta, usar_cache=False, processos=n,
+                                 repeticoes=repeticoes)
+        registro["linhas_por_segundo"] = round(len(vendas) / registro["segundos"])
+        registros.append(registro)
+        _, registro = medir(f"agregados_paralelos_{n}", agregar_arquivos, ["ClientePaís", "CategoriaNome"],
+                            "Vendas", fonte=pasta, processos=n, repeticoes=repeticoes)
+        registros.append(registro)
+    return registros
+
+
+# Clientes sintéticos de alta cardinalidade (Zipf: poucos clientes grandes e uma
+# cauda longa), para o top-N por cliente na escala de milhões de nomes distintos
+def clientes_zipf(linhas, clientes, semente=0, expoente=1.3):
+    rng = np.random.default_rng(semente)
+    return pd.Series(rng.zipf(expoente, linhas) % clientes, name="ClienteNome").astype(str).astype("category")
+
+
+# Top-10 clientes exato (hash aggregation de todas as chaves) x aproximado
+# (esboços em memória fixa): tempo, pico de memória e o erro real contra o exato,
+# em memória com clientes de alta cardinalidade e em blocos sobre o CSV
+def comparar_top_aproximado(vendas, caminho, repeticoes=3, clientes=2_000_000, n=10):
+    registros = []
+    chaves = clientes_zipf(len(vendas), clientes)
+    pesos = vendas["Vendas"].fillna(0).clip(lower=0).rename("Vendas")
+
+    exato, registro = medir("top_exato_alta_cardinalidade", lambda: pesos.groupby(
+        chaves, observed=True).sum().nlargest(n), repeticoes=repeticoes)
+    registro["distintos"] = int(chaves.nunique())
+    registros.append(registro)
+    (aproximado, info), registro = medir("top_aproximado_alta_cardinalidade", top_aproximado, chaves, pesos, n,
+                                         repeticoes=repeticoes)
+    registros.append(dict(registro, **_erros_top(exato, aproximado, info)))
+
+    exato, registro = medir("top_exato_blocos", top_em_blocos, ["ClienteNome"], "Vendas", n, caminho=caminho,
+                            repeticoes=repeticoes)
+    registros.append(registro)
+    (aproximado, info), registro = medir("top_aproximado_blocos", top_aproximado_em_blocos, ["ClienteNome"],
+                                         "Vendas", n, caminho=caminho, repeticoes=repeticoes)
+    registros.append(dict(registro, **_erros_top(exato, aproximado, info)))
+    return registros
+
+
+# Detalhamento Região -> País -> Cidade (Europa, Alemanha) pelos agregados da
+# hierarquia geográfica x filtro e groupby na tabela fato. Nos agregados o tempo
+# depende do número de grupos (regiões, países, cidades) e fica estável quando o
+# número de linhas cresce; na tabela fato cresce com as linhas
+def comparar_geografia(vendas, repeticoes=3):
+    registros = []
+    cubo, registro = medir("geografia_rollups", Cubo, vendas, AGRUPAMENTOS_GEOGRAFIA, ["Vendas"])
+    registro["grupos"] = cubo.tamanho()
+    registros.append(registro)
+    niveis = {
+        "regiao": dict(),
+        "pais": dict(regiao="Europa"),
+        "cidade": dict(pais="DEU"),
+    }
+    varreduras = {
+        "regiao": lambda: vendas["Vendas"].groupby(regioes(vendas["ClientePaísID"])).sum().sort_values(ascending=False),
+        "pais": lambda: vendas[vendas["ClientePaísID"].isin(PAISES_EUROPEUS)].groupby(
+            "ClientePaís", observed=True)["Vendas"].sum().sort_values(ascending=False),
+        "cidade": lambda: vendas[vendas["ClientePaísID"] == "DEU"].groupby(
+            "ClienteCidade", observed=True)["Vendas"].sum().sort_values(ascending=False),
+    }
+    for nivel, argumentos in niveis.items():
+        _, registro = medir(f"detalhar_{nivel}_rollup", detalhar, cubo, "Vendas", repeticoes=repeticoes, **argumentos)
+        registros.append(registro)
+        _, registro = medir(f"detalhar_{nivel}_varredura", varreduras[nivel], repeticoes=repeticoes)
+        registros.append(registro)
+    return registros
+
+
+# Núcleos NumPy (nucleos.py) x groupby do pandas, com clientes de alta cardinalidade:
+# top-10 por cliente, por cliente x cidade e as quatro medidas por cliente com as
+# chaves fatoradas uma única vez. `iguais` confere o resultado contra o pandas,
+# com igualdade exata (mesmas chaves, na mesma ordem, e mesmas somas bit a bit)
+def comparar_nucleos(vendas, repeticoes=3, clientes=2_000_000, n=10):
+    registros = []
+    chaves = clientes_zipf(len(vendas), clientes)
+    cidades = vendas["ClienteCidade"].reset_index(drop=True)
+    compostas = pd.DataFrame({"ClienteNome": chaves, "ClienteCidade": cidades})
+    medidas = {m: vendas[m].reset_index(drop=True) for m in MEDIDAS_VENDAS if m in vendas}
+    pesos = medidas["Vendas"]
+
+    def pandas_medidas():
+        somas = pd.DataFrame(medidas).groupby(chaves, observed=True).sum()
+        return {m: somas[m].nlargest(n) for m in medidas}
+
+    def nucleo_medidas():
+        grupos = Grupos(chaves)
+        return {m: grupos.top(valores, n) for m, valores in medidas.items()}
+
+    casos = {
+        "cliente": (lambda: pesos.groupby(chaves, observed=True).sum().nlargest(n),
+                    lambda: top_por(chaves, pesos, n)),
+        "cliente_cidade": (lambda: pesos.groupby([chaves, cidades], observed=True).sum().nlargest(n),
+                           lambda: top_por(compostas, pesos, n)),
+        "medidas": (pandas_medidas, nucleo_medidas),
+    }
+    for caso, (com_pandas, com_nucleo) in casos.items():
+        esperado, referencia = medir(f"top_pandas_{caso}", com_pandas, repeticoes=repeticoes)
+        obtido, registro = medir(f"top_nucleo_{caso}", com_nucleo, repeticoes=repeticoes)
+        pares = [(esperado[m], obtido[m]) for m in esperado] if isinstance(esperado, dict) else [(esperado, obtido)]
+        registro["iguais"] = all(e.index.equals(o.index) and np.array_equal(e.to_numpy(), o.to_numpy())
+                                 for e, o in pares)
+        registro["aceleracao"] = round(referencia["segundos"] / registro["segundos"], 2)
+        registros += [referencia, registro]
+    return registros
+
+
+def _erros_top(exato, aproximado, info):
+    reais = exato.reindex(aproximado.index)
+    return {
+        "erro_maximo": round(info["erro_maximo"], 4),
+        "erro_real_maximo": round(float((aproximado - reais).abs().max()), 4),
+        "acertos_top": len(set(exato.index) & set(aproximado.index)),
+        "garantidos": info["garantidos"],
+        "distintos_estimados": round(info["distintos"]),
+        "esboco_bytes": info["memoria_bytes"],
+    }
+
+
+# As dez questões do jeito dos scripts questaoBI-IA-*.py (caminho pandas sobre a tabela tipada).
+# Cada função recebe a tabela fato e as dimensões e devolve a Series do gráfico
+def q1(vendas, dims):
+    return vendas.groupby("ClienteNome", observed=True)["Vendas"].sum().sort_values(ascending=False).head(10)
+
+
+def q2(vendas, dims):
+    return vendas.groupby("ClientePaís", observed=True)["Vendas"].sum().sort_values(ascending=False).head(3)
+
+
+def q3(vendas, dims):
+    brasil = vendas[vendas["ClientePaísID"].astype(str).str.upper() == "BRA"]
+    return brasil.groupby("CategoriaNome", observed=True)["Vendas"].sum().sort_values(ascending=False)
+
+
+def q4(vendas, dims):
+    frete = vendas.groupby("TransportadoraID")["Frete"].sum().reset_index()
+    frete = frete.merge(dims["transportadoras"], on="TransportadoraID").sort_values(by="Frete", ascending=False)
+    return frete.set_index("TransportadoraNome")["Frete"]
+
+
+def q5(vendas, dims):
+    filtro = (vendas["CategoriaNome"] == "Men´s Footwear") & (vendas["ClientePaís"] == "Germany")
+    return vendas[filtro].groupby("ClienteNome", observed=True)["Vendas"].sum().sort_values(ascending=False).head(10)
+
+
+def q6(vendas, dims):
+    eua = vendas[vendas["ClientePaís"] == "USA"]
+    descontos = eua.groupby("VendedorID")["Desconto"].sum().reset_index()
+    descontos = descontos.merge(dims["vendedores"], on="VendedorID").sort_values(by="Desconto", ascending=False)
+    return descontos.set_index("VendedorNome")["Desconto"]
+
+
+def q7(vendas, dims):
+    womens = vendas[vendas["CategoriaNome"] == "Womens wear"]
+    margem = womens.groupby("FornecedorID")["Margem Bruta"].sum().reset_index()
+    margem = margem.merge(dims["fornecedores"], on="FornecedorID").sort_values(by="Margem Bruta", ascending=False)
+    return margem.set_index("FornecedorNome")["Margem Bruta"]
+
+
+def q8(vendas, dims):
+    df = vendas.dropna(subset=["Data"])
+    ano = df["Data"].dt.year.rename("Ano")
+    periodo = ano.between(2009, 2012)
+    return df[periodo].groupby(ano[periodo])["Vendas"].sum().sort_index()
+
+
+def q9(vendas, dims):
+    filtro = (vendas["CategoriaNome"] == "Men´s Footwear") & (vendas["Data"].dt.year == 2012)
+    df = vendas[filtro]
+    clientes = df.groupby("ClienteNome", observed=True)["Vendas"].sum().sort_values(ascending=False)
+    # O segundo gráfico do script (cidades) entra no tempo, mas não no resultado
+    df.groupby("ClienteCidade")["Vendas"].sum().sort_values(ascending=False)
+    return clientes
+
+
+def q10(vendas, dims):
+    europa = vendas[vendas["ClientePaísID"].isin(PAISES_EUROPEUS)]
+    return europa.groupby("ClientePaís", observed=True)["Vendas"].sum().sort_values(ascending=False)
+
+
+QUESTOES = {f.__name__: f for f in (q1, q2, q3, q4, q5, q6, q7, q8, q9, q10)}
+
+
+def _coagir_medidas(bruto):
+    df = bruto.copy()
+    for col in MEDIDAS_VENDAS:
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df
+
+
+def _converter_datas(df):
+    df = df.copy()
+    for col in DATAS_VENDAS:
+        df[col] = pd.to_datetime(df[col], format="%d/%m/%Y", errors="coerce")
+    return df
+
+
+def _codificar_graficos(resultados):
+    return {nome: renderizar(serie, {"kind": "line" if nome == "q8" else "bar"}) for nome, serie in resultados.items()}
+
+
+# O caminho de renderização anterior a renderizacao.py, como referência: figura
+# nova do pyplot a cada gráfico, desenhada pelo Series.plot do pandas e fechada
+# depois do savefig. O pyplot tem estado global, então as renderizações do mesmo
+# processo passavam uma a uma por esta trava
+_trava_pyplot = threading.Lock()
+
+
+def _renderizar_pyplot(serie, opcoes, formato="png"):
+    with _trava_pyplot:
+        fig, ax = plt.subplots()
+        if opcoes["kind"] == "line":
+            serie.plot(kind="line", ax=ax, marker="o")
+        else:
+            serie.plot(kind=opcoes["kind"], ax=ax)
+        buf = BytesIO()
+        with plt.rc_context({"svg.fonttype": "none"}):
+            fig.savefig(buf, format=formato, bbox_inches="tight")
+        plt.close(fig)
+        return buf.getvalue()
+
+
+# Vazão de renderização: `total` gráficos das questões renderizados por `threads`
+# threads no mesmo processo, com `renderizador` (renderizacao.renderizar, que não
+# usa o estado global do pyplot, ou _renderizar_pyplot)
+def _renderizar_em_threads(resultados, threads, total=40, renderizador=renderizar):
+    pedidos = [(serie, {"kind": "line" if nome == "q8" else "bar"}) for nome, serie in resultados.items()]
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda i: renderizador(*pedidos[i % len(pedidos)]), range(total)))
+    return total
+
+
+# Mede cada etapa do pipeline sobre um CSV no formato do VendasGlobais.csv:
+# leitura (inteira, por partição e só com as colunas usadas), coerção numérica,
+# datas, merges, cada questão, a codificação dos gráficos e a vazão de
+# renderização com 1 e 4 threads, antes (pyplot) e depois (renderizacao.py)
+def etapas_pipeline(caminho, repeticoes=3):
+    registros = []
+    dims = {
+        "vendedores": carregar_dimensao(CAMINHO_VENDEDORES),
+        "fornecedores": carregar_dimensao(CAMINHO_FORNECEDORES),
+        "transportadoras": carregar_dimensao(CAMINHO_TRANSPORTADORAS),
+    }
+
+    # Cache colunar particionado por ano: tabela inteira x só a partição de 2012
+    carregar_vendas(caminho)
+    for etapa, anos in (("cache_leitura", None), ("cache_leitura_2012", [2012])):
+        parte, registro = medir(etapa, carregar_vendas, caminho, anos=anos, repeticoes=repeticoes)
+        registro["linhas_lidas"] = len(parte)
+        registros.append(registro)
+    del parte
+
+    # Projeção de colunas: só as colunas lidas pelas dez questões (do cache e do CSV com usecols)
+    colunas = MotorConsultas().colunas_necessarias()
+    for etapa, usar_cache in (("cache_leitura_projetada", True), ("csv_leitura_projetada", False)):
+        parte, registro = medir(etapa, carregar_vendas, caminho, usar_cache=usar_cache, colunas=colunas,
+                                repeticoes=repeticoes)
+        registro["memoria_bytes"] = int(parte.memory_usage(index=False, deep=True).sum())
+        registro.update(memoria_projecao(colunas, caminho) or {})
+        registros.append(registro)
+    del parte
+
+    bruto, registro = medir("csv_leitura", pd.read_csv, caminho, repeticoes=repeticoes)
+    registros.append(registro)
+    bruto = bruto.dropna(how="all").reset_index(drop=True)
+    numerico, registro = medir("coercao_numerica", _coagir_medidas, bruto, repeticoes=repeticoes)
+    registros.append(registro)
+    _, registro = medir("datas", _converter_datas, numerico, repeticoes=repeticoes)
+    registros.append(registro)
+    del numerico
+
+    vendas = tipar(bruto, **ESQUEMA_VENDAS)
+    del bruto
+    _, registro = medir("merges", mesclar_dimensoes, vendas, dims["vendedores"], dims["fornecedores"],
+                        dims["transportadoras"], repeticoes=repeticoes)
+    registros.append(registro)
+
+    resultados = {}
+    for nome, questao in QUESTOES.items():
+        resultados[nome], registro = medir(nome, questao, vendas, dims, repeticoes=repeticoes)
+        registros.append(registro)
+
+    # As mesmas questões numa única varredura compartilhada (consultas.MotorConsultas)
+    motor = MotorConsultas()
+    motor.executar(vendas)
+    _, registro = medir("motor_consultas", motor.executar, vendas, repeticoes=repeticoes)
+    registro.update(motor.estatisticas)
+    registros.append(registro)
+
+    # Índices bitmap das colunas de filtro: custo de construção e o motor usando-os
+    indices, registro = medir("indices_construcao", IndicesVendas, vendas, repeticoes=repeticoes)
+    registro["indice_bytes"] = indices.tamanho_bytes()
+    registros.append(registro)
+    _, registro = medir("motor_consultas_indices", motor.executar, vendas, indices=indices, repeticoes=repeticoes)
+    registro.update(motor.estatisticas)
+    registros.append(registro)
+
+    imagens, registro = medir("codificacao_graficos", _codificar_graficos, resultados, repeticoes=repeticoes)
+    registro["imagem_bytes"] = sum(len(png) for png in imagens.values())
+    registros.append(registro)
+
+    for prefixo, renderizador in (("graficos_pyplot", _renderizar_pyplot), ("graficos", renderizar)):
+        for threads in (1, 4):
+            total, registro = medir(f"{prefixo}_threads_{threads}", _renderizar_em_threads, resultados, threads,
+                                    renderizador=renderizador, repeticoes=repeticoes)
+            registro["graficos_por_segundo"] = round(total / registro["segundos"], 2)
+            registros.append(registro)
+    return registros, vendas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do pipeline de BI (saída em JSON Lines)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--fatores", type=int, nargs="+", default=[1, 100],
+                        help="escalas do conjunto sintético (1 = 2.360 linhas; 10000 exige dezenas de GB de memória)")
+    parser.add_argument("--real", action="store_true", help="medir também o VendasGlobais.csv real (fator 0 na saída)")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="arquivo JSON Lines (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    conjuntos = [(0, CAMINHO_VENDAS)] if args.real else []
+    for fator in args.fatores:
+        inicio = time.perf_counter()
+        caminho = gravar_vendas(fator, args.semente)
+        print(f"fator {fator}x: {caminho} ({time.perf_counter() - inicio:.1f}s)", file=sys.stderr)
+        conjuntos.append((fator, caminho))
+
+    saida = open(args.saida, "w", encoding="utf-8") if args.saida else sys.stdout
+    try:
+        for fator, caminho in conjuntos:
+            registros, vendas = etapas_pipeline(caminho, args.repeticoes)
+            registros += comparar_dimensoes(vendas, args.repeticoes)
+            registros += comparar_top_aproximado(vendas, caminho, args.repeticoes)
+            registros += comparar_geografia(vendas, args.repeticoes)
+            registros += comparar_nucleos(vendas, args.repeticoes)
+            if fator:
+                registros += comparar_carga_paralela(fator, args.semente, args.repeticoes)
+            for registro in registros:
+                registro["fator"] = fator
+                registro["linhas"] = len(vendas)
+                print(json.dumps(registro, ensure_ascii=False), file=saida)
+            del vendas
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
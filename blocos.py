@@ -0,0 +1,204 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dados import CAMINHO_VENDAS, DATAS_VENDAS, MEDIDAS_VENDAS, PROCESSOS_CARGA, arquivos_fonte, carregar_vendas, tipar
+from esbocos import CONTADORES_PADRAO, PRECISAO_HLL, HyperLogLog, SpaceSaving, resultado_aproximado
+from nucleos import Grupos, somar_compensado
+
+# Orçamento padrão de memória para a execução em blocos (bytes)
+MEMORIA_MAX_PADRAO = 256 * 1024 * 1024
+
+# Fator de folga sobre o tamanho tipado de uma linha: buffers do parser,
+# cópias intermediárias da conversão de tipos e da máscara de filtro
+FATOR_LEITURA = 4
+
+# Fração do orçamento reservada aos acumuladores por grupo
+FRACAO_PARCIAIS = 0.25
+
+# Nos blocos as colunas de texto ficam como object: categorias diferentes em cada
+# bloco não se alinhariam nos acumuladores por grupo
+ESQUEMA_BLOCOS = {"medidas": MEDIDAS_VENDAS, "datas": DATAS_VENDAS}
+
+
+# Colunas que precisam ser lidas para agrupar por `chaves`, somar `medida` e aplicar `filtros`
+def colunas_necessarias(chaves, medida, filtros=None):
+    colunas = list(dict.fromkeys(list(chaves) + list(filtros or {}) + [medida]))
+    if "Ano" in colunas:
+        colunas.remove("Ano")
+        colunas.append("Data")
+    return list(dict.fromkeys(colunas))
+
+
+# Estima quantas linhas cabem em um bloco a partir de uma amostra do início do arquivo
+def linhas_por_bloco(caminho, memoria_max=MEMORIA_MAX_PADRAO, colunas=None, amostra=1000):
+    df = tipar(pd.read_csv(caminho, usecols=colunas, nrows=amostra), **ESQUEMA_BLOCOS)
+    if len(df) == 0:
+        return amostra
+    bytes_por_linha = df.memory_usage(index=False, deep=True).sum() / len(df)
+    orcamento_blocos = memoria_max * (1 - FRACAO_PARCIAIS)
+    return max(100, int(orcamento_blocos / (bytes_por_linha * FATOR_LEITURA)))
+
+
+# Lê o CSV de vendas em blocos tipados de tamanho limitado pelo orçamento de memória
+def ler_em_blocos(caminho=CAMINHO_VENDAS, memoria_max=MEMORIA_MAX_PADRAO, colunas=None):
+    linhas = linhas_por_bloco(caminho, memoria_max, colunas)
+    for bloco in pd.read_csv(caminho, usecols=colunas, chunksize=linhas):
+        yield tipar(bloco, **ESQUEMA_BLOCOS)
+
+
+# Mesma semântica de filtros do cubo: lista/tupla/conjunto/range -> isin, demais -> igualdade
+def aplicar_filtros(df, filtros):
+    if not filtros:
+        return df
+    mascara = pd.Series(True, index=df.index)
+    for coluna, valor in filtros.items():
+        if isinstance(valor, (list, tuple, set, frozenset, range)):
+            mascara &= df[coluna].isin(list(valor))
+        else:
+            mascara &= df[coluna] == valor
+    return df[mascara]
+
+
+# Somas de medidas por grupo acumuladas ao longo dos blocos: as chaves já vistas
+# (na ordem em que apareceram) e, para cada uma, o estado da soma compensada de
+# cada medida (nucleos.somar_compensado) e o número de linhas. Como o estado passa
+# de um bloco ao seguinte, o resultado é o mesmo, bit a bit, de somar a tabela inteira
+class _Acumulador:
+    def __init__(self, chaves, medidas):
+        self.chaves = list(chaves)
+        self.medidas = list(medidas)
+        self.indice = None
+        self.somas = np.zeros((0, len(self.medidas)))
+        self.compensacoes = np.zeros((0, len(self.medidas)))
+        self.linhas = np.zeros(0, dtype=np.int64)
+
+    def adicionar(self, tabela):
+        grupos = Grupos(tabela[self.chaves])
+        rotulos = grupos.rotulos(np.arange(grupos.n))
+        if isinstance(rotulos, pd.MultiIndex):
+            rotulos = rotulos.set_levels([nivel.astype(object) for nivel in rotulos.levels])
+        elif isinstance(rotulos, pd.CategoricalIndex):
+            rotulos = rotulos.astype(object)
+        if self.indice is None:
+            posicoes = np.full(grupos.n, -1, dtype=np.int64)
+        else:
+            posicoes = self.indice.get_indexer(rotulos)
+        novos = np.flatnonzero(posicoes < 0)
+        if len(novos):
+            inicio = 0 if self.indice is None else len(self.indice)
+            posicoes[novos] = inicio + np.arange(len(novos))
+            self.indice = rotulos[novos] if self.indice is None else self.indice.append(rotulos[novos])
+            zeros = np.zeros((len(novos), len(self.medidas)))
+            self.somas = np.concatenate([self.somas, zeros])
+            self.compensacoes = np.concatenate([self.compensacoes, zeros])
+            self.linhas = np.concatenate([self.linhas, np.zeros(len(novos), dtype=np.int64)])
+        codigos = np.where(grupos.codigos >= 0, posicoes[grupos.codigos], -1)
+        for j, medida in enumerate(self.medidas):
+            somar_compensado(codigos, tabela[medida].to_numpy(), self.somas[:, j], self.compensacoes[:, j])
+        self.linhas += np.bincount(codigos[codigos >= 0], minlength=len(self.linhas))
+
+    def tamanho_bytes(self):
+        if self.indice is None:
+            return 0
+        return self.indice.memory_usage(deep=True) + (16 * len(self.medidas) + 8) * len(self.linhas)
+
+    # Grupos com linhas, em ordem das chaves, como groupby(chaves)[medidas].sum();
+    # com `coluna_linhas`, mais uma coluna com o número de linhas de cada grupo
+    def resultado(self, coluna_linhas=None):
+        if self.indice is None:
+            tabela = pd.DataFrame(columns=self.medidas, dtype=float)
+        else:
+            presentes = self.linhas > 0
+            tabela = pd.DataFrame(self.somas[presentes], index=self.indice[presentes], columns=self.medidas)
+        if coluna_linhas is not None:
+            tabela[coluna_linhas] = self.linhas[self.linhas > 0]
+        return tabela.sort_index()
+
+
+def _derivar_ano(tabela, pedidos):
+    if any("Ano" in chaves or "Ano" in (filtros or {}) for chaves, _, filtros in pedidos):
+        tabela["Ano"] = tabela["Data"].dt.year
+    return tabela
+
+
+# Várias somas por grupo numa única leitura em blocos: `pedidos` é uma lista de
+# (chaves, medida, filtros) e só as colunas que eles usam são lidas. Cada bloco
+# alimenta um acumulador por pedido, com memória proporcional ao número de grupos.
+# Os resultados têm as mesmas chaves, a mesma ordem e as mesmas somas, bit a bit,
+# de groupby(chaves)[medida].sum() sobre a tabela em memória. `caminho` também pode
+# ser uma pasta ou um glob de CSVs, lidos em ordem como carregar_vendas faz.
+# `estatisticas` (dict), se dado, recebe o número de linhas e de blocos lidos
+def agregar_varios_em_blocos(pedidos, caminho=CAMINHO_VENDAS, memoria_max=MEMORIA_MAX_PADRAO, estatisticas=None):
+    colunas = list(dict.fromkeys(c for chaves, medida, filtros in pedidos
+                                 for c in colunas_necessarias(chaves, medida, filtros)))
+    acumuladores = [_Acumulador(chaves, [medida]) for chaves, medida, _ in pedidos]
+    linhas = blocos = 0
+    for arquivo in arquivos_fonte(caminho):
+        for bloco in ler_em_blocos(arquivo, memoria_max, colunas):
+            bloco = _derivar_ano(bloco, pedidos)
+            for acumulador, (_, _, filtros) in zip(acumuladores, pedidos):
+                acumulador.adicionar(aplicar_filtros(bloco, filtros))
+            linhas += len(bloco)
+            blocos += 1
+    if estatisticas is not None:
+        estatisticas.update(linhas=linhas, blocos=blocos,
+                            bytes_acumuladores=int(sum(a.tamanho_bytes() for a in acumuladores)))
+    return [acumulador.resultado()[medida] for acumulador, (_, medida, _) in zip(acumuladores, pedidos)]
+
+
+# Soma de `medida` por `chaves` calculada bloco a bloco, com memória limitada
+# (ver agregar_varios_em_blocos): mesmo resultado de groupby(chaves)[medida].sum() em memória
+def agregar_em_blocos(chaves, medida, filtros=None, caminho=CAMINHO_VENDAS,
+                      memoria_max=MEMORIA_MAX_PADRAO):
+    return agregar_varios_em_blocos([(list(chaves), medida, filtros)], caminho, memoria_max)[0]
+
+
+def _preparar_arquivo(caminho, colunas):
+    carregar_vendas(caminho, colunas=colunas, processos=1)
+
+
+# Soma de `medida` por `chaves` sobre uma fonte particionada (pasta ou glob de CSVs).
+# Os caches colunares dos arquivos são (re)construídos em paralelo, um arquivo por
+# processo; a soma percorre os arquivos em ordem, mapeados em memória, levando o
+# estado da soma compensada de um arquivo ao seguinte. Somar os parciais de cada
+# arquivo mudaria os últimos bits; assim o resultado é o mesmo, bit a bit, de
+# groupby(chaves)[medida].sum() na tabela unida
+def agregar_arquivos(chaves, medida, filtros=None, fonte=CAMINHO_VENDAS, processos=PROCESSOS_CARGA):
+    pedidos = [(list(chaves), medida, filtros)]
+    colunas = colunas_necessarias(chaves, medida, filtros)
+    arquivos = arquivos_fonte(fonte)
+    if processos > 1 and len(arquivos) > 1:
+        with ProcessPoolExecutor(min(processos, len(arquivos))) as pool:
+            list(pool.map(_preparar_arquivo, arquivos, [colunas] * len(arquivos)))
+    acumulador = _Acumulador(chaves, [medida])
+    for arquivo in arquivos:
+        vendas = _derivar_ano(carregar_vendas(arquivo, colunas=colunas, processos=1), pedidos)
+        acumulador.adicionar(aplicar_filtros(vendas, filtros))
+    return acumulador.resultado()[medida]
+
+
+# Top-N em blocos: equivalente a groupby(chaves)[medida].sum().nlargest(n)
+def top_em_blocos(chaves, medida, n, filtros=None, caminho=CAMINHO_VENDAS,
+                  memoria_max=MEMORIA_MAX_PADRAO):
+    return agregar_em_blocos(chaves, medida, filtros, caminho, memoria_max).nlargest(n)
+
+
+# Top-N aproximado em blocos: em vez de guardar os parciais de todas as chaves
+# (milhões de clientes), cada parcial é mesclado num SpaceSaving de `contadores`
+# grupos e as chaves distintas são contadas num HyperLogLog. Memória fixa e uma
+# única passada no CSV; devolve (Series, limites de erro) como esbocos.top_aproximado
+def top_aproximado_em_blocos(chaves, medida, n, filtros=None, caminho=CAMINHO_VENDAS,
+                             memoria_max=MEMORIA_MAX_PADRAO, contadores=CONTADORES_PADRAO,
+                             precisao=PRECISAO_HLL):
+    chaves = list(chaves)
+    resumo = SpaceSaving(contadores)
+    distintos = HyperLogLog(precisao)
+    for bloco in ler_em_blocos(caminho, memoria_max, colunas_necessarias(chaves, medida, filtros)):
+        if "Ano" in chaves or "Ano" in (filtros or {}):
+            bloco["Ano"] = bloco["Data"].dt.year
+        parcial = aplicar_filtros(bloco, filtros).groupby(chaves, sort=False)[medida].sum()
+        resumo.atualizar(parcial)
+        distintos.atualizar(parcial.index)
+    return resultado_aproximado(resumo, distintos, n, medida, chaves)
@@ -0,0 +1,97 @@
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.parse import urljoin
+from urllib.request import Request, urlopen
+
+
+# Recursos de uma carga de página do dashboard: página, layout, dependências e
+# as imagens referenciadas no layout (como o navegador faria, sem os bundles JS)
+def recursos_da_pagina(url):
+    with urlopen(urljoin(url, "_dash-layout")) as resposta:
+        layout = resposta.read().decode("utf-8")
+    imagens = sorted(set(re.findall(r'"src":\s*"([^"]+)"', layout)))
+    return ["", "_dash-layout", "_dash-dependencies"] + [urljoin(url, i) for i in imagens]
+
+
+def _pedir(url, etag=None):
+    pedido = Request(url, headers={"If-None-Match": etag} if etag else {})
+    try:
+        with urlopen(pedido) as resposta:
+            resposta.read()
+            return resposta.status, resposta.headers.get("ETag")
+    except HTTPError as erro:
+        return erro.code, erro.headers.get("ETag")
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else None
+
+
+# Teste de carga: `clientes` threads carregam a página inteira repetidamente por
+# `segundos`. Com revalidar=True as imagens são pedidas com If-None-Match, como
+# um navegador com cache (a primeira carga de cada cliente é sempre completa)
+def medir_carga(url, clientes=8, segundos=10, revalidar=True):
+    url = url if url.endswith("/") else url + "/"
+    recursos = [urljoin(url, r) for r in recursos_da_pagina(url)]
+    latencias = []
+    paginas = [0]
+    erros = [0]
+    trava = threading.Lock()
+    fim = time.perf_counter() + segundos
+
+    def cliente():
+        etags = {}
+        while time.perf_counter() < fim:
+            tempos = []
+            for recurso in recursos:
+                inicio = time.perf_counter()
+                status, etag = _pedir(recurso, etags.get(recurso) if revalidar else None)
+                tempos.append(time.perf_counter() - inicio)
+                if status >= 400:
+                    with trava:
+                        erros[0] += 1
+                elif etag:
+                    etags[recurso] = etag
+            with trava:
+                latencias.extend(tempos)
+                paginas[0] += 1
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=cliente) for _ in range(clientes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    return {
+        "url": url,
+        "clientes": clientes,
+        "segundos": round(duracao, 3),
+        "paginas_por_segundo": round(paginas[0] / duracao, 2),
+        "requisicoes_por_segundo": round(len(latencias) / duracao, 2),
+        "p50_ms": round(_percentil(latencias, 0.50) * 1000, 2),
+        "p95_ms": round(_percentil(latencias, 0.95) * 1000, 2),
+        "p99_ms": round(_percentil(latencias, 0.99) * 1000, 2),
+        "erros": erros[0],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga de páginas do dashboard (saída em JSON)")
+    parser.add_argument("url", nargs="?", default="http://localhost:8050/")
+    parser.add_argument("--clientes", type=int, default=8)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--sem-revalidar", action="store_true", help="baixar as imagens inteiras em toda carga")
+    args = parser.parse_args(argv)
+    resultado = medir_carga(args.url, args.clientes, args.segundos, not args.sem_revalidar)
+    print(json.dumps(resultado, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
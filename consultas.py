@@ -0,0 +1,284 @@
+import numpy as np
+import pandas as pd
+
+from blocos import MEMORIA_MAX_PADRAO, agregar_varios_em_blocos
+from dados import CAMINHO_VENDAS, carregar_vendas
+from dimensoes import DIMENSOES, Dimensoes
+from esbocos import top_aproximado
+from geografia import PAISES_EUROPEUS
+from indices import COLUNAS_INDEXADAS, IndicesVendas
+from nucleos import Grupos, somar_selecoes, top_k
+
+
+# Consulta declarativa: soma de `medida` agrupada por `por`, com filtros
+# {coluna: valor} (lista/tupla/conjunto/range -> isin, demais -> igualdade,
+# como no cubo), ordenação e limite. "Ano" é derivado de "Data".
+# ordem: "desc"/"asc" pelo valor, "indice" pelo índice ou None.
+# IDs de Vendedor/Fornecedor/Transportadora em `por` saem com os nomes da dimensão
+class Consulta:
+    def __init__(self, nome, medida, por, filtros=None, ordem="desc", limite=None):
+        self.nome = nome
+        self.medida = medida
+        self.por = tuple(por)
+        self.filtros = dict(filtros or {})
+        self.ordem = ordem
+        self.limite = limite
+
+    # Anos que a consulta lê (filtro em "Ano"); None quando precisa de todos
+    def anos(self):
+        if "Ano" not in self.filtros:
+            return None
+        valor = _congelar(self.filtros["Ano"])
+        return set(valor) if isinstance(valor, frozenset) else {valor}
+
+    # Colunas da tabela fato que a consulta lê (medida, chaves e filtros; "Ano" vem de "Data")
+    def colunas(self):
+        colunas = {self.medida, *self.por, *self.filtros}
+        if "Ano" in colunas:
+            colunas = (colunas - {"Ano"}) | {"Data"}
+        return colunas
+
+    # Top-N (limite com ordem decrescente): pode ser respondida no modo aproximado
+    def top_n(self):
+        return self.limite is not None and self.ordem == "desc"
+
+    # Predicados em forma canônica (a mesma condição escrita de jeitos diferentes tem a mesma chave)
+    def predicados(self):
+        return frozenset((coluna, _congelar(valor)) for coluna, valor in self.filtros.items())
+
+
+# As dez questões dos scripts questaoBI-IA-*.py
+QUESTOES = [
+    Consulta("q1", "Vendas", ["ClienteNome"], limite=10),
+    Consulta("q2", "Vendas", ["ClientePaís"], limite=3),
+    # O script original comparava ClientePaísID.astype(str).str.upper(); aqui a
+    # igualdade é exata, o que dá o mesmo resultado porque os códigos do CSV já
+    # são ISO 3166-1 em maiúsculas (as regiões de geografia.py também dependem disso)
+    Consulta("q3", "Vendas", ["CategoriaNome"], {"ClientePaísID": "BRA"}),
+    Consulta("q4", "Frete", ["TransportadoraID"]),
+    Consulta("q5", "Vendas", ["ClienteNome"], {"CategoriaNome": "Men´s Footwear", "ClientePaís": "Germany"}, limite=10),
+    Consulta("q6", "Desconto", ["VendedorID"], {"ClientePaís": "USA"}),
+    Consulta("q7", "Margem Bruta", ["FornecedorID"], {"CategoriaNome": "Womens wear"}),
+    Consulta("q8", "Vendas", ["Ano"], {"Ano": range(2009, 2013)}, ordem="indice"),
+    Consulta("q9", "Vendas", ["ClienteNome"], {"CategoriaNome": "Men´s Footwear", "Ano": 2012}),
+    Consulta("q9_cidades", "Vendas", ["ClienteCidade"], {"CategoriaNome": "Men´s Footwear", "Ano": 2012}),
+    # Europa pelos códigos de país de geografia.REGIOES (coluna indexada em indices.py)
+    Consulta("q10", "Vendas", ["ClientePaís"], {"ClientePaísID": PAISES_EUROPEUS}),
+]
+
+
+def _congelar(valor):
+    if isinstance(valor, (list, tuple, set, frozenset, range)):
+        return frozenset(valor)
+    return valor
+
+
+# Máscara booleana de um predicado. Em colunas categóricas compara os códigos
+# inteiros em vez das strings
+def _mascara(coluna, valor):
+    if isinstance(valor, frozenset):
+        if isinstance(coluna.dtype, pd.CategoricalDtype):
+            codigos = coluna.cat.categories.get_indexer(list(valor))
+            return np.isin(coluna.cat.codes.to_numpy(), codigos[codigos >= 0])
+        return coluna.isin(list(valor)).to_numpy()
+    if isinstance(coluna.dtype, pd.CategoricalDtype):
+        if valor not in coluna.cat.categories:
+            return np.zeros(len(coluna), dtype=bool)
+        return coluna.cat.codes.to_numpy() == coluna.cat.categories.get_loc(valor)
+    return (coluna == valor).to_numpy()
+
+
+# Motor de varredura compartilhada: todas as consultas registradas são
+# respondidas juntas. Cada predicado distinto (ex.: CategoriaNome == "Men´s
+# Footwear", usado pelas questões 5 e 9) é avaliado uma única vez, cada
+# combinação de filtros vira uma única máscara e as chaves de cada `por` são
+# fatoradas uma única vez (nucleos.Grupos). Todas as somas saem de uma única
+# passada do kernel de soma (nucleos.somar_selecoes), cada consulta com a sua
+# máscara e a sua faixa de códigos de grupo: uma questão nova não acrescenta
+# passada na tabela fato. Cada grupo soma as suas linhas na ordem da tabela,
+# então os resultados são os mesmos, bit a bit, do groupby de cada questão.
+# O top-N é uma seleção parcial (top_k)
+class MotorConsultas:
+    def __init__(self, consultas=QUESTOES, dimensoes=None):
+        self.consultas = {}
+        self.dimensoes = dimensoes
+        self.estatisticas = {}
+        self.aproximacoes = {}
+        for consulta in consultas:
+            self.registrar(consulta)
+
+    def registrar(self, consulta):
+        self.consultas[consulta.nome] = consulta
+
+    def _resolvedor(self, consultas):
+        chaves = {c for consulta in consultas for c in consulta.por if c in DIMENSOES}
+        if chaves and (self.dimensoes is None or not chaves <= set(self.dimensoes.nomes)):
+            self.dimensoes = Dimensoes(sorted(chaves | set(self.dimensoes.nomes if self.dimensoes else ())))
+        return self.dimensoes
+
+    # União dos anos lidos pelas consultas, para ler só essas partições da
+    # tabela fato (dados.carregar_vendas(anos=...)); None se alguma precisa de todos
+    def anos_necessarios(self, nomes=None):
+        anos = set()
+        for nome in nomes or self.consultas:
+            anos_consulta = self.consultas[nome].anos()
+            if anos_consulta is None:
+                return None
+            anos |= anos_consulta
+        return anos
+
+    # União das colunas lidas pelas consultas, para carregar só essas colunas da
+    # tabela fato (dados.carregar_vendas(colunas=...))
+    def colunas_necessarias(self, nomes=None):
+        colunas = set()
+        for nome in nomes or self.consultas:
+            colunas |= self.consultas[nome].colunas()
+        return colunas
+
+    # Colunas indexadas na carga (indices.COLUNAS_INDEXADAS) em que as consultas
+    # filtram: os índices bitmap que vale a pena construir para elas
+    def colunas_indexaveis(self, nomes=None):
+        filtros = {c for nome in nomes or self.consultas for c in self.consultas[nome].filtros}
+        return [c for c in COLUNAS_INDEXADAS if c in filtros]
+
+    # Executa todas as consultas (ou só `nomes`) sobre a tabela fato; devolve {nome: Series}.
+    # Com `indices` (indices.IndicesVendas da mesma tabela), os predicados em colunas
+    # indexadas viram AND de bitmaps, expandido numa única máscara por combinação.
+    # Com `aproximado`, as consultas top-N saem de esboços em memória fixa
+    # (esbocos.top_aproximado) e os limites de erro de cada uma ficam em self.aproximacoes
+    def executar(self, vendas, nomes=None, indices=None, aproximado=False):
+        consultas = [self.consultas[n] for n in (nomes or self.consultas)]
+        aproximadas = [consulta for consulta in consultas if aproximado and consulta.top_n()]
+        colunas = {}
+        mascaras = {}
+        combinacoes = {}
+        indexados = 0
+
+        def coluna(nome):
+            if nome not in colunas:
+                colunas[nome] = vendas["Data"].dt.year if nome == "Ano" and nome not in vendas else vendas[nome]
+            return colunas[nome]
+
+        def filtro(predicados):
+            nonlocal indexados
+            if predicados not in combinacoes:
+                mascara = None
+                restantes = predicados
+                no_indice = {c: v for c, v in predicados if c in indices} if indices is not None else {}
+                if no_indice:
+                    mascara = indices.mascara(indices.bitmap_filtros(no_indice))
+                    indexados += len(no_indice)
+                    restantes = [p for p in predicados if p[0] not in no_indice]
+                for predicado in restantes:
+                    if predicado not in mascaras:
+                        mascaras[predicado] = _mascara(coluna(predicado[0]), predicado[1])
+                    mascara = mascaras[predicado] if mascara is None else mascara & mascaras[predicado]
+                combinacoes[predicados] = mascara
+            return combinacoes[predicados]
+
+        fatorados = {}
+
+        def fatorado(por):
+            if por not in fatorados:
+                fatorados[por] = Grupos(pd.DataFrame({c: coluna(c) for c in por}))
+            return fatorados[por]
+
+        # Uma soma por (filtros, chaves, medida) distintos, todas na mesma passada
+        grupos = list(dict.fromkeys((consulta.predicados(), consulta.por, consulta.medida)
+                                    for consulta in consultas if consulta not in aproximadas))
+        somas = somar_selecoes([(fatorado(por), filtro(predicados), coluna(medida))
+                                for predicados, por, medida in grupos])
+        agregados = dict(zip(grupos, somas))
+
+        esbocos = {}
+        for consulta in aproximadas:
+            mascara = filtro(consulta.predicados())
+            chaves = pd.DataFrame({c: coluna(c) for c in consulta.por})
+            pesos = coluna(consulta.medida)
+            if mascara is not None:
+                chaves, pesos = chaves[mascara], pesos[mascara]
+            esbocos[consulta.nome] = top_aproximado(chaves, pesos, consulta.limite)
+
+        dimensoes = self._resolvedor(consultas)
+        resultados = {}
+        self.aproximacoes = {}
+        for consulta in consultas:
+            if consulta.nome in esbocos:
+                serie, info = esbocos[consulta.nome]
+                if dimensoes is not None:
+                    # Nomes trocados linha a linha, sem somar IDs de mesmo nome: cada
+                    # linha é uma estimativa com os seus próprios limites de erro
+                    indice, validos = dimensoes.nomear(serie.index)
+                    serie = pd.Series(serie.to_numpy()[validos], index=indice[validos], name=serie.name)
+                    info["limites"] = info["limites"][validos].set_axis(indice[validos])
+                self.aproximacoes[consulta.nome] = info
+                resultados[consulta.nome] = serie
+                continue
+            serie = agregados[(consulta.predicados(), consulta.por, consulta.medida)]
+            resultados[consulta.nome] = _finalizar(consulta, serie, dimensoes)
+
+        self.estatisticas = {
+            "consultas": len(consultas),
+            "predicados": len(mascaras),
+            "predicados_indexados": indexados,
+            "mascaras": len(combinacoes),
+            "agrupamentos": len(grupos),
+            "passadas": 1 if grupos else 0,
+            "fatoracoes": len(fatorados),
+            "aproximadas": len(aproximadas),
+        }
+        return resultados
+
+    # Executa as consultas (ou só `nomes`) lendo o CSV (ou pasta/glob de CSVs) em
+    # blocos com memória limitada, sem carregar a tabela fato: uma única leitura
+    # para todas (blocos.agregar_varios_em_blocos), com os mesmos resultados, bit a
+    # bit, de executar. self.estatisticas recebe as linhas e os blocos lidos
+    def executar_em_blocos(self, caminho=CAMINHO_VENDAS, nomes=None, memoria_max=MEMORIA_MAX_PADRAO):
+        consultas = [self.consultas[n] for n in (nomes or self.consultas)]
+        self.estatisticas = {"consultas": len(consultas)}
+        self.aproximacoes = {}
+        somas = agregar_varios_em_blocos([(list(c.por), c.medida, c.filtros) for c in consultas], caminho,
+                                         memoria_max, self.estatisticas)
+        dimensoes = self._resolvedor(consultas)
+        return {consulta.nome: _finalizar(consulta, serie, dimensoes) for consulta, serie in zip(consultas, somas)}
+
+
+# Nomes das dimensões, ordem e limite da consulta aplicados à soma agrupada
+def _finalizar(consulta, serie, dimensoes):
+    if dimensoes is not None:
+        serie = dimensoes.resolver(serie)
+    if consulta.top_n():
+        serie = serie.iloc[top_k(serie.to_numpy(), consulta.limite)]
+    elif consulta.ordem == "desc":
+        serie = serie.sort_values(ascending=False)
+    elif consulta.ordem == "asc":
+        serie = serie.sort_values()
+    elif consulta.ordem == "indice":
+        serie = serie.sort_index()
+    if consulta.limite is not None:
+        serie = serie.head(consulta.limite)
+    return serie
+
+
+# Colunas da tabela fato lidas pelas questões `nomes` (ex.: colunas_questoes("q2")
+# -> {"ClientePaís", "Vendas"}), para carregar_vendas(colunas=...)
+def colunas_questoes(*nomes):
+    return MotorConsultas().colunas_necessarias(nomes)
+
+
+# Responde questões pelo nome (ex.: responder("q9", "q9_cidades")) numa única
+# varredura; devolve a Series ou uma tupla de Series, na ordem pedida.
+# Sem `vendas`, carrega só as partições dos anos que as consultas filtram e só
+# as colunas que elas leem. Sem `indices`, constrói os índices bitmap das colunas
+# em que as consultas filtram, para os predicados passarem pelos bitmaps.
+# aproximado=True responde as questões top-N por esboços (ver MotorConsultas.executar)
+def responder(*nomes, vendas=None, indices=None, aproximado=False):
+    motor = MotorConsultas()
+    if vendas is None:
+        vendas = carregar_vendas(anos=motor.anos_necessarios(nomes), colunas=motor.colunas_necessarias(nomes))
+    if indices is None:
+        indices = IndicesVendas(vendas, motor.colunas_indexaveis(nomes))
+    resultados = motor.executar(vendas, nomes, indices, aproximado)
+    if len(nomes) == 1:
+        return resultados[nomes[0]]
+    return tuple(resultados[nome] for nome in nomes)
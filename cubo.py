@@ -0,0 +1,189 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from dados import concatenar
+from geografia import AGRUPAMENTOS_GEOGRAFIA, regioes
+from nucleos import top_k
+
+# Medidas somadas em todos os agregados do cubo
+MEDIDAS = ["Vendas", "Frete", "Desconto", "Margem Bruta"]
+
+# Coluna com o número de linhas da tabela fato em cada grupo
+COLUNA_LINHAS = "Linhas"
+
+# Agrupamentos (grouping sets) que cobrem as dez questões de BI:
+#   1 ClienteNome                  6 ClientePaís x VendedorID
+#   2 ClientePaís                  7 CategoriaNome x FornecedorID
+#   3/5 ClientePaís x CategoriaNome x ClienteNome
+#   4 TransportadoraID             8 Ano
+#   9 CategoriaNome x Ano x ClienteNome x ClienteCidade
+#   10 Região x País (e os demais níveis da hierarquia geográfica, geografia.py)
+# Vendedor/Fornecedor/Transportadora ficam como IDs; os nomes são resolvidos
+# no resultado com dimensoes.Dimensoes.resolver
+AGRUPAMENTOS_PADRAO = [
+    ("ClienteNome",),
+    ("ClientePaís",),
+    ("ClientePaís", "CategoriaNome", "ClienteNome"),
+    ("TransportadoraID",),
+    ("ClientePaís", "VendedorID"),
+    ("CategoriaNome", "FornecedorID"),
+    ("Ano",),
+    ("CategoriaNome", "Ano", "ClienteNome", "ClienteCidade"),
+] + AGRUPAMENTOS_GEOGRAFIA
+
+# Dimensões derivadas pelo cubo -> coluna da tabela fato de onde saem
+DERIVADAS = {"Ano": "Data", "Região": "ClientePaísID"}
+
+
+# Colunas da tabela fato que um cubo com esses agrupamentos lê (as derivadas vêm
+# da coluna de origem), para carregar só elas (dados.carregar_vendas(colunas=...))
+def colunas_agrupamentos(agrupamentos, medidas=MEDIDAS):
+    colunas = set(medidas) | {dim for dims in agrupamentos for dim in dims}
+    return {DERIVADAS.get(coluna, coluna) for coluna in colunas}
+
+
+# Índice sem categorias (níveis como object), para que agregados de lotes diferentes se alinhem
+def _sem_categorias(indice):
+    if isinstance(indice, pd.MultiIndex):
+        return pd.MultiIndex.from_arrays(
+            [indice.get_level_values(i).astype(object) for i in range(indice.nlevels)], names=indice.names)
+    return indice.astype(object)
+
+
+# Posição de cada valor de `coluna` em `valores` (-1 se não está); colunas
+# categóricas são procuradas pelas categorias, não linha a linha
+def _posicoes(coluna, valores):
+    if isinstance(coluna.dtype, pd.CategoricalDtype):
+        codigos = coluna.cat.codes.to_numpy()
+        return np.where(codigos >= 0, valores.get_indexer(coluna.cat.categories)[codigos], -1)
+    return valores.get_indexer(coluna)
+
+
+# Linhas de `df` cujas chaves `dims` estão em `grupos` (índice de um agregado): cada
+# chave vira a posição entre os valores que aparecem em `grupos`, e as posições
+# combinadas num código inteiro são comparadas com os códigos dos grupos
+def _mascara_grupos(df, dims, grupos):
+    validas = np.ones(len(df), dtype=bool)
+    combinado = np.zeros(len(df), dtype=np.int64)
+    alvos = np.zeros(len(grupos), dtype=np.int64)
+    for i, dim in enumerate(dims):
+        nivel = grupos.get_level_values(i)
+        valores = pd.Index(nivel.unique().tolist())
+        posicoes = _posicoes(df[dim], valores)
+        validas &= posicoes >= 0
+        combinado = combinado * len(valores) + posicoes
+        alvos = alvos * len(valores) + valores.get_indexer(nivel)
+    return validas & np.isin(combinado, alvos)
+
+
+# Cubo de agregados materializados: cada agrupamento é somado uma única vez
+# sobre a tabela fato, e as consultas depois só leem/reagregam esses grupos.
+# O custo de uma consulta passa a depender do número de grupos, não de pedidos.
+class Cubo:
+    def __init__(self, df, agrupamentos=AGRUPAMENTOS_PADRAO, medidas=MEDIDAS):
+        self.agrupamentos = [tuple(dims) for dims in agrupamentos]
+        self.medidas = [m for m in medidas if m in df.columns]
+        self.recarregar(df)
+
+    # Recalcula todos os agregados a partir da tabela fato completa
+    def recarregar(self, df):
+        self.cuboides = {dims: self._agregar(df, dims) for dims in self.agrupamentos}
+
+    def _derivar(self, df, dims):
+        if "Ano" in dims and "Ano" not in df.columns:
+            df = df.assign(Ano=df["Data"].dt.year)
+        if "Região" in dims and "Região" not in df.columns:
+            df = df.assign(Região=regioes(df["ClientePaísID"]))
+        return df
+
+    def _agregar(self, df, dims):
+        df = self._derivar(df, dims)
+        grupos = df.groupby(list(dims), observed=True)
+        tabela = grupos[self.medidas].sum()
+        # Contagem de linhas por grupo, para saber quando um grupo fica vazio
+        tabela[COLUNA_LINHAS] = grupos.size()
+        tabela.index = _sem_categorias(tabela.index)
+        return tabela
+
+    # Soma (sinal=1) ou remove (sinal=-1) as linhas de um lote nos agregados, no lugar.
+    # O custo é proporcional ao lote e ao número de grupos, não ao histórico
+    def adicionar(self, df, sinal=1):
+        if len(df) == 0:
+            return
+        for dims in self.agrupamentos:
+            parcial = self._agregar(df, dims) * sinal
+            tabela = self.cuboides[dims].add(parcial, fill_value=0)
+            tabela = tabela[tabela[COLUNA_LINHAS] > 0].astype({COLUNA_LINHAS: "int64"})
+            self.cuboides[dims] = tabela.sort_index()
+
+    # Recalcula, a partir das `partes` da tabela fato (DataFrames em ordem), só os
+    # grupos de cada agregado que têm alguma das `linhas` (ex.: as linhas de pedidos
+    # substituídos e as que entraram no lugar delas). Subtrair um lote (adicionar
+    # com sinal=-1) deixa resíduo de ponto flutuante nas somas dos grupos que
+    # continuam com linhas; recalculados, eles ficam iguais aos de um cubo
+    # construído do zero sobre as partes. As partes são percorridas uma vez por
+    # agregado, mas só as linhas dos grupos afetados são copiadas e somadas
+    def recalcular(self, partes, linhas):
+        if len(linhas) == 0:
+            return
+        dimensoes = list(dict.fromkeys(dim for dims in self.agrupamentos for dim in dims))
+        colunas = dimensoes + self.medidas
+        linhas = self._derivar(linhas, dimensoes)[colunas]
+        partes = [self._derivar(p, dimensoes)[colunas] for p in partes if len(p)]
+        for dims in self.agrupamentos:
+            afetados = self._agregar(linhas, dims).index
+            selecionadas = concatenar([p.loc[_mascara_grupos(p, dims, afetados), list(dims) + self.medidas]
+                                       for p in partes] or [linhas.iloc[:0]])
+            tabela = self.cuboides[dims]
+            tabela = pd.concat([tabela[~tabela.index.isin(afetados)], self._agregar(selecionadas, dims)])
+            tabela.index = _sem_categorias(tabela.index)
+            self.cuboides[dims] = tabela.sort_index()
+
+    # Cópia para leitura (ex.: um instantâneo publicado por atualizacao.AtualizadorDados).
+    # adicionar e recarregar trocam os agregados em vez de alterá-los no lugar, então
+    # a cópia só precisa do próprio dicionário e não duplica as tabelas
+    def copiar(self):
+        copia = copy.copy(self)
+        copia.cuboides = dict(self.cuboides)
+        return copia
+
+    # Escolhe o menor agregado que contém todas as dimensões pedidas
+    def _cuboide_para(self, dims):
+        candidatos = [c for c in self.cuboides if set(dims) <= set(c)]
+        if not candidatos:
+            raise KeyError(f"Nenhum agregado do cubo cobre as dimensões {sorted(dims)}")
+        return min(candidatos, key=lambda c: (len(self.cuboides[c]), len(c)))
+
+    # Soma de uma medida agrupada por `por`, com filtros {dimensão: valor}.
+    # Valores do tipo lista/tupla/conjunto/range viram isin; os demais, igualdade.
+    def consultar(self, medida, por, filtros=None):
+        por = list(por)
+        filtros = filtros or {}
+        chave = self._cuboide_para(por + list(filtros))
+        tabela = self.cuboides[chave]
+
+        if filtros:
+            mascara = np.ones(len(tabela), dtype=bool)
+            for dim, valor in filtros.items():
+                nivel = tabela.index.get_level_values(dim)
+                if isinstance(valor, (list, tuple, set, frozenset, range)):
+                    mascara &= nivel.isin(list(valor))
+                else:
+                    mascara &= nivel == valor
+            tabela = tabela[mascara]
+
+        serie = tabela[medida]
+        if list(chave) == por:
+            return serie
+        return serie.groupby(level=por, observed=True).sum()
+
+    # Maiores n grupos da medida (equivalente a groupby().sum().nlargest(n)), por seleção parcial
+    def top(self, medida, por, n, filtros=None):
+        serie = self.consultar(medida, por, filtros)
+        return serie.iloc[top_k(serie.to_numpy(), n)]
+
+    # Número total de grupos materializados (tamanho do cubo)
+    def tamanho(self):
+        return sum(len(t) for t in self.cuboides.values())
@@ -0,0 +1,488 @@
+import glob
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+# Caminhos padrão dos arquivos CSV (relativos à raiz do projeto, como nos scripts)
+CAMINHO_VENDAS = "csv/VendasGlobais.csv"
+CAMINHO_VENDEDORES = "csv/Vendedores.csv"
+CAMINHO_TRANSPORTADORAS = "csv/Transportadoras.csv"
+CAMINHO_FORNECEDORES = "csv/Fornecedores.csv"
+
+# O cache colunar fica ao lado dos CSVs, em csv/.cache/<nome do arquivo>/
+PASTA_CACHE = ".cache"
+
+# Processos que leem em paralelo os arquivos de uma fonte particionada (pasta ou glob)
+PROCESSOS_CARGA = int(os.environ.get("PROCESSOS_CARGA", os.cpu_count() or 1))
+
+# Versão do formato do cache; incrementar invalida todos os caches gravados
+VERSAO_CACHE = 4
+
+# Datas são gravadas no cache como número do dia (int32, dias desde 1970-01-01);
+# este valor marca datas ausentes
+DIA_NULO = np.iinfo(np.int32).min
+
+# Esquema de tipos do VendasGlobais.csv
+MEDIDAS_VENDAS = ["Vendas Custo", "Margem Bruta", "Vendas", "Desconto", "Frete", "Qtde"]
+CATEGORICAS_VENDAS = ["ClientePaís", "CategoriaNome", "ClienteNome"]
+DATAS_VENDAS = ["Data"]
+
+ESQUEMA_VENDAS = {
+    "medidas": MEDIDAS_VENDAS,
+    "categoricas": CATEGORICAS_VENDAS,
+    "datas": DATAS_VENDAS,
+}
+
+
+# Ler o CSV e aplicar a mesma normalização que os scripts faziam manualmente:
+# medidas numéricas com fillna(0), datas DD/MM/YYYY e colunas categóricas.
+# `fonte` pode ser um caminho ou um buffer; opcoes vai direto para pd.read_csv
+def ler_csv_tipado(fonte, medidas=(), categoricas=(), datas=(), **opcoes):
+    return tipar(pd.read_csv(fonte, **opcoes), medidas, categoricas, datas)
+
+
+# Normalização de tipos de um DataFrame lido do CSV (arquivo inteiro ou um bloco)
+def tipar(df, medidas=(), categoricas=(), datas=()):
+    # O VendasGlobais.csv tem linhas totalmente vazias (",,,,") no final
+    df = df.dropna(how="all").reset_index(drop=True)
+
+    for col in medidas:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    for col in datas:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], format="%d/%m/%Y", errors="coerce")
+    for col in categoricas:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    # IDs lidos como float por causa das linhas vazias voltam a ser inteiros
+    for col in df.columns:
+        if df[col].dtype == "float64" and col not in medidas:
+            valores = df[col]
+            if valores.notna().all() and (valores % 1 == 0).all():
+                df[col] = valores.astype("int64")
+    return df
+
+
+# Lê um trecho de vendas (arquivo, buffer, cauda do CSV) com o esquema de VendasGlobais
+def ler_vendas(fonte, **opcoes):
+    return ler_csv_tipado(fonte, **ESQUEMA_VENDAS, **opcoes)
+
+
+# Concatena partes da tabela fato unificando as categorias das colunas categóricas
+def concatenar(partes):
+    partes = [p for p in partes if len(p)] or partes[:1]
+    if len(partes) == 1:
+        return partes[0]
+    partes = [p.copy() for p in partes]
+    for col in partes[0].columns:
+        if isinstance(partes[0][col].dtype, pd.CategoricalDtype):
+            uniao = pd.api.types.union_categoricals([p[col] for p in partes]).categories
+            for p in partes:
+                p[col] = p[col].cat.set_categories(uniao)
+    return pd.concat(partes, ignore_index=True)
+
+
+# Hash do conteúdo do arquivo, usado quando o mtime muda mas o conteúdo pode ser o mesmo
+def hash_arquivo(caminho):
+    h = hashlib.sha1()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+# Lê o conteúdo de um CSV até o tamanho que ele tinha no início da leitura. Se o
+# arquivo está crescendo e a última linha lida ficou incompleta, ela fica de fora.
+# Devolve o conteúdo e a fonte: mtime e tamanho do arquivo no início, tamanho e
+# hash do que foi lido. Linhas anexadas durante a leitura ficam depois de
+# fonte["tamanho"], de onde a ingestão incremental continua
+def _ler_fonte(caminho):
+    st = os.stat(caminho)
+    with open(caminho, "rb") as f:
+        conteudo = f.read(st.st_size)
+    if not conteudo.endswith(b"\n") and os.stat(caminho).st_size > len(conteudo):
+        conteudo = conteudo[:conteudo.rfind(b"\n") + 1]
+    fonte = {"mtime_ns": st.st_mtime_ns, "tamanho": len(conteudo), "sha1": hashlib.sha1(conteudo).hexdigest()}
+    return conteudo, fonte
+
+
+# Tabela carregada de um CSV sozinho leva em attrs["fonte"] o tamanho e o hash do que foi lido
+def _com_fonte(df, fonte):
+    df.attrs["fonte"] = {"tamanho": fonte["tamanho"], "sha1": fonte["sha1"]}
+    return df
+
+
+def _pasta_cache(caminho):
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    return os.path.join(pasta, PASTA_CACHE, nome)
+
+
+def _ler_meta(pasta):
+    try:
+        with open(os.path.join(pasta, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_json(caminho, dados):
+    # Grava em arquivo temporário e troca atomicamente, para leitores concorrentes
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False)
+    os.replace(tmp, caminho)
+
+
+# Grava um .npy do cache do mesmo jeito: outro processo (worker do gunicorn, processo
+# da carga paralela) pode estar com o arquivo antigo mapeado em memória (_ler_cache),
+# e truncá-lo no lugar faria esse leitor ler lixo ou cair com SIGBUS
+def _gravar_npy(caminho, valores):
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, valores)
+    os.replace(tmp, caminho)
+
+
+# Verifica se o cache ainda corresponde ao arquivo fonte (mtime/tamanho, depois hash)
+def _cache_valido(meta, pasta, caminho, esquema):
+    if meta is None or meta.get("versao") != VERSAO_CACHE or meta.get("esquema") != esquema:
+        return False
+    st = os.stat(caminho)
+    if meta["mtime_ns"] == st.st_mtime_ns and meta["tamanho"] == st.st_size:
+        return True
+    if meta["tamanho"] != st.st_size or meta["sha1"] != hash_arquivo(caminho):
+        return False
+    # Arquivo "tocado" sem mudar o conteúdo: só atualiza o mtime registrado
+    meta["mtime_ns"] = st.st_mtime_ns
+    try:
+        _gravar_json(os.path.join(pasta, "meta.json"), meta)
+    except OSError:
+        pass
+    return True
+
+
+# Partições por ano. As colunas ficam na ordem das linhas do CSV (as somas do
+# groupby, compensadas na ordem das linhas, dependem dela); o arquivo de linhas
+# guarda as posições das linhas ordenadas por ano (na ordem do CSV dentro de cada
+# ano), então cada ano é um intervalo contínuo [início, fim) desse arquivo.
+# Linhas sem data ficam no final, na partição "nulo"
+def _particionar(df, coluna):
+    anos = np.nan_to_num(df[coluna].dt.year.to_numpy("float64"), nan=np.inf)
+    linhas = np.argsort(anos, kind="stable")
+    anos = anos[linhas]
+    mudancas = np.flatnonzero(anos[1:] != anos[:-1]) + 1
+    particoes = {}
+    for inicio, fim in zip(np.r_[0, mudancas], np.r_[mudancas, len(df)]):
+        if inicio < fim:
+            chave = "nulo" if np.isinf(anos[inicio]) else str(int(anos[inicio]))
+            particoes[chave] = [int(inicio), int(fim)]
+    return linhas, particoes
+
+
+def _dias(serie):
+    valores = serie.to_numpy("datetime64[ns]").astype("datetime64[D]").view("int64")
+    return np.where(serie.isna().to_numpy(), DIA_NULO, valores).astype(np.int32)
+
+
+def _datas_de_dias(dias):
+    valores = dias.astype("int64")
+    valores[dias == DIA_NULO] = np.iinfo(np.int64).min
+    return valores.view("datetime64[D]").astype("datetime64[ns]")
+
+
+# Converte o DataFrame tipado em um arquivo .npy por coluna.
+# Texto e categorias são gravados codificados em dicionário (códigos + categorias),
+# datas como número do dia. Tabelas com datas são particionadas por ano (_particionar).
+# Cada arquivo é trocado atomicamente e o meta.json vem por último, então quem lê
+# vê o cache antigo ou o novo inteiro, nunca um arquivo pela metade
+def _gravar_cache(df, pasta, caminho, fonte, esquema):
+    os.makedirs(pasta, exist_ok=True)
+    sha1 = fonte["sha1"]
+    prefixo = sha1[:12]
+    particoes = None
+    arquivo_linhas = None
+    datas = [col for col in esquema["datas"] if col in df.columns]
+    if datas:
+        linhas, particoes = _particionar(df, datas[0])
+        arquivo_linhas = f"{prefixo}_linhas.npy"
+        _gravar_npy(os.path.join(pasta, arquivo_linhas), linhas)
+    colunas = []
+    for i, col in enumerate(df.columns):
+        serie = df[col]
+        arquivo = f"{prefixo}_{i:02d}.npy"
+        info = {"nome": col, "arquivo": arquivo}
+        # Memória da coluna já carregada (texto como objetos, categorias como códigos),
+        # usada para relatar o quanto a leitura de só algumas colunas economiza
+        info["bytes"] = int(serie.memory_usage(index=False, deep=True))
+        if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object:
+            cat = serie.astype("category").cat
+            _gravar_npy(os.path.join(pasta, arquivo), cat.codes.to_numpy())
+            info["tipo"] = "categoria" if isinstance(serie.dtype, pd.CategoricalDtype) else "texto"
+            info["categorias"] = cat.categories.tolist()
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            _gravar_npy(os.path.join(pasta, arquivo), _dias(serie))
+            info["tipo"] = "dia"
+        else:
+            _gravar_npy(os.path.join(pasta, arquivo), serie.to_numpy())
+            info["tipo"] = "numerico"
+        colunas.append(info)
+
+    meta = {
+        "versao": VERSAO_CACHE,
+        "esquema": esquema,
+        "fonte": os.path.abspath(caminho),
+        "mtime_ns": fonte["mtime_ns"],
+        "tamanho": fonte["tamanho"],
+        "sha1": sha1,
+        "linhas": len(df),
+        "colunas": colunas,
+        "particoes": particoes,
+        "linhas_particoes": arquivo_linhas,
+    }
+    _gravar_json(os.path.join(pasta, "meta.json"), meta)
+
+    # Remover colunas de versões anteriores do cache
+    for nome in os.listdir(pasta):
+        if nome.endswith(".npy") and not nome.startswith(prefixo):
+            os.remove(os.path.join(pasta, nome))
+    return meta
+
+
+# Intervalos do arquivo de linhas das partições dos anos pedidos (None = tabela
+# inteira). Partições vizinhas são unidas num único intervalo
+def _intervalos(meta, anos):
+    if anos is None or meta.get("particoes") is None:
+        return None
+    pedidos = {str(int(ano)) for ano in anos}
+    intervalos = []
+    for chave, (inicio, fim) in meta["particoes"].items():
+        if chave not in pedidos:
+            continue
+        if intervalos and intervalos[-1][1] == inicio:
+            intervalos[-1][1] = fim
+        else:
+            intervalos.append([inicio, fim])
+    return intervalos
+
+
+# Colunas pedidas que não existem na tabela
+def _validar_colunas(existentes, colunas):
+    faltando = sorted(set(colunas) - set(existentes))
+    if faltando:
+        raise KeyError(f"Colunas inexistentes: {faltando}")
+
+
+# Monta o DataFrame a partir do cache, com as colunas numéricas mapeadas em memória
+# (sem cópia) e as linhas na ordem do CSV. Com `anos`, só as linhas das partições
+# desses anos são lidas (poda de partições), também na ordem do CSV.
+# Com `colunas`, só os arquivos dessas colunas são abertos (projeção)
+def _ler_cache(pasta, meta, anos=None, colunas=None):
+    intervalos = _intervalos(meta, anos)
+    linhas = None
+    if intervalos is not None:
+        ordem = np.load(os.path.join(pasta, meta["linhas_particoes"]), mmap_mode="r")
+        linhas = np.sort(np.concatenate([ordem[inicio:fim] for inicio, fim in intervalos] or [ordem[:0]]))
+    if colunas is not None:
+        _validar_colunas([info["nome"] for info in meta["colunas"]], colunas)
+    dados = {}
+    for info in meta["colunas"]:
+        if colunas is not None and info["nome"] not in colunas:
+            continue
+        valores = np.load(os.path.join(pasta, info["arquivo"]), mmap_mode="r")
+        if linhas is not None:
+            valores = np.take(valores, linhas)
+        if info["tipo"] == "categoria":
+            dados[info["nome"]] = pd.Categorical.from_codes(valores, info["categorias"])
+        elif info["tipo"] == "texto":
+            categorias = np.asarray(info["categorias"] + [np.nan], dtype=object)
+            dados[info["nome"]] = categorias[np.asarray(valores)]
+        elif info["tipo"] == "dia":
+            dados[info["nome"]] = _datas_de_dias(valores)
+        else:
+            dados[info["nome"]] = valores
+    return pd.DataFrame(dados, copy=False)
+
+
+# Filtra os anos pedidos numa tabela lida sem cache
+def _filtrar_anos(df, datas, anos):
+    if anos is None or not datas:
+        return df
+    return df[df[datas[0]].dt.year.isin(list(anos))].reset_index(drop=True)
+
+
+# Lê só as colunas pedidas direto do CSV (usecols), com as categóricas já lidas como
+# category. A coluna de data entra na leitura quando é preciso filtrar anos
+def _ler_csv_projetado(conteudo, medidas, categoricas, datas, colunas, anos):
+    _validar_colunas(pd.read_csv(BytesIO(conteudo), nrows=0).columns, colunas)
+    leitura = set(colunas) | (set(datas[:1]) if anos is not None else set())
+    tipos = {col: "category" for col in categoricas if col in leitura}
+    df = ler_csv_tipado(BytesIO(conteudo), medidas, categoricas, datas, usecols=lambda col: col in leitura,
+                        dtype=tipos)
+    df = _filtrar_anos(df, datas, anos)
+    return df[[col for col in df.columns if col in colunas]]
+
+
+def _projetar(df, colunas):
+    if colunas is None:
+        return df
+    _validar_colunas(df.columns, colunas)
+    return df[[col for col in df.columns if col in colunas]]
+
+
+# Garante o cache colunar de um CSV, reconstruindo-o quando a fonte muda.
+# Devolve (pasta, meta, None) ou, sem permissão de escrita, (pasta, None, tabela lida)
+def _atualizar_cache(caminho, esquema):
+    pasta = _pasta_cache(caminho)
+    meta = _ler_meta(pasta)
+    if _cache_valido(meta, pasta, caminho, esquema):
+        return pasta, meta, None
+    conteudo, fonte = _ler_fonte(caminho)
+    df = _com_fonte(ler_csv_tipado(BytesIO(conteudo), **esquema), fonte)
+    try:
+        return pasta, _gravar_cache(df, pasta, caminho, fonte, esquema), None
+    except OSError:
+        return pasta, None, df
+
+
+# Carrega um CSV usando o cache colunar tipado, reconstruindo-o quando a fonte muda.
+# `anos` (ex.: [2012] ou range(2009, 2013)) lê só as partições desses anos e
+# `colunas` só essas colunas (projeção); o cache sempre guarda a tabela inteira.
+# `caminho` também pode ser uma pasta ou um glob de CSVs com o mesmo formato
+# (ver carregar_arquivos), lidos em `processos` processos
+def carregar_tabela(caminho, medidas=(), categoricas=(), datas=(), usar_cache=True, anos=None, colunas=None,
+                    processos=PROCESSOS_CARGA):
+    if fonte_particionada(caminho):
+        return carregar_arquivos(caminho, medidas, categoricas, datas, usar_cache, anos, colunas, processos)
+    esquema = {"medidas": list(medidas), "categoricas": list(categoricas), "datas": list(datas)}
+    if colunas is not None:
+        colunas = set(colunas)
+    if not usar_cache:
+        conteudo, fonte = _ler_fonte(caminho)
+        if colunas is not None:
+            df = _ler_csv_projetado(conteudo, list(medidas), list(categoricas), list(datas), colunas, anos)
+        else:
+            df = _filtrar_anos(ler_csv_tipado(BytesIO(conteudo), medidas, categoricas, datas), datas, anos)
+        return _com_fonte(df, fonte)
+
+    pasta, meta, df = _atualizar_cache(caminho, esquema)
+    if meta is None:
+        # Sem permissão de escrita: segue apenas com o DataFrame em memória
+        return _com_fonte(_projetar(_filtrar_anos(df, datas, anos), colunas), df.attrs["fonte"])
+    return _com_fonte(_ler_cache(pasta, meta, anos, colunas), meta)
+
+
+# Fonte com vários arquivos: uma pasta (todos os *.csv dela) ou um glob (ex.: "csv/vendas/*-2012-*.csv")
+def fonte_particionada(fonte):
+    return os.path.isdir(fonte) or any(c in fonte for c in "*?[")
+
+
+# Arquivos de uma fonte, em ordem de nome (um CSV sozinho é uma fonte de um arquivo)
+def arquivos_fonte(fonte):
+    if os.path.isdir(fonte):
+        arquivos = sorted(glob.glob(os.path.join(fonte, "*.csv")))
+    elif fonte_particionada(fonte):
+        arquivos = sorted(glob.glob(fonte))
+    else:
+        return [fonte]
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhum arquivo CSV em {fonte}")
+    return arquivos
+
+
+# Trabalho de cada processo da carga paralela. Com cache, só (re)constrói o cache
+# colunar do arquivo e devolve None: a leitura fica para o processo principal,
+# mapeada em memória, sem copiar as colunas entre processos. Sem cache (ou sem
+# permissão de escrita), devolve a tabela tipada
+def _preparar_arquivo(caminho, medidas, categoricas, datas, usar_cache, anos, colunas):
+    if not usar_cache:
+        return carregar_tabela(caminho, medidas, categoricas, datas, False, anos, colunas)
+    esquema = {"medidas": list(medidas), "categoricas": list(categoricas), "datas": list(datas)}
+    _, meta, df = _atualizar_cache(caminho, esquema)
+    return None if meta is not None else _projetar(_filtrar_anos(df, datas, anos), colunas)
+
+
+# Carga de uma fonte particionada (ex.: um CSV por região ou por mês): os arquivos
+# são interpretados em paralelo num pool de processos (mesma coerção numérica,
+# datas DD/MM/YYYY e categorias de um arquivo só) e as tabelas tipadas são unidas
+# com as categorias unificadas. Cada arquivo tem o seu cache colunar, então só os
+# arquivos novos ou alterados voltam a ser interpretados. O resultado fica na ordem
+# dos arquivos e, dentro de cada um, na ordem das linhas, como os CSVs concatenados
+def carregar_arquivos(fonte, medidas=(), categoricas=(), datas=(), usar_cache=True, anos=None, colunas=None,
+                      processos=PROCESSOS_CARGA):
+    arquivos = arquivos_fonte(fonte)
+    argumentos = (medidas, categoricas, datas, usar_cache, anos, None if colunas is None else set(colunas))
+    preparados = [None] * len(arquivos)
+    if processos > 1 and len(arquivos) > 1:
+        with ProcessPoolExecutor(min(processos, len(arquivos))) as pool:
+            preparados = list(pool.map(_preparar_arquivo, arquivos, *([valor] * len(arquivos) for valor in argumentos)))
+    partes = [
+        df if df is not None else carregar_tabela(arquivo, *argumentos)
+        for arquivo, df in zip(arquivos, preparados)
+    ]
+    df = concatenar(partes)
+    # Categorias em ordem alfabética, como na leitura de um arquivo só (a ordem dos grupos depende dela)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+    return df
+
+
+# Tabela fato de vendas já tipada (medidas numéricas, Data como datetime, categorias),
+# na ordem das linhas do CSV. `anos` restringe a leitura às partições desses anos e `colunas`
+# às colunas usadas (ex.: consultas.MotorConsultas.colunas_necessarias).
+# `caminho` pode ser um CSV, uma pasta ou um glob de CSVs no formato do VendasGlobais.csv
+def carregar_vendas(caminho=CAMINHO_VENDAS, usar_cache=True, anos=None, colunas=None, processos=PROCESSOS_CARGA):
+    return carregar_tabela(caminho, usar_cache=usar_cache, anos=anos, colunas=colunas, processos=processos,
+                           **ESQUEMA_VENDAS)
+
+
+# Relatório da projeção de colunas: memória que as colunas pedidas ocupam depois de
+# carregadas e quanto a tabela inteira ocuparia, pelas medidas gravadas no cache
+# (proporcionais às linhas das partições lidas). None se o cache ainda não existe
+def memoria_projecao(colunas, caminho=CAMINHO_VENDAS, anos=None):
+    meta = _ler_meta(_pasta_cache(caminho))
+    if meta is None or meta.get("versao") != VERSAO_CACHE:
+        return None
+    intervalos = _intervalos(meta, anos)
+    linhas = meta["linhas"] if intervalos is None else sum(fim - inicio for inicio, fim in intervalos)
+    fracao = linhas / meta["linhas"] if meta["linhas"] else 0.0
+    lidas = [info for info in meta["colunas"] if colunas is None or info["nome"] in colunas]
+    total = sum(info["bytes"] for info in meta["colunas"]) * fracao
+    lidos = sum(info["bytes"] for info in lidas) * fracao
+    return {
+        "linhas": linhas,
+        "colunas_lidas": len(lidas),
+        "colunas_total": len(meta["colunas"]),
+        "bytes_lidos": int(lidos),
+        "bytes_total": int(total),
+        "bytes_economizados": int(total - lidos),
+    }
+
+
+# Tabelas de dimensão (Vendedores, Transportadoras, Fornecedores)
+def carregar_dimensao(caminho, usar_cache=True):
+    return carregar_tabela(caminho, usar_cache=usar_cache)
+
+
+# Identificador do conteúdo dos arquivos (por padrão, só o de vendas),
+# usado como parte das chaves de caches derivados (gráficos, agregados).
+# Pastas e globs entram com todos os seus arquivos
+def impressao_digital(*caminhos):
+    h = hashlib.sha1()
+    for caminho in (arquivo for fonte in caminhos or (CAMINHO_VENDAS,) for arquivo in arquivos_fonte(fonte)):
+        meta = _ler_meta(_pasta_cache(caminho))
+        st = os.stat(caminho)
+        if meta is not None and meta["mtime_ns"] == st.st_mtime_ns and meta["tamanho"] == st.st_size:
+            h.update(meta["sha1"].encode("ascii"))
+        else:
+            h.update(hash_arquivo(caminho).encode("ascii"))
+    return h.hexdigest()
@@ -1,75 +1,128 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import base64
-from io import BytesIO
+import os
 from dash import Dash, html
+from dados import carregar_vendas, impressao_digital, CAMINHO_TRANSPORTADORAS
+from graficos import registrar_graficos, url_grafico
+from filtros import agrupamentos_filtros, armazenamento_filtros, cartao_filtros, registrar_filtros
+from cubo import Cubo, colunas_agrupamentos
+from dimensoes import Dimensoes
+from ingestao import CHAVE_LINHA, IngestorIncremental
+from atualizacao import AtualizadorDados, PASTA_INSTANTANEOS
+from metricas import metricas, registrar_metricas
 
-# Carregar os arquivos CSV
-vendas_df = pd.read_csv("csv/VendasGlobais.csv")
-transportadoras_df = pd.read_csv("csv/Transportadoras.csv")
+# Esquema estrela: a tabela fato fica só com TransportadoraID (sem merge);
+# o nome da transportadora é resolvido nas linhas do resultado
+with metricas.etapa("dimensoes"):
+    dimensoes = Dimensoes(["TransportadoraID"])
 
-# Mesclar os dados de vendas com transportadoras
-vendas_df = vendas_df.merge(transportadoras_df, on="TransportadoraID", how="left")
+# Cards interativos: os mesmos recortes dos cards de imagem, mas com país,
+# categoria e anos escolhidos na tela (filtros iniciais = recorte original)
+CARTOES_FILTRO = {
+    "filtro1": dict(titulo="🏆 Top 10 Clientes por Vendas", medida="Vendas", por="ClienteNome", n=10),
+    "filtro2": dict(titulo="🌍 Top 3 Países por Vendas", medida="Vendas", por="ClientePaís", n=3, cor="orange"),
+    "filtro3": dict(titulo="🇧🇷 Faturamento por Categoria", medida="Vendas", por="CategoriaNome", ordem="asc",
+                    cor="green", horizontal=True, paises=["Brazil"]),
+    "filtro4": dict(titulo="🚚 Despesa com Frete por Transportadora", medida="Frete", por="TransportadoraID", cor="red"),
+    "filtro5": dict(titulo="👞 Principais Clientes por Segmento", medida="Vendas", por="ClienteNome", n=10,
+                    cor="purple", paises=["Germany"], categorias=["Men´s Footwear"]),
+}
+
+# Agregados materializados uma única vez; os cards consultam o cubo em vez de
+# filtrar e reagrupar a tabela fato inteira
+AGRUPAMENTOS = [
+    ("ClienteNome",),
+    ("ClientePaís",),
+    ("ClientePaís", "CategoriaNome", "ClienteNome"),
+    ("TransportadoraID",),
+] + agrupamentos_filtros(CARTOES_FILTRO)
+
+# Carregar os arquivos CSV (via cache colunar tipado: medidas já numéricas), só com
+# as colunas que o cubo usa e a chave das linhas
+# (PedidoID, ProdutoID, para a ingestão incremental); textos
+# livres como ProdutoNome e ClienteContato não são lidos
+# (cada etapa da carga é medida e exposta em /metrics, ver metricas.py)
+with metricas.etapa("carga_vendas") as medida:
+    vendas_df = carregar_vendas(colunas=colunas_agrupamentos(AGRUPAMENTOS) | set(CHAVE_LINHA))
+    medida["linhas"] = len(vendas_df)
 
 # Normalizar nomes de colunas esperadas do CSV
 # VendasGlobais.csv tem colunas: ClienteNome, ClientePaís, ClientePaísID, CategoriaNome, Vendas, Frete, ...
 # Transportadoras.csv tem colunas: TransportadoraID, TransportadoraNome
-# Garantir tipos numéricos para agregações
-for col in ["Vendas", "Frete"]:
-    if col in vendas_df.columns:
-        vendas_df[col] = pd.to_numeric(vendas_df[col], errors="coerce").fillna(0)
+# Os tipos numéricos para agregações já são garantidos por carregar_vendas()
+
+with metricas.etapa("cubo") as medida:
+    cubo = Cubo(vendas_df, agrupamentos=AGRUPAMENTOS)
+    medida["linhas"] = len(vendas_df)
+    medida["resultado"] = cubo.tamanho()
+
+# Modo de anexação: pedidos novos (final do CSV ou arquivos em csv/deltas/)
+# entram no cubo sem reiniciar o servidor
+with metricas.etapa("ingestor"):
+    ingestor = IngestorIncremental(cubo, vendas_df)
+
+# Versão dos dados usada nas chaves do cache de gráficos (a do instantâneo em uso)
+impressao_dimensoes = impressao_digital(CAMINHO_TRANSPORTADORAS)
 
-# Função para converter gráfico matplotlib em imagem base64
-def fig_to_base64(fig):
-    buf = BytesIO()
-    fig.savefig(buf, format="png", bbox_inches="tight")
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode("utf-8")
-    plt.close(fig)
-    return f"data:image/png;base64,{encoded}"
+def versao_dados():
+    return f"{atualizador.instantaneo().versao}:{impressao_dimensoes}"
 
-# Helper para plotar Series com fallback quando vazia
-def plot_series_safe(s, kind="bar", title="", color=None, horizontal=False):
-    fig, ax = plt.subplots()
-    if s is not None and len(s) > 0:
-        if horizontal or kind == "barh":
-            s.plot(kind="barh", ax=ax, title=title, color=color)
-        else:
-            s.plot(kind="bar", ax=ax, title=title, color=color)
-    else:
-        ax.text(0.5, 0.5, "Sem dados", ha="center", va="center", fontsize=12)
-        ax.set_title(title)
-        ax.axis("off")
-    return fig
+# Cubo do instantâneo fixado pelo pedido em andamento
+def cubo_atual():
+    return atualizador.instantaneo().cubo
+
+# Gráficos de uma versão nova, renderizados antes da troca: depois dela, nenhum pedido espera
+def pre_renderizar_graficos(instantaneo):
+    cache_graficos.pre_renderizar(GRAFICOS, versao_dados(), ("png", "svg"))
+
+# Atualização em segundo plano (atualizacao.py): a ingestão roda numa thread própria e
+# cada versão nova dos dados vira um instantâneo imutável (cópia do cubo + gráficos
+# pré-renderizados), publicado de uma vez; pedidos em andamento terminam com o
+# instantâneo em que começaram, sem reiniciar o servidor. Com vários workers do
+# gunicorn, só um deles ingere e grava cada instantâneo na pasta; os demais o
+# carregam de lá, então todos servem a mesma versão (e os mesmos ETags)
+atualizador = AtualizadorDados(ingestor, construir=pre_renderizar_graficos,
+                               pasta=os.path.join(PASTA_INSTANTANEOS, "dashboard-12345"))
+
+# Os gráficos são gerados sob demanda (no primeiro pedido de cada imagem)
+# pela rota /graficos/<id>.<formato> registrada em graficos.registrar_graficos,
+# e não na importação. Cada função calcula só a Series agregada e as opções de
+# plot; a renderização roda no pool de processos de graficos.py
 
 # 1. Top 10 clientes por vendas ($)
-top_clientes = vendas_df.groupby("ClienteNome")["Vendas"].sum().nlargest(10)
-fig1 = plot_series_safe(top_clientes, kind="bar", title="Top 10 Clientes por Vendas ($)")
-img1 = fig_to_base64(fig1)
+def grafico_top_clientes(n):
+    top_clientes = cubo_atual().top("Vendas", ["ClienteNome"], n)
+    return top_clientes, dict(kind="bar", title=f"Top {n} Clientes por Vendas ($)")
 
 # 2. Top 3 países por vendas ($)
-top_paises = vendas_df.groupby("ClientePaís")["Vendas"].sum().nlargest(3)
-fig2 = plot_series_safe(top_paises, kind="bar", title="Top 3 Países por Vendas ($)", color="orange")
-img2 = fig_to_base64(fig2)
+def grafico_top_paises(n):
+    top_paises = cubo_atual().top("Vendas", ["ClientePaís"], n)
+    return top_paises, dict(kind="bar", title=f"Top {n} Países por Vendas ($)", color="orange")
 
 # 3. Categorias com maior faturamento no Brasil
 # No CSV o país está em inglês (Brazil). Categoria é "CategoriaNome" e o valor é "Vendas".
-brasil_df = vendas_df[vendas_df["ClientePaís"] == "Brazil"]
-categorias_br = brasil_df.groupby("CategoriaNome")["Vendas"].sum().sort_values(ascending=True)
-fig3 = plot_series_safe(categorias_br, kind="barh", title="Faturamento por Categoria no Brasil", color="green", horizontal=True)
-img3 = fig_to_base64(fig3)
+def grafico_categorias_brasil():
+    categorias_br = cubo_atual().consultar("Vendas", ["CategoriaNome"], {"ClientePaís": "Brazil"}).sort_values(ascending=True)
+    return categorias_br, dict(kind="barh", title="Faturamento por Categoria no Brasil", color="green", horizontal=True)
 
 # 4. Despesa com frete por transportadora
-frete_por_transportadora = vendas_df.groupby("TransportadoraNome")["Frete"].sum().sort_values(ascending=False)
-fig4 = plot_series_safe(frete_por_transportadora, kind="bar", title="Despesa com Frete por Transportadora", color="red")
-img4 = fig_to_base64(fig4)
+def grafico_frete_transportadora():
+    frete_por_transportadora = dimensoes.resolver(cubo_atual().consultar("Frete", ["TransportadoraID"])).sort_values(ascending=False)
+    return frete_por_transportadora, dict(kind="bar", title="Despesa com Frete por Transportadora", color="red")
 
 # 5. Principais clientes do segmento “Men´s Footwear” na Germany
 # Categoria no CSV: "Men´s Footwear" (com acento) e país: "Germany"
-segmento_df = vendas_df[(vendas_df["CategoriaNome"] == "Men´s Footwear") & (vendas_df["ClientePaís"] == "Germany")]
-clientes_segmento = segmento_df.groupby("ClienteNome")["Vendas"].sum().nlargest(10)
-fig5 = plot_series_safe(clientes_segmento, kind="bar", title="Principais Clientes - Men´s Footwear na Alemanha (Germany)", color="purple")
-img5 = fig_to_base64(fig5)
+def grafico_clientes_segmento(n):
+    segmento = {"CategoriaNome": "Men´s Footwear", "ClientePaís": "Germany"}
+    clientes_segmento = cubo_atual().top("Vendas", ["ClienteNome"], n, segmento)
+    return clientes_segmento, dict(kind="bar", title="Principais Clientes - Men´s Footwear na Alemanha (Germany)", color="purple")
+
+# id do html.Img -> (função geradora, parâmetros); os parâmetros entram na chave do cache
+GRAFICOS = {
+    "img1": (grafico_top_clientes, {"n": 10}),
+    "img2": (grafico_top_paises, {"n": 3}),
+    "img3": (grafico_categorias_brasil, {}),
+    "img4": (grafico_frete_transportadora, {}),
+    "img5": (grafico_clientes_segmento, {"n": 10}),
+}
 
 # Criar o app Dash
 app = Dash(__name__)
@@ -84,6 +137,7 @@ app.layout = html.Div(
         "margin": "0"
     },
     children=[
+
         # Cabeçalho
         html.Div([
             html.H1(
@@ -120,7 +174,7 @@ app.layout = html.Div(
                         }
                     ),
                     html.Img(
-                        src=img1,
+                        src=url_grafico(app, "img1"),
                         style={"width": "100%", "borderRadius": "8px", "boxShadow": "0 2px 8px rgba(0,0,0,0.1)"}
                     )
                 ], style={
@@ -143,7 +197,7 @@ app.layout = html.Div(
                         }
                     ),
                     html.Img(
-                        src=img2,
+                        src=url_grafico(app, "img2", "svg"),
                         style={"width": "100%", "borderRadius": "8px", "boxShadow": "0 2px 8px rgba(0,0,0,0.1)"}
                     )
                 ], style={
@@ -176,7 +230,7 @@ app.layout = html.Div(
                         }
                     ),
                     html.Img(
-                        src=img3,
+                        src=url_grafico(app, "img3"),
                         style={"width": "100%", "borderRadius": "8px", "boxShadow": "0 2px 8px rgba(0,0,0,0.1)"}
                     )
                 ], style={
@@ -198,7 +252,7 @@ app.layout = html.Div(
                         }
                     ),
                     html.Img(
-                        src=img4,
+                        src=url_grafico(app, "img4", "svg"),
                         style={"width": "100%", "borderRadius": "8px", "boxShadow": "0 2px 8px rgba(0,0,0,0.1)"}
                     )
                 ], style={
@@ -230,7 +284,7 @@ app.layout = html.Div(
                         }
                     ),
                     html.Img(
-                        src=img5,
+                        src=url_grafico(app, "img5"),
                         style={"width": "100%", "borderRadius": "8px", "boxShadow": "0 2px 8px rgba(0,0,0,0.1)"}
                     )
                 ], style={
@@ -244,6 +298,25 @@ app.layout = html.Div(
             ]
         ),
         
+        # Cards interativos: mudar um filtro redesenha o gráfico no navegador
+        # (a exportação estática troca a seção "explorar" por um link para o app)
+        html.Div(id="explorar", children=[
+            armazenamento_filtros(),
+            html.H2(
+                "🔎 Explorar por País, Categoria e Ano",
+                style={"textAlign": "center", "color": "white", "fontSize": "32px", "marginBottom": "30px"}
+            ),
+            html.Div(
+                style={
+                    "display": "grid",
+                    "gridTemplateColumns": "repeat(auto-fit, minmax(500px, 1fr))",
+                    "gap": "30px",
+                    "marginBottom": "30px"
+                },
+                children=[cartao_filtros(id_cartao, cartao) for id_cartao, cartao in CARTOES_FILTRO.items()]
+            ),
+        ]),
+
         # Rodapé
         html.Div([
             html.P(
@@ -260,6 +333,21 @@ app.layout = html.Div(
     ]
 )
 
+# Gráficos servidos como recursos HTTP (ETag + Cache-Control + 304), renderizados
+# sob demanda com cache LRU (e em disco) por versão dos dados.
+# Gráficos de barras pequenos usam SVG, menor que o PNG equivalente
+cache_graficos = registrar_graficos(app, GRAFICOS, versao_dados)
+
+# Dados dos cards interativos (uma entrega por carga de página, em cache por versão)
+registrar_filtros(app, CARTOES_FILTRO, cubo_atual, versao_dados, dimensoes)
+
+# Duração das etapas, linhas, tamanho dos resultados, bytes por imagem e RSS em
+# /metrics (formato do Prometheus); METRICAS_LOG=1 registra cada requisição no log
+registrar_metricas(app)
+
+# Cada pedido fixa o instantâneo atual; a thread de atualização sobe no primeiro pedido
+atualizador.registrar(app)
+
 # Executar o servidor
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -1,86 +1,129 @@
-﻿import pandas as pd
-import matplotlib.pyplot as plt
-import base64
-from io import BytesIO
+﻿import os
 from dash import Dash, html
+from dados import carregar_vendas, impressao_digital, CAMINHO_VENDEDORES, CAMINHO_FORNECEDORES
+from graficos import registrar_graficos, url_grafico
+from filtros import agrupamentos_filtros, armazenamento_filtros, cartao_filtros, registrar_filtros
+from cubo import Cubo, colunas_agrupamentos
+from dimensoes import Dimensoes
+from geografia import AGRUPAMENTOS_GEOGRAFIA, detalhar
+from ingestao import CHAVE_LINHA, IngestorIncremental
+from atualizacao import AtualizadorDados, PASTA_INSTANTANEOS
+from metricas import metricas, registrar_metricas
 
-# Carregar os arquivos CSV
-vendas_df = pd.read_csv('csv/VendasGlobais.csv')
-vendedores_df = pd.read_csv('csv/Vendedores.csv')
-fornecedores_df = pd.read_csv('csv/Fornecedores.csv')
-
-# Mesclar os dados
-vendas_df = vendas_df.merge(vendedores_df, on='VendedorID', how='left')
-vendas_df = vendas_df.merge(fornecedores_df, on='FornecedorID', how='left')
-
-# Converter coluna de data (formato DD/MM/YYYY no CSV)
-vendas_df['Data'] = pd.to_datetime(vendas_df['Data'], format='%d/%m/%Y', errors='coerce')
-
-# Garantir tipos numéricos para agregações
-for col in ['Vendas', 'Desconto', 'Margem Bruta', 'Frete']:
-    if col in vendas_df.columns:
-        vendas_df[col] = pd.to_numeric(vendas_df[col], errors='coerce').fillna(0)
-
-# Função para converter gráfico matplotlib em imagem base64
-def fig_to_base64(fig):
-    buf = BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight')
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode('utf-8')
-    plt.close(fig)
-    return f'data:image/png;base64,{encoded}'
-
-# Helper para plotar Series com fallback quando vazia
-def plot_series_safe(s, kind='bar', title='', color=None, horizontal=False, figsize=(10, 6)):
-    fig, ax = plt.subplots(figsize=figsize)
-    if s is not None and len(s) > 0:
-        if horizontal or kind == 'barh':
-            s.plot(kind='barh', ax=ax, title=title, color=color)
-        elif kind == 'line':
-            s.plot(kind='line', ax=ax, title=title, color=color, marker='o')
-        else:
-            s.plot(kind=kind, ax=ax, title=title, color=color)
-    else:
-        ax.text(0.5, 0.5, 'Sem dados disponíveis', ha='center', va='center', fontsize=12)
-        ax.set_title(title)
-        ax.axis('off')
-    plt.tight_layout()
-    return fig
+# Esquema estrela: a tabela fato fica só com VendedorID/FornecedorID (sem merge);
+# os nomes são resolvidos nas linhas do resultado. O Ano é derivado pelo cubo
+with metricas.etapa('dimensoes'):
+    dimensoes = Dimensoes(['VendedorID', 'FornecedorID'])
+
+# Cards interativos: os mesmos recortes dos cards de imagem, mas com país,
+# categoria e anos escolhidos na tela (filtros iniciais = recorte original)
+CARTOES_FILTRO = {
+    'filtro6': dict(titulo=' Descontos por Vendedor', medida='Desconto', por='VendedorID', cor='skyblue', paises=['USA']),
+    'filtro7': dict(titulo=' Fornecedores por Margem', medida='Margem Bruta', por='FornecedorID', n=10, cor='pink',
+                    horizontal=True, categorias=['Womens wear']),
+    'filtro8': dict(titulo=' Vendas Anuais', medida='Vendas', por='Ano', ordem='rotulo', cor='green', tipo='line'),
+    # Cliente x cidade, como o card de imagem 9
+    'filtro9': dict(titulo=' Top Clientes por Segmento', medida='Vendas', por=('ClienteNome', 'ClienteCidade'), n=10,
+                    cor='purple', categorias=['Men´s Footwear'], anos=(2012, 2012)),
+    # Países europeus: a região 'Europa' de geografia.py, lida dos agregados do cubo a cada versão dos dados
+    'filtro10': dict(titulo=' Vendas por País', medida='Vendas', por='ClientePaís', cor='orange', regiao='Europa'),
+}
+
+# Agregados materializados uma única vez; os cards consultam o cubo em vez de
+# filtrar e reagrupar a tabela fato inteira
+AGRUPAMENTOS = [
+    ('ClientePaís', 'VendedorID'),
+    ('CategoriaNome', 'FornecedorID'),
+    ('Ano',),
+    ('CategoriaNome', 'Ano', 'ClienteNome', 'ClienteCidade'),
+    ('ClientePaís',),
+    *AGRUPAMENTOS_GEOGRAFIA,
+] + agrupamentos_filtros(CARTOES_FILTRO)
+
+# Carregar os arquivos CSV (via cache colunar tipado: datas e medidas já convertidas),
+# só com as colunas que o cubo usa e a chave das linhas
+# (PedidoID, ProdutoID, para a ingestão incremental)
+# (cada etapa da carga é medida e exposta em /metrics, ver metricas.py)
+with metricas.etapa('carga_vendas') as medida:
+    vendas_df = carregar_vendas(colunas=colunas_agrupamentos(AGRUPAMENTOS) | set(CHAVE_LINHA))
+    medida['linhas'] = len(vendas_df)
+
+with metricas.etapa('cubo') as medida:
+    cubo = Cubo(vendas_df, agrupamentos=AGRUPAMENTOS)
+    medida['linhas'] = len(vendas_df)
+    medida['resultado'] = cubo.tamanho()
+
+# Modo de anexação: pedidos novos (final do CSV ou arquivos em csv/deltas/)
+# entram no cubo sem reiniciar o servidor
+with metricas.etapa('ingestor'):
+    ingestor = IngestorIncremental(cubo, vendas_df)
+
+# Versão dos dados usada nas chaves do cache de gráficos (a do instantâneo em uso)
+impressao_dimensoes = impressao_digital(CAMINHO_VENDEDORES, CAMINHO_FORNECEDORES)
+
+def versao_dados():
+    return f'{atualizador.instantaneo().versao}:{impressao_dimensoes}'
+
+# Cubo do instantâneo fixado pelo pedido em andamento
+def cubo_atual():
+    return atualizador.instantaneo().cubo
+
+# Gráficos de uma versão nova, renderizados antes da troca: depois dela, nenhum pedido espera
+def pre_renderizar_graficos(instantaneo):
+    cache_graficos.pre_renderizar(GRAFICOS, versao_dados(), ('png', 'svg'))
+
+# Atualização em segundo plano (atualizacao.py): a ingestão roda numa thread própria e
+# cada versão nova dos dados vira um instantâneo imutável (cópia do cubo + gráficos
+# pré-renderizados), publicado de uma vez; pedidos em andamento terminam com o
+# instantâneo em que começaram, sem reiniciar o servidor. Com vários workers do
+# gunicorn, só um deles ingere e grava cada instantâneo na pasta; os demais o
+# carregam de lá, então todos servem a mesma versão (e os mesmos ETags)
+atualizador = AtualizadorDados(ingestor, construir=pre_renderizar_graficos,
+                               pasta=os.path.join(PASTA_INSTANTANEOS, 'dashboard-678910'))
+
+# Estilo comum dos gráficos deste dashboard (figura maior, layout ajustado)
+ESTILO = dict(figsize=(10, 6), texto_vazio='Sem dados disponíveis', ajustar=True)
+
+# Os gráficos são gerados sob demanda (no primeiro pedido de cada imagem)
+# pela rota /graficos/<id>.<formato> registrada em graficos.registrar_graficos,
+# e não na importação. Cada função calcula só a Series agregada e as opções de
+# plot; a renderização roda no pool de processos de graficos.py
 
 # 6. Vendedores que mais dão descontos nos EUA
-eua_df = vendas_df[vendas_df['ClientePaís'] == 'USA']
-desconto_por_vendedor = eua_df.groupby('VendedorNome')['Desconto'].sum().sort_values(ascending=False)
-fig6 = plot_series_safe(desconto_por_vendedor, kind='bar', title='Vendedores que mais dão descontos nos EUA', color='skyblue')
-img6 = fig_to_base64(fig6)
+def grafico_desconto_vendedor():
+    desconto_por_vendedor = dimensoes.resolver(cubo_atual().consultar('Desconto', ['VendedorID'], {'ClientePaís': 'USA'})).sort_values(ascending=False)
+    return desconto_por_vendedor, dict(kind='bar', title='Vendedores que mais dão descontos nos EUA', color='skyblue', **ESTILO)
 
 # 7. Fornecedores com maior margem de lucro no segmento 'Womens wear'
-womens_df = vendas_df[vendas_df['CategoriaNome'] == 'Womens wear']
-lucro_por_fornecedor = womens_df.groupby('FornecedorNome')['Margem Bruta'].sum().sort_values(ascending=False).head(10)
-fig7 = plot_series_safe(lucro_por_fornecedor, kind='barh', title='Fornecedores com maior margem de lucro - Womens wear', color='pink', horizontal=True)
-img7 = fig_to_base64(fig7)
+def grafico_lucro_fornecedor(n):
+    lucro_fornecedores = dimensoes.resolver(cubo_atual().consultar('Margem Bruta', ['FornecedorID'], {'CategoriaNome': 'Womens wear'}))
+    lucro_por_fornecedor = lucro_fornecedores.sort_values(ascending=False).head(n)
+    return lucro_por_fornecedor, dict(kind='barh', title='Fornecedores com maior margem de lucro - Womens wear', color='pink', horizontal=True, **ESTILO)
 
 # 8. Vendas totais em 2009 e análise entre 2009 e 2012
-vendas_df['Ano'] = vendas_df['Data'].dt.year
-vendas_ano = vendas_df[vendas_df['Ano'].between(2009, 2012, inclusive='both')]
-vendas_por_ano = vendas_ano.groupby('Ano')['Vendas'].sum()
-fig8 = plot_series_safe(vendas_por_ano, kind='line', title='Vendas Anuais (2009-2012)', color='green')
-img8 = fig_to_base64(fig8)
+def grafico_vendas_ano(inicio, fim):
+    vendas_por_ano = cubo_atual().consultar('Vendas', ['Ano'], {'Ano': range(inicio, fim + 1)})
+    return vendas_por_ano, dict(kind='line', title=f'Vendas Anuais ({inicio}-{fim})', color='green', **ESTILO)
 
 # 9. Principais clientes do segmento 'Men´s Footwear' em 2012 e cidades envolvidas
-mens_2012_df = vendas_df[(vendas_df['CategoriaNome'] == 'Men´s Footwear') & (vendas_df['Ano'] == 2012)]
-if not mens_2012_df.empty:
-    clientes_mens_2012 = mens_2012_df.groupby(['ClienteNome', 'ClienteCidade'])['Vendas'].sum().sort_values(ascending=False).head(10)
-else:
-    clientes_mens_2012 = pd.Series(dtype=float)
-fig9 = plot_series_safe(clientes_mens_2012, kind='bar', title='Principais Clientes - Men´s Footwear em 2012', color='purple')
-img9 = fig_to_base64(fig9)
-
-# 10. Vendas por país na Europa
-europa_paises = ['France', 'Germany', 'Italy', 'Spain', 'Portugal', 'Netherlands', 'Belgium', 'Sweden', 'Norway', 'Denmark', 'Finland', 'Austria', 'Switzerland', 'Ireland', 'UK', 'United Kingdom']
-europa_df = vendas_df[vendas_df['ClientePaís'].isin(europa_paises)]
-vendas_por_pais = europa_df.groupby('ClientePaís')['Vendas'].sum().sort_values(ascending=False)
-fig10 = plot_series_safe(vendas_por_pais, kind='bar', title='Vendas por País na Europa', color='orange')
-img10 = fig_to_base64(fig10)
+def grafico_clientes_mens(ano, n):
+    segmento = {'CategoriaNome': 'Men´s Footwear', 'Ano': ano}
+    clientes_mens = cubo_atual().consultar('Vendas', ['ClienteNome', 'ClienteCidade'], segmento).sort_values(ascending=False).head(n)
+    return clientes_mens, dict(kind='bar', title=f'Principais Clientes - Men´s Footwear em {ano}', color='purple', **ESTILO)
+
+# 10. Vendas por país na Europa (agregado Região x País do cubo, sem lista de países)
+def grafico_vendas_europa():
+    vendas_por_pais = detalhar(cubo_atual(), 'Vendas', regiao='Europa')
+    return vendas_por_pais, dict(kind='bar', title='Vendas por País na Europa', color='orange', **ESTILO)
+
+# id do html.Img -> (função geradora, parâmetros); os parâmetros entram na chave do cache
+GRAFICOS = {
+    'img6': (grafico_desconto_vendedor, {}),
+    'img7': (grafico_lucro_fornecedor, {'n': 10}),
+    'img8': (grafico_vendas_ano, {'inicio': 2009, 'fim': 2012}),
+    'img9': (grafico_clientes_mens, {'ano': 2012, 'n': 10}),
+    'img10': (grafico_vendas_europa, {}),
+}
 
 # Criar o app Dash
 app = Dash(__name__)
@@ -118,11 +161,11 @@ app.layout = html.Div(
             children=[
                 html.Div([
                     html.H2(' Vendedores que mais dão descontos nos EUA', style={'color': '#2c3e50', 'fontSize': '22px', 'marginBottom': '15px', 'textAlign': 'center'}),
-                    html.Img(src=img6, style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
+                    html.Img(src=url_grafico(app, 'img6', 'svg'), style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
                 ], style={'backgroundColor': 'white', 'padding': '25px', 'borderRadius': '15px', 'boxShadow': '0 8px 16px rgba(0,0,0,0.2)'}),
                 html.Div([
                     html.H2(' Fornecedores - Maior Margem (Womens wear)', style={'color': '#2c3e50', 'fontSize': '22px', 'marginBottom': '15px', 'textAlign': 'center'}),
-                    html.Img(src=img7, style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
+                    html.Img(src=url_grafico(app, 'img7'), style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
                 ], style={'backgroundColor': 'white', 'padding': '25px', 'borderRadius': '15px', 'boxShadow': '0 8px 16px rgba(0,0,0,0.2)'})
             ]
         ),
@@ -136,11 +179,11 @@ app.layout = html.Div(
             children=[
                 html.Div([
                     html.H2(' Evolução de Vendas Anuais (2009-2012)', style={'color': '#2c3e50', 'fontSize': '22px', 'marginBottom': '15px', 'textAlign': 'center'}),
-                    html.Img(src=img8, style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
+                    html.Img(src=url_grafico(app, 'img8'), style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
                 ], style={'backgroundColor': 'white', 'padding': '25px', 'borderRadius': '15px', 'boxShadow': '0 8px 16px rgba(0,0,0,0.2)'}),
                 html.Div([
                     html.H2(' Top Clientes - Men´s Footwear 2012', style={'color': '#2c3e50', 'fontSize': '22px', 'marginBottom': '15px', 'textAlign': 'center'}),
-                    html.Img(src=img9, style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
+                    html.Img(src=url_grafico(app, 'img9'), style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
                 ], style={'backgroundColor': 'white', 'padding': '25px', 'borderRadius': '15px', 'boxShadow': '0 8px 16px rgba(0,0,0,0.2)'})
             ]
         ),
@@ -149,15 +192,44 @@ app.layout = html.Div(
             children=[
                 html.Div([
                     html.H2(' Vendas por País na Europa', style={'color': '#2c3e50', 'fontSize': '22px', 'marginBottom': '15px', 'textAlign': 'center'}),
-                    html.Img(src=img10, style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
+                    html.Img(src=url_grafico(app, 'img10'), style={'width': '100%', 'borderRadius': '8px', 'boxShadow': '0 2px 8px rgba(0,0,0,0.1)'})
                 ], style={'backgroundColor': 'white', 'padding': '25px', 'borderRadius': '15px', 'boxShadow': '0 8px 16px rgba(0,0,0,0.2)', 'maxWidth': '1100px', 'width': '100%'})
             ]
         ),
+        # (a exportação estática troca a seção 'explorar' por um link para o app)
+        html.Div(id='explorar', children=[
+            armazenamento_filtros(),
+            html.H2(' Explorar por País, Categoria e Ano', style={'textAlign': 'center', 'color': 'white', 'fontSize': '32px', 'marginBottom': '30px'}),
+            html.Div(
+                style={
+                    'display': 'grid',
+                    'gridTemplateColumns': 'repeat(auto-fit, minmax(500px, 1fr))',
+                    'gap': '30px',
+                    'marginBottom': '30px'
+                },
+                children=[cartao_filtros(id_cartao, cartao) for id_cartao, cartao in CARTOES_FILTRO.items()]
+            ),
+        ]),
         html.Div([
             html.P(' 2025 Dashboard de Vendas - Business Intelligence | Análise Avançada', style={'textAlign': 'center', 'color': 'white', 'fontSize': '14px', 'marginTop': '20px', 'opacity': '0.8'})
         ])
     ]
 )
 
+# Gráficos servidos como recursos HTTP (ETag + Cache-Control + 304), renderizados
+# sob demanda com cache LRU (e em disco) por versão dos dados.
+# Gráficos de barras pequenos usam SVG, menor que o PNG equivalente
+cache_graficos = registrar_graficos(app, GRAFICOS, versao_dados)
+
+# Dados dos cards interativos (uma entrega por carga de página, em cache por versão)
+registrar_filtros(app, CARTOES_FILTRO, cubo_atual, versao_dados, dimensoes)
+
+# Duração das etapas, linhas, tamanho dos resultados, bytes por imagem e RSS em
+# /metrics (formato do Prometheus); METRICAS_LOG=1 registra cada requisição no log
+registrar_metricas(app)
+
+# Cada pedido fixa o instantâneo atual; a thread de atualização sobe no primeiro pedido
+atualizador.registrar(app)
+
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from dados import CAMINHO_FORNECEDORES, CAMINHO_TRANSPORTADORAS, CAMINHO_VENDEDORES, carregar_dimensao
+
+# Chave estrangeira na tabela fato -> (arquivo da dimensão, coluna com o nome)
+DIMENSOES = {
+    "VendedorID": (CAMINHO_VENDEDORES, "VendedorNome"),
+    "FornecedorID": (CAMINHO_FORNECEDORES, "FornecedorNome"),
+    "TransportadoraID": (CAMINHO_TRANSPORTADORAS, "TransportadoraNome"),
+}
+
+
+# Esquema estrela: a tabela fato mantém só os IDs inteiros, a agregação é feita
+# sobre eles e os nomes são resolvidos apenas nas poucas linhas do resultado,
+# em vez de mesclar (merge) cada dimensão na tabela fato inteira.
+class Dimensoes:
+    def __init__(self, chaves=None):
+        self.nomes = {}
+        for chave in chaves or DIMENSOES:
+            caminho, coluna = DIMENSOES[chave]
+            tabela = carregar_dimensao(caminho)
+            self.nomes[chave] = pd.Series(tabela[coluna].to_numpy(), index=tabela[chave].to_numpy(), name=coluna)
+
+    # Índice com os IDs trocados pelos nomes da dimensão, linha a linha, e a
+    # máscara das linhas cujos IDs têm nome cadastrado
+    def nomear(self, indice):
+        niveis = list(indice.names)
+        valores = []
+        validos = np.ones(len(indice), dtype=bool)
+        for i, nivel in enumerate(niveis):
+            codigos = indice.get_level_values(i)
+            if nivel in self.nomes:
+                nomes = self.nomes[nivel].reindex(codigos).to_numpy()
+                validos &= pd.notna(nomes)
+                valores.append(nomes)
+                niveis[i] = self.nomes[nivel].name
+            else:
+                valores.append(codigos.to_numpy())
+        if len(niveis) == 1:
+            return pd.Index(valores[0], name=niveis[0]), validos
+        return pd.MultiIndex.from_arrays(valores, names=niveis), validos
+
+    # Troca os IDs do índice de um resultado agregado pelos nomes da dimensão.
+    # IDs sem nome cadastrado são descartados e IDs com o mesmo nome são somados,
+    # como acontecia no merge + groupby por nome. Resolver antes de ordenar/cortar o top-N
+    def resolver(self, serie):
+        niveis = list(serie.index.names)
+        if not any(nivel in self.nomes for nivel in niveis):
+            return serie
+        indice, validos = self.nomear(serie.index)
+        niveis = list(indice.names)
+        resultado = pd.Series(serie.to_numpy(), index=indice, name=serie.name)[validos]
+        if resultado.index.has_duplicates:
+            resultado = resultado.groupby(level=niveis).sum()
+        return resultado
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+# Contadores do SpaceSaving: o erro de cada soma estimada fica abaixo de
+# peso total / (contadores + 1), com memória fixa de `contadores` grupos
+CONTADORES_PADRAO = 1024
+
+# Bits de índice do HyperLogLog: 2^14 registradores de 1 byte (16 KB), erro padrão de ~0,8%
+PRECISAO_HLL = 14
+
+# Linhas somadas por vez no modo aproximado em memória
+LINHAS_POR_LOTE = 65_536
+
+
+# Top-k ponderado em memória limitada (SpaceSaving/Misra-Gries mesclável).
+# Cada lote chega já somado por chave (um agregado parcial, como em blocos.py)
+# e é mesclado aos contadores; quando passam de `contadores`, o (contadores+1)-ésimo
+# maior valor é descontado de todos e os que zeram saem. Com isso, para toda chave,
+#   contagem <= soma real <= contagem + erro
+# e erro <= peso total / (contadores + 1). Exige pesos não negativos.
+class SpaceSaving:
+    def __init__(self, contadores=CONTADORES_PADRAO):
+        self.contadores = contadores
+        self.contagens = None
+        self.erro = 0.0
+        self.total = 0.0
+
+    def atualizar(self, parcial):
+        if len(parcial) == 0:
+            return self
+        if (parcial < 0).any():
+            raise ValueError("O top-N aproximado exige pesos não negativos")
+        self.total += float(parcial.sum())
+        combinado = parcial if self.contagens is None else self.contagens.add(parcial, fill_value=0)
+        if len(combinado) > self.contadores:
+            valores = combinado.to_numpy()
+            posicao = len(valores) - self.contadores - 1
+            corte = float(np.partition(valores, posicao)[posicao])
+            combinado = combinado[combinado > corte] - corte
+            self.erro += corte
+        self.contagens = combinado
+        return self
+
+    # As n maiores chaves com a faixa da soma real [minimo, maximo]. A estimativa é
+    # o máximo (a contagem do SpaceSaving), exata para as chaves que nunca saíram
+    # dos contadores, como costumam ser as maiores. `garantido` marca as chaves que
+    # estão no top-n real qualquer que seja o erro: o mínimo delas supera o máximo
+    # possível de qualquer chave fora da lista
+    def top(self, n):
+        if self.contagens is None:
+            return pd.DataFrame(columns=["estimativa", "minimo", "maximo", "garantido"])
+        candidatos = self.contagens.nlargest(n + 1)
+        limiar = (candidatos.iloc[n] if len(candidatos) > n else 0.0) + self.erro
+        minimo = candidatos.head(n)
+        return pd.DataFrame({
+            "estimativa": minimo + self.erro,
+            "minimo": minimo,
+            "maximo": minimo + self.erro,
+            "garantido": minimo >= limiar,
+        })
+
+    def memoria_bytes(self):
+        return 0 if self.contagens is None else int(self.contagens.memory_usage(deep=True))
+
+
+def _comprimento_bits(valores):
+    comprimento = np.zeros(len(valores), dtype=np.int64)
+    valores = valores.copy()
+    for deslocamento in (32, 16, 8, 4, 2, 1):
+        maior = valores >= (np.uint64(1) << np.uint64(deslocamento))
+        comprimento += deslocamento * maior
+        valores[maior] >>= np.uint64(deslocamento)
+    return comprimento + (valores > 0)
+
+
+# Contagem aproximada de valores distintos (HyperLogLog) com 2^precisao registradores
+# de 1 byte, independente do número de linhas ou de chaves; erro padrão 1,04 / sqrt(2^precisao)
+class HyperLogLog:
+    def __init__(self, precisao=PRECISAO_HLL):
+        self.precisao = precisao
+        self.registradores = np.zeros(1 << precisao, dtype=np.uint8)
+
+    # valores: Series, DataFrame (chave composta) ou Index/MultiIndex
+    def atualizar(self, valores):
+        if len(valores) == 0:
+            return self
+        if isinstance(valores, pd.Index):
+            valores = valores.to_frame(index=False)
+        hashes = pd.util.hash_pandas_object(valores, index=False).to_numpy()
+        resto_bits = 64 - self.precisao
+        indice = (hashes >> np.uint64(resto_bits)).astype(np.intp)
+        resto = hashes & np.uint64((1 << resto_bits) - 1)
+        # Posição do primeiro bit 1 nos bits restantes (zeros à esquerda + 1)
+        posto = (resto_bits - _comprimento_bits(resto) + 1).astype(np.uint8)
+        np.maximum.at(self.registradores, indice, posto)
+        return self
+
+    def estimativa(self):
+        m = len(self.registradores)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        bruta = alfa * m * m / np.sum(np.ldexp(1.0, -self.registradores.astype(np.int64)))
+        vazios = int(np.count_nonzero(self.registradores == 0))
+        # Poucos valores: contagem linear dos registradores vazios é mais precisa
+        if bruta <= 2.5 * m and vazios:
+            return float(m * np.log(m / vazios))
+        return float(bruta)
+
+    def erro_padrao(self):
+        return float(1.04 / np.sqrt(len(self.registradores)))
+
+
+# Resultado do modo aproximado: a Series do top-n (estimativas) e os limites de
+# erro que acompanham o gráfico (faixa por chave, erro máximo, distintos estimados)
+def resultado_aproximado(resumo, distintos, n, medida=None, nomes=None):
+    tabela = resumo.top(n)
+    serie = tabela["estimativa"].rename(medida)
+    if nomes is not None:
+        serie.index.names = nomes
+    tabela.index = serie.index
+    info = {
+        "limites": tabela[["minimo", "maximo", "garantido"]],
+        "erro_maximo": resumo.erro,
+        "peso_total": resumo.total,
+        "garantidos": int(tabela["garantido"].sum()),
+        "contadores": resumo.contadores,
+        "distintos": distintos.estimativa(),
+        "erro_distintos": distintos.erro_padrao(),
+        "memoria_bytes": resumo.memoria_bytes() + distintos.registradores.nbytes,
+    }
+    return serie, info
+
+
+# Top-n aproximado numa única passada sobre linhas já em memória: soma `pesos`
+# por `chaves` (Series, ou DataFrame para chave composta) lote a lote no SpaceSaving
+# e conta as chaves distintas no HyperLogLog. Devolve (Series, limites de erro).
+# Chaves categóricas são somadas pelos códigos inteiros (um groupby por categorias
+# custaria o número de categorias em cada lote) e voltam aos rótulos no resultado;
+# linhas com categoria nula (código -1) ficam de fora, como no groupby do pandas
+def top_aproximado(chaves, pesos, n, contadores=CONTADORES_PADRAO, precisao=PRECISAO_HLL,
+                   linhas_por_lote=LINHAS_POR_LOTE):
+    medida = getattr(pesos, "name", None)
+    chaves = chaves.to_frame() if isinstance(chaves, pd.Series) else chaves
+    nomes = list(chaves.columns)
+    categorias = {c: chaves[c].cat.categories for c in nomes if isinstance(chaves[c].dtype, pd.CategoricalDtype)}
+    colunas = [chaves[c].cat.codes.to_numpy() if c in categorias else chaves[c].to_numpy() for c in nomes]
+    pesos = np.asarray(pesos, dtype=float)
+    if categorias:
+        validas = np.logical_and.reduce([coluna >= 0 for c, coluna in zip(nomes, colunas) if c in categorias])
+        colunas, pesos = [coluna[validas] for coluna in colunas], pesos[validas]
+    pesos = pd.Series(pesos)
+    resumo = SpaceSaving(contadores)
+    distintos = HyperLogLog(precisao)
+    for inicio in range(0, len(pesos), linhas_por_lote):
+        fim = inicio + linhas_por_lote
+        parcial = pesos.iloc[inicio:fim].groupby([coluna[inicio:fim] for coluna in colunas], sort=False).sum()
+        resumo.atualizar(parcial)
+        distintos.atualizar(parcial.index)
+    serie, info = resultado_aproximado(resumo, distintos, n, medida, nomes)
+    if categorias:
+        niveis = [serie.index.get_level_values(i) for i in range(len(nomes))]
+        niveis = [categorias[c].take(nivel) if c in categorias else nivel for c, nivel in zip(nomes, niveis)]
+        indice = pd.MultiIndex.from_arrays(niveis, names=nomes) if len(nomes) > 1 else niveis[0].rename(nomes[0])
+        serie.index = indice
+        info["limites"].index = indice
+    return serie, info
@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from html import escape
+
+import matplotlib
+
+from graficos import renderizador_padrao
+from paineis import DASHBOARDS, RAIZ, carregar_dashboard
+
+# Pasta padrão da exportação: um subdiretório por dashboard, com index.html,
+# graficos/ (imagens com o hash do conteúdo no nome) e manifesto.json
+PASTA_EXPORTACAO = "estatico"
+
+# id da seção interativa dos dashboards (cards com filtros): sem o app Dash ela não
+# funciona, e a página estática mostra no lugar um link para o app, se houver
+ID_INTERATIVO = "explorar"
+
+# src dos html.Img servidos por graficos.registrar_graficos
+ROTA_GRAFICO = re.compile(r"/graficos/(?P<id>[^/.]+)\.(?P<formato>png|svg)$")
+
+# Tags sem fechamento e propriedades do Dash que viram atributos HTML
+TAGS_VAZIAS = {"img", "br", "hr", "input", "meta", "link"}
+ATRIBUTOS = {"id": "id", "className": "class", "src": "src", "href": "href", "title": "title", "alt": "alt",
+             "target": "target"}
+
+# Propriedades de estilo numéricas sem unidade (as demais recebem "px", como no React)
+ESTILOS_SEM_UNIDADE = {"opacity", "zIndex", "fontWeight", "flex", "flexGrow", "flexShrink", "lineHeight", "order"}
+
+
+def _css(estilo):
+    declaracoes = []
+    for nome, valor in (estilo or {}).items():
+        if isinstance(valor, (int, float)) and nome not in ESTILOS_SEM_UNIDADE:
+            valor = f"{valor}px"
+        declaracoes.append(f"{re.sub(r'([A-Z])', lambda m: '-' + m.group(1).lower(), nome)}: {valor}")
+    return "; ".join(declaracoes)
+
+
+def _componentes(no):
+    if isinstance(no, (list, tuple)):
+        for filho in no:
+            yield from _componentes(filho)
+    elif hasattr(no, "to_plotly_json"):
+        yield no
+        yield from _componentes(getattr(no, "children", None))
+
+
+# Gráficos (id, formato) referenciados pelos html.Img do layout, em ordem
+def graficos_do_layout(layout):
+    graficos = []
+    for componente in _componentes(layout):
+        if getattr(componente, "_type", None) == "Img":
+            achado = ROTA_GRAFICO.search(getattr(componente, "src", "") or "")
+            if achado and (achado["id"], achado["formato"]) not in graficos:
+                graficos.append((achado["id"], achado["formato"]))
+    return graficos
+
+
+# HTML de um componente do dash.html. Componentes de outras bibliotecas (dcc) só
+# funcionam com o app e são omitidos; a seção interativa vira `interativo`
+def componente_html(no, imagens, interativo=""):
+    if no is None:
+        return ""
+    if isinstance(no, (list, tuple)):
+        return "".join(componente_html(filho, imagens, interativo) for filho in no)
+    if not hasattr(no, "to_plotly_json"):
+        return escape(str(no))
+    if getattr(no, "_namespace", None) != "dash_html_components":
+        return ""
+    props = no.to_plotly_json()["props"]
+    if props.get("id") == ID_INTERATIVO:
+        return interativo
+    tag = no._type.lower()
+    atributos = []
+    for prop, atributo in ATRIBUTOS.items():
+        valor = props.get(prop)
+        if prop == "src" and valor:
+            achado = ROTA_GRAFICO.search(valor)
+            valor = imagens.get((achado["id"], achado["formato"]), valor) if achado else valor
+        if valor is not None:
+            atributos.append(f' {atributo}="{escape(str(valor))}"')
+    if props.get("style"):
+        atributos.append(f' style="{escape(_css(props["style"]))}"')
+    abertura = f"<{tag}{''.join(atributos)}>"
+    if tag in TAGS_VAZIAS:
+        return abertura
+    return f"{abertura}{componente_html(props.get('children'), imagens, interativo)}</{tag}>"
+
+
+# Página completa: o layout sem o JavaScript do Dash, com a versão dos dados no <head>
+def pagina_html(app, imagens, versao, interativo=""):
+    corpo = componente_html(app.layout, imagens, interativo)
+    return (
+        "<!DOCTYPE html>\n<html lang=\"pt-BR\">\n<head>\n<meta charset=\"utf-8\">\n"
+        "<meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">\n"
+        f"<meta name=\"versao-dados\" content=\"{escape(versao)}\">\n"
+        f"<title>{escape(app.title)}</title>\n<style>body {{ margin: 0; }}</style>\n</head>\n"
+        f"<body>\n{corpo}\n</body>\n</html>\n"
+    )
+
+
+def _link_interativo(url):
+    if not url:
+        return ""
+    estilo = "text-align: center; margin: 30px 0; font-size: 20px"
+    return (f'<p style="{estilo}"><a href="{escape(url)}" style="color: white">'
+            f"🔎 Explorar por País, Categoria e Ano no dashboard interativo</a></p>")
+
+
+# Impressão digital das entradas de um gráfico (Series, opções e formato, mais a
+# versão do matplotlib): igual à da exportação anterior = mesma imagem
+def entrada_grafico(serie, opcoes, formato):
+    conteudo = json.dumps({
+        "serie": None if serie is None else serie.to_json(orient="split", date_format="iso", double_precision=15),
+        "opcoes": opcoes,
+        "formato": formato,
+        "matplotlib": matplotlib.__version__,
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()
+
+
+def _gravar(caminho, conteudo):
+    tmp = f"{caminho}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(conteudo)
+    os.replace(tmp, caminho)
+
+
+def _ler_manifesto(pasta):
+    try:
+        with open(os.path.join(pasta, "manifesto.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# Exporta um dashboard já importado para `pasta`: index.html com o layout e as imagens
+# em graficos/<id>.<hash do conteúdo>.<formato>, que podem ter cache permanente num
+# servidor de arquivos estáticos. O manifesto guarda a versão dos dados e a impressão
+# digital das entradas de cada gráfico; na exportação seguinte só são renderizados os
+# gráficos cujas entradas mudaram, e as imagens que saíram do layout são apagadas
+def exportar_dashboard(dashboard, pasta, url_interativo=None):
+    os.makedirs(os.path.join(pasta, "graficos"), exist_ok=True)
+    anterior = _ler_manifesto(pasta).get("graficos", {})
+    versao = dashboard.versao_dados()
+
+    graficos = {}
+    futuros = {}
+    for id_grafico, formato in graficos_do_layout(dashboard.app.layout):
+        gerar, parametros = dashboard.GRAFICOS[id_grafico]
+        serie, opcoes = gerar(**(parametros or {}))
+        chave = f"{id_grafico}.{formato}"
+        entrada = entrada_grafico(serie, opcoes, formato)
+        antigo = anterior.get(chave)
+        if antigo and antigo["entrada"] == entrada and os.path.exists(os.path.join(pasta, antigo["arquivo"])):
+            graficos[chave] = antigo
+            continue
+        graficos[chave] = {"entrada": entrada}
+        futuros[chave] = dashboard.cache_graficos.renderizador.submeter(serie, opcoes, formato)
+
+    for chave, futuro in futuros.items():
+        imagem = futuro.result()
+        id_grafico, formato = chave.rsplit(".", 1)
+        arquivo = f"graficos/{id_grafico}.{hashlib.sha1(imagem).hexdigest()[:16]}.{formato}"
+        _gravar(os.path.join(pasta, arquivo), imagem)
+        graficos[chave].update(arquivo=arquivo, bytes=len(imagem))
+
+    imagens = {tuple(chave.rsplit(".", 1)): info["arquivo"] for chave, info in graficos.items()}
+    pagina = pagina_html(dashboard.app, imagens, versao, _link_interativo(url_interativo))
+    _gravar(os.path.join(pasta, "index.html"), pagina.encode("utf-8"))
+    manifesto = {"versao": versao, "graficos": graficos, "renderizados": sorted(futuros)}
+    _gravar(os.path.join(pasta, "manifesto.json"), json.dumps(manifesto, ensure_ascii=False, indent=1).encode("utf-8"))
+
+    usados = {os.path.basename(info["arquivo"]) for info in graficos.values()}
+    for nome in os.listdir(os.path.join(pasta, "graficos")):
+        if nome not in usados:
+            os.remove(os.path.join(pasta, "graficos", nome))
+    return manifesto
+
+
+# Exporta os dashboards `nomes` para PASTA_EXPORTACAO/<nome>/.
+# interativos: {nome: URL do app Dash} para o link no lugar da seção interativa
+def exportar(nomes=tuple(DASHBOARDS), pasta=PASTA_EXPORTACAO, interativos=None):
+    pasta = os.path.abspath(pasta)
+    os.chdir(RAIZ)
+    resumo = {}
+    try:
+        for nome in nomes:
+            inicio = time.perf_counter()
+            manifesto = exportar_dashboard(carregar_dashboard(nome), os.path.join(pasta, nome),
+                                           (interativos or {}).get(nome))
+            resumo[nome] = {
+                "versao": manifesto["versao"],
+                "graficos": len(manifesto["graficos"]),
+                "renderizados": manifesto["renderizados"],
+                "segundos": round(time.perf_counter() - inicio, 3),
+            }
+    finally:
+        renderizador_padrao().encerrar()
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportação estática dos dashboards (HTML + imagens com hash)")
+    parser.add_argument("dashboards", nargs="*", default=list(DASHBOARDS),
+                        help=f"dashboards a exportar (padrão: {' '.join(DASHBOARDS)})")
+    parser.add_argument("--saida", default=PASTA_EXPORTACAO, help="pasta de saída")
+    parser.add_argument("--interativo", action="append", default=[], metavar="NOME=URL",
+                        help="URL do app Dash de um dashboard, para o link da seção interativa")
+    args = parser.parse_args(argv)
+
+    interativos = dict(item.split("=", 1) for item in args.interativo)
+    print(json.dumps(exportar(args.dashboards, args.saida, interativos), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
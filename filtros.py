@@ -0,0 +1,194 @@
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from dash import ClientsideFunction, Input, Output, State, dcc, html
+
+from cubo import COLUNA_LINHAS
+from geografia import paises as paises_regiao
+from metricas import metricas
+
+# Dimensões que os cards interativos filtram (país, categoria e faixa de anos)
+DIMENSOES_FILTRO = ("ClientePaís", "CategoriaNome", "Ano")
+
+# Estilo dos cards interativos (o mesmo dos cards de imagem dos dashboards)
+ESTILO_CARTAO = {"backgroundColor": "white", "padding": "25px", "borderRadius": "15px",
+                 "boxShadow": "0 8px 16px rgba(0,0,0,0.2)"}
+ESTILO_TITULO = {"color": "#2c3e50", "fontSize": "22px", "marginBottom": "15px", "textAlign": "center"}
+
+
+# Agrupamentos que o cubo precisa materializar para os cards: (país, categoria,
+# ano) mais as dimensões do eixo de cada card
+def agrupamentos_filtros(cartoes):
+    agrupamentos = [DIMENSOES_FILTRO]
+    for cartao in cartoes.values():
+        dims = _dimensoes_cartao(cartao)
+        if dims not in agrupamentos:
+            agrupamentos.append(dims)
+    return agrupamentos
+
+
+# Dimensões do eixo de um card: `por` é uma dimensão ou uma tupla delas
+def _por(cartao):
+    return (cartao["por"],) if isinstance(cartao["por"], str) else tuple(cartao["por"])
+
+
+def _dimensoes_cartao(cartao):
+    return DIMENSOES_FILTRO + tuple(dim for dim in _por(cartao) if dim not in DIMENSOES_FILTRO)
+
+
+# Rótulo do eixo de cada linha: o valor da dimensão de `por`, ou, com várias,
+# "primeira (demais)" (ex.: "Cliente (Cidade)"). Dimensões fora do filtro podem
+# ter sido renomeadas por Dimensoes.resolver, então são lidas pela posição do nível
+def _rotulos(indice, por):
+    extras = iter(range(len(DIMENSOES_FILTRO), indice.nlevels))
+    niveis = [indice.get_level_values(dim if dim in DIMENSOES_FILTRO else next(extras)).astype(str) for dim in por]
+    if len(niveis) == 1:
+        return niveis[0]
+    return pd.Index([f"{primeiro} ({', '.join(demais)})" for primeiro, *demais in zip(*niveis)])
+
+
+# Domínios dos filtros (países, categorias, anos) a partir do agregado do cubo
+# (ou de outro backend com a mesma interface, como banco.BancoVendas). Sem linhas
+# (extrato vazio, poda de anos sem resultado), a faixa de anos é só o ano atual,
+# para o slider dos cards continuar válido
+def dominios(cubo):
+    indice = cubo.consultar(COLUNA_LINHAS, list(DIMENSOES_FILTRO)).index
+    paises = sorted(str(p) for p in indice.get_level_values("ClientePaís").unique())
+    categorias = sorted(str(c) for c in indice.get_level_values("CategoriaNome").unique())
+    anos = indice.get_level_values("Ano")
+    if len(anos) == 0:
+        return paises, categorias, [date.today().year] * 2
+    return paises, categorias, [int(anos.min()), int(anos.max())]
+
+
+# Dados compactos dos cards interativos, pré-agregados no cubo: para cada card,
+# uma linha por (país, categoria, ano, rótulo) em colunas paralelas com os
+# textos codificados como posições em listas (dicionário). O navegador filtra e
+# soma essas linhas sem voltar ao servidor; os domínios (paises, categorias, anos)
+# também vão aqui, para os controles acompanharem a versão dos dados
+def dados_filtros(cubo, cartoes, dimensoes=None):
+    paises, categorias, anos = dominios(cubo)
+    dados = {"paises": paises, "categorias": categorias, "anos": anos, "cartoes": {}}
+    for id_cartao, cartao in cartoes.items():
+        serie = cubo.consultar(cartao["medida"], list(_dimensoes_cartao(cartao)))
+        if dimensoes is not None:
+            serie = dimensoes.resolver(serie)
+        indice = serie.index
+        rotulos = _rotulos(indice, _por(cartao))
+        dominio_rotulos = pd.Index(rotulos.unique()).sort_values()
+        dados["cartoes"][id_cartao] = {
+            "p": pd.Index(paises).get_indexer(indice.get_level_values("ClientePaís").astype(str)).tolist(),
+            "c": pd.Index(categorias).get_indexer(indice.get_level_values("CategoriaNome").astype(str)).tolist(),
+            "a": indice.get_level_values("Ano").astype(int).tolist(),
+            "r": dominio_rotulos.get_indexer(rotulos).tolist(),
+            "v": np.round(serie.to_numpy(dtype=float), 4).tolist(),
+            "rotulos": dominio_rotulos.tolist(),
+        }
+    return dados
+
+
+# Filtros iniciais de um card (os que ele declara; vazio = todos). Com `regiao`
+# (ex.: "Europa"), os países iniciais são os da região nos agregados de `cubo`,
+# calculados a cada versão dos dados
+def _selecao_inicial(cartao, cubo=None):
+    paises = cartao.get("paises") or []
+    if cartao.get("regiao") and cubo is not None:
+        paises = paises_regiao(cubo, cartao["regiao"])
+    return {
+        "paises": list(paises),
+        "categorias": list(cartao.get("categorias") or []),
+        "anos": list(cartao["anos"]) if cartao.get("anos") else None,
+    }
+
+
+# Card com os filtros próprios (país, categoria, anos) e o gráfico desenhado no navegador.
+# cartao: titulo, medida, por (dimensão ou tupla de dimensões), e opcionalmente n,
+# ordem ("desc", "asc" ou "rotulo"), cor, horizontal, tipo ("bar" ou "line") e os
+# filtros iniciais paises (ou regiao), categorias, anos. O layout não leva domínios: as opções
+# dos dropdowns, a faixa do slider e a seleção inicial chegam com os dados do card
+# (registrar_filtros), da versão dos dados em uso, e não da importação do dashboard
+def cartao_filtros(id_cartao, cartao, estilo=None):
+    selecao = _selecao_inicial(cartao)
+    controles = html.Div([
+        dcc.Dropdown(
+            id=f"{id_cartao}-paises", options=selecao["paises"], value=selecao["paises"],
+            multi=True, placeholder="Todos os países", style={"flex": "1"}
+        ),
+        dcc.Dropdown(
+            id=f"{id_cartao}-categorias", options=selecao["categorias"], value=selecao["categorias"],
+            multi=True, placeholder="Todas as categorias", style={"flex": "1"}
+        ),
+    ], style={"display": "flex", "gap": "10px", "marginBottom": "10px"})
+    return html.Div([
+        html.H2(cartao["titulo"], style=ESTILO_TITULO),
+        controles,
+        dcc.RangeSlider(id=f"{id_cartao}-anos", step=1, value=selecao["anos"]),
+        dcc.Graph(id=f"{id_cartao}-grafico", config={"displayModeBar": False}, style={"height": "420px"}),
+    ], style=estilo or ESTILO_CARTAO)
+
+
+# Registra a entrega dos dados e o redesenho dos cards. Os dados chegam numa
+# única chamada ao servidor na carga da página (em cache por versão dos dados) e
+# preenchem os controles de cada card (assets/filtros.js, controles); cada
+# mudança de filtro é respondida por assets/filtros.js no navegador, sem
+# ida ao servidor e sem renderização no matplotlib.
+# cubo: Cubo ou função que devolve o cubo atual; versao: texto ou função que
+# devolve a versão atual dos dados
+def registrar_filtros(app, cartoes, cubo, versao, dimensoes=None, id_dados="dados-filtros"):
+    cache = {}
+    trava = threading.Lock()
+
+    @app.callback(Output(id_dados, "data"), Input(f"{id_dados}-local", "pathname"))
+    def entregar_dados(_):
+        atual = versao() if callable(versao) else versao
+        with trava:
+            if cache.get("versao") != atual:
+                base = cubo() if callable(cubo) else cubo
+                with metricas.etapa("filtros_dados") as medida:
+                    dados = dados_filtros(base, cartoes, dimensoes)
+                    medida["resultado"] = sum(len(c["v"]) for c in dados["cartoes"].values())
+                cache["dados"] = dict(dados, opcoes={
+                    id_cartao: {
+                        "titulo": cartao["titulo"],
+                        "n": cartao.get("n"),
+                        "ordem": cartao.get("ordem", "desc"),
+                        "cor": cartao.get("cor", "#1f77b4"),
+                        "horizontal": cartao.get("horizontal", False),
+                        "tipo": cartao.get("tipo", "bar"),
+                        **_selecao_inicial(cartao, base),
+                    }
+                    for id_cartao, cartao in cartoes.items()
+                })
+                cache["versao"] = atual
+            return cache["dados"]
+
+    for id_cartao in cartoes:
+        app.clientside_callback(
+            ClientsideFunction(namespace="filtros", function_name="controles"),
+            Output(f"{id_cartao}-paises", "options"),
+            Output(f"{id_cartao}-paises", "value"),
+            Output(f"{id_cartao}-categorias", "options"),
+            Output(f"{id_cartao}-categorias", "value"),
+            Output(f"{id_cartao}-anos", "min"),
+            Output(f"{id_cartao}-anos", "max"),
+            Output(f"{id_cartao}-anos", "marks"),
+            Output(f"{id_cartao}-anos", "value"),
+            Input(id_dados, "data"),
+            State(f"{id_cartao}-grafico", "id"),
+        )
+        app.clientside_callback(
+            ClientsideFunction(namespace="filtros", function_name="figura"),
+            Output(f"{id_cartao}-grafico", "figure"),
+            Input(f"{id_cartao}-paises", "value"),
+            Input(f"{id_cartao}-categorias", "value"),
+            Input(f"{id_cartao}-anos", "value"),
+            Input(id_dados, "data"),
+            State(f"{id_cartao}-grafico", "id"),
+        )
+
+
+# Componentes que carregam os dados dos cards (a Store e a URL que dispara a entrega)
+def armazenamento_filtros(id_dados="dados-filtros"):
+    return html.Div([dcc.Location(id=f"{id_dados}-local"), dcc.Store(id=id_dados)])
@@ -0,0 +1,56 @@
+# Região de cada país, pelo código ISO 3166-1 alfa-3 de ClientePaísID. É a única
+# definição de "Europa" do projeto (questão 10, dashboard 678910, benchmark): pelo
+# código, e não pelo nome, para não depender de grafias como "UK"/"United Kingdom"
+REGIOES = {
+    "Europa": ["AUT", "BEL", "CHE", "DEU", "DNK", "ESP", "FIN", "FRA", "GBR", "IRL", "ITA", "NLD", "NOR", "POL",
+               "PRT", "SWE"],
+    "América do Norte": ["CAN", "MEX", "USA"],
+    "América do Sul": ["ARG", "BRA", "VEN"],
+}
+
+# Região dos países sem região cadastrada
+OUTRAS_REGIOES = "Outras"
+
+REGIAO_POR_PAIS = {codigo: regiao for regiao, codigos in REGIOES.items() for codigo in codigos}
+
+# Códigos dos países europeus (filtro em ClientePaísID)
+PAISES_EUROPEUS = REGIOES["Europa"]
+
+# Hierarquia geográfica, do nível mais alto ao mais baixo
+NIVEIS_GEOGRAFIA = ("Região", "ClientePaís", "ClienteCidade")
+
+# Agregados da hierarquia (rollups) para o cubo: total por região, países de cada
+# região e cidades de cada país. O código do país acompanha o nome nos dois últimos
+# níveis, para o detalhamento aceitar qualquer um dos dois
+AGRUPAMENTOS_GEOGRAFIA = [
+    ("Região",),
+    ("Região", "ClientePaísID", "ClientePaís"),
+    ("Região", "ClientePaísID", "ClientePaís", "ClienteCidade"),
+]
+
+
+# Coluna "Região" a partir de ClientePaísID; países fora de REGIOES ficam em
+# OUTRAS_REGIOES e linhas sem país continuam sem região. Em colunas categóricas
+# o mapeamento é feito só nas categorias
+def regioes(codigos):
+    regiao = codigos.map(REGIAO_POR_PAIS)
+    return regiao.astype(object).where(regiao.notna() | codigos.isna(), OUTRAS_REGIOES).rename("Região")
+
+
+# Países de uma região (nomes, em ordem alfabética) segundo os agregados do cubo
+def paises(cubo, regiao):
+    return sorted(str(p) for p in cubo.consultar("Vendas", ["ClientePaís"], {"Região": regiao}).index)
+
+
+# Detalhamento da hierarquia respondido pelos agregados do cubo (sem varrer a
+# tabela fato): sem argumentos, `medida` por região; com `regiao`, por país da
+# região; com `pais` (nome ou código), por cidade do país. Em ordem decrescente
+def detalhar(cubo, medida="Vendas", regiao=None, pais=None):
+    if pais is not None:
+        coluna = "ClientePaísID" if pais in REGIAO_POR_PAIS else "ClientePaís"
+        serie = cubo.consultar(medida, ["ClienteCidade"], {coluna: pais})
+    elif regiao is not None:
+        serie = cubo.consultar(medida, ["ClientePaís"], {"Região": regiao})
+    else:
+        serie = cubo.consultar(medida, ["Região"])
+    return serie.sort_values(ascending=False)
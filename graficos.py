@@ -0,0 +1,310 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+from flask import abort, make_response, request
+
+from metricas import metricas
+from renderizacao import renderizar
+
+# Pasta padrão do cache em disco dos gráficos (vazio desativa o nível em disco)
+PASTA_CACHE_GRAFICOS = os.environ.get("CACHE_GRAFICOS_DIR", "csv/.cache/graficos")
+
+# Tamanho máximo (MB) do cache em disco dos gráficos. Cada versão nova dos dados
+# grava imagens novas; acima do limite, as usadas há mais tempo são apagadas
+MAX_MB_CACHE_GRAFICOS = float(os.environ.get("CACHE_GRAFICOS_MAX_MB", 256))
+
+# Ao passar do limite, o cache em disco é podado até esta fração dele
+FRACAO_PODA_GRAFICOS = 0.8
+
+# Cache-Control das imagens servidas. O padrão obriga o navegador a revalidar
+# (If-None-Match -> 304 sem corpo), para que dados novos apareçam na hora
+CACHE_CONTROL_GRAFICOS = os.environ.get("CACHE_GRAFICOS_CONTROL", "public, no-cache")
+
+# Formatos servidos pela rota de gráficos
+TIPOS_MIME = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Processos do pool de renderização (0 renderiza no próprio processo, na thread que pediu)
+PROCESSOS_GRAFICOS = int(os.environ.get("PROCESSOS_GRAFICOS", min(4, os.cpu_count() or 1)))
+
+
+# Inicializador dos processos do pool: matplotlib importado com o backend Agg e
+# uma figura descartável renderizada, para carregar fontes e caches antes do primeiro pedido
+def _aquecer_processo():
+    matplotlib.use("Agg")
+    renderizar(None, {})
+
+
+def _processo_pronto():
+    return os.getpid()
+
+
+# Executor de renderização: as Series pequenas são calculadas no processo pai e
+# enviadas a um pool de processos que devolvem os bytes da imagem. A rasterização
+# do matplotlib é CPU-bound e presa ao GIL; com processos, gráficos diferentes
+# renderizam em paralelo e o tempo total escala com o número de núcleos.
+# Os processos sobem (e aquecem) na criação, antes de o servidor abrir threads.
+# Num processo filho criado por fork (ex.: workers do gunicorn com --preload),
+# o pool herdado não funciona e é recriado no primeiro uso
+class RenderizadorParalelo:
+    def __init__(self, processos=PROCESSOS_GRAFICOS):
+        self.processos = processos
+        self._pool = None
+        self._trava = threading.Lock()
+        self._iniciar()
+
+    def _iniciar(self):
+        self._pid = os.getpid()
+        if self.processos > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.processos, initializer=_aquecer_processo)
+            for futuro in [self._pool.submit(_processo_pronto) for _ in range(self.processos)]:
+                futuro.result()
+
+    # Devolve um Future com os bytes da imagem
+    def submeter(self, serie, opcoes, formato="png"):
+        if self._pool is not None and self._pid != os.getpid():
+            with self._trava:
+                if self._pid != os.getpid():
+                    self._iniciar()
+        if self._pool is not None:
+            return self._pool.submit(renderizar, serie, opcoes, formato)
+        # Sem pool: renderizacao.py não usa o pyplot, então threads do servidor
+        # renderizam em paralelo, cada uma com o seu molde de figura
+        futuro = Future()
+        try:
+            futuro.set_result(renderizar(serie, opcoes, formato))
+        except Exception as erro:
+            futuro.set_exception(erro)
+        return futuro
+
+    def encerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+_renderizador = None
+_trava_renderizador = threading.Lock()
+
+
+# Renderizador compartilhado do processo, criado no primeiro uso
+def renderizador_padrao():
+    global _renderizador
+    with _trava_renderizador:
+        if _renderizador is None:
+            _renderizador = RenderizadorParalelo()
+        return _renderizador
+
+
+# Chave do cache: (id do gráfico, parâmetros, impressão digital dos dados, formato)
+def chave_grafico(id_grafico, parametros, impressao, formato="png"):
+    params = json.dumps(parametros or {}, sort_keys=True, default=str)
+    return (id_grafico, params, impressao, formato)
+
+
+# Cache LRU limitado de PNGs renderizados, com nível opcional em disco
+# para sobreviver a reinícios do servidor. O nível em disco também é LRU, pelo
+# mtime dos arquivos (renovado a cada leitura) e limitado a max_bytes_disco: as
+# imagens de versões antigas dos dados deixam de ser lidas e saem primeiro.
+# Vários processos podem dividir a pasta; cada um estima o total e, quando passa
+# do limite, mede a pasta de novo e apaga os arquivos mais antigos
+class CacheGraficos:
+    def __init__(self, max_itens=64, pasta=PASTA_CACHE_GRAFICOS, renderizador=None,
+                 max_bytes_disco=int(MAX_MB_CACHE_GRAFICOS * 2 ** 20)):
+        self.max_itens = max_itens
+        self.pasta = pasta or None
+        self.max_bytes_disco = max_bytes_disco
+        self.renderizador = renderizador or renderizador_padrao()
+        self._itens = OrderedDict()
+        self._pendentes = {}
+        self._trava = threading.Lock()
+        self._trava_disco = threading.Lock()
+        self._bytes_disco = 0
+        if self.pasta:
+            os.makedirs(self.pasta, exist_ok=True)
+            self._bytes_disco = sum(tamanho for _, tamanho, _ in self._arquivos_disco())
+
+    def _arquivo(self, chave):
+        nome = hashlib.sha1(repr(chave).encode("utf-8")).hexdigest()
+        return os.path.join(self.pasta, f"{nome}.{chave[-1]}")
+
+    def obter(self, chave):
+        with self._trava:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                return self._itens[chave]
+        if self.pasta:
+            arquivo = self._arquivo(chave)
+            try:
+                with open(arquivo, "rb") as f:
+                    png = f.read()
+                os.utime(arquivo)
+            except OSError:
+                return None
+            self._guardar_memoria(chave, png)
+            return png
+        return None
+
+    def guardar(self, chave, png):
+        self._guardar_memoria(chave, png)
+        if self.pasta:
+            arquivo = self._arquivo(chave)
+            tmp = f"{arquivo}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp, "wb") as f:
+                    f.write(png)
+                os.replace(tmp, arquivo)
+            except OSError:
+                return
+            with self._trava_disco:
+                self._bytes_disco += len(png)
+                if self._bytes_disco > self.max_bytes_disco:
+                    self._podar_disco()
+
+    # (mtime, tamanho, caminho) das imagens gravadas na pasta
+    def _arquivos_disco(self):
+        arquivos = []
+        with os.scandir(self.pasta) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith(".tmp") or not entrada.is_file():
+                    continue
+                try:
+                    st = entrada.stat()
+                except OSError:
+                    continue
+                arquivos.append((st.st_mtime_ns, st.st_size, entrada.path))
+        return arquivos
+
+    # Apaga as imagens usadas há mais tempo até a pasta ficar em FRACAO_PODA_GRAFICOS do limite
+    def _podar_disco(self):
+        arquivos = sorted(self._arquivos_disco())
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        apagados = 0
+        for _, tamanho, caminho in arquivos:
+            if total <= self.max_bytes_disco * FRACAO_PODA_GRAFICOS:
+                break
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+            total -= tamanho
+            apagados += 1
+        self._bytes_disco = total
+        metricas.contar("cache_graficos_disco_apagados_total", apagados, "Imagens apagadas do cache em disco")
+
+    def _guardar_memoria(self, chave, png):
+        with self._trava:
+            self._itens[chave] = png
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    # Devolve a imagem do cache ou renderiza na primeira vez: gerar(**parametros)
+    # devolve (Series, opções de plot), calculada aqui, e o renderizador produz os
+    # bytes. Pedidos simultâneos da mesma chave esperam a mesma renderização;
+    # chaves diferentes renderizam em paralelo
+    def obter_ou_renderizar(self, id_grafico, gerar, parametros, impressao, formato="png"):
+        chave = chave_grafico(id_grafico, parametros, impressao, formato)
+        imagem = self.obter(chave)
+        if imagem is not None:
+            metricas.contar("cache_graficos_total", 1, "Pedidos ao cache de gráficos", resultado="acerto")
+            return imagem
+        metricas.contar("cache_graficos_total", 1, "Pedidos ao cache de gráficos", resultado="falha")
+        with self._trava:
+            pendente = self._pendentes.get(chave)
+            if pendente is None:
+                self._pendentes[chave] = futuro = Future()
+        if pendente is not None:
+            return pendente.result()
+        try:
+            imagem = self.obter(chave)
+            if imagem is None:
+                serie, opcoes = _gerar_serie(id_grafico, gerar, parametros)
+                with metricas.etapa("renderizacao", grafico=id_grafico, formato=formato):
+                    imagem = self.renderizador.submeter(serie, opcoes, formato).result()
+                _medir_imagem(id_grafico, formato, imagem)
+                self.guardar(chave, imagem)
+            futuro.set_result(imagem)
+        except Exception as erro:
+            futuro.set_exception(erro)
+            raise
+        finally:
+            with self._trava:
+                del self._pendentes[chave]
+        return imagem
+
+    # Renderiza de uma vez os gráficos que faltam no cache: todas as Series são
+    # calculadas aqui e as imagens renderizadas em paralelo pelo pool.
+    # graficos: {id: (função geradora, parâmetros)}; devolve {(id, formato): bytes}
+    def pre_renderizar(self, graficos, impressao, formatos=("png",)):
+        imagens = {}
+        futuros = {}
+        for id_grafico, (gerar, parametros) in graficos.items():
+            serie = None
+            for formato in formatos:
+                chave = chave_grafico(id_grafico, parametros, impressao, formato)
+                imagem = self.obter(chave)
+                if imagem is not None:
+                    imagens[(id_grafico, formato)] = imagem
+                    continue
+                if serie is None:
+                    serie, opcoes = _gerar_serie(id_grafico, gerar, parametros)
+                futuros[(id_grafico, formato)] = (chave, self.renderizador.submeter(serie, opcoes, formato))
+        with metricas.etapa("pre_renderizacao") as medida:
+            for (id_grafico, formato), (chave, futuro) in futuros.items():
+                imagens[(id_grafico, formato)] = futuro.result()
+                _medir_imagem(id_grafico, formato, imagens[(id_grafico, formato)])
+                self.guardar(chave, imagens[(id_grafico, formato)])
+            medida["resultado"] = len(futuros)
+        return imagens
+
+
+# Calcula a Series de um gráfico medindo a duração e o tamanho do resultado
+def _gerar_serie(id_grafico, gerar, parametros):
+    with metricas.etapa("serie", grafico=id_grafico) as medida:
+        serie, opcoes = gerar(**(parametros or {}))
+        medida["resultado"] = 0 if serie is None else len(serie)
+    return serie, opcoes
+
+
+def _medir_imagem(id_grafico, formato, imagem):
+    metricas.definir("grafico_bytes", len(imagem), "Bytes da última imagem renderizada",
+                     grafico=id_grafico, formato=formato)
+
+
+# URL do gráfico no servidor do app (respeita o prefixo de rotas do Dash)
+def url_grafico(app, id_grafico, formato="png"):
+    return app.get_relative_path(f"/graficos/{id_grafico}.{formato}")
+
+
+# Registra a rota GET <prefixo>/graficos/<id>.<png|svg> no servidor Flask do app.
+# Cada gráfico é um recurso próprio que o navegador pode guardar em cache: a
+# resposta leva ETag com o hash do conteúdo e Cache-Control, e um GET
+# condicional (If-None-Match) com o mesmo ETag recebe 304 sem corpo.
+# A imagem só é renderizada no primeiro pedido, e não na importação.
+# graficos: {id do gráfico: (função que devolve (Series, opções de plot), parâmetros)}
+# impressao: versão dos dados (texto) ou função que devolve a versão atual
+def registrar_graficos(app, graficos, impressao, cache=None):
+    cache = cache or CacheGraficos()
+    rota = app.config.routes_pathname_prefix + "graficos/<id_grafico>.<formato>"
+
+    def servir_grafico(id_grafico, formato):
+        if id_grafico not in graficos or formato not in TIPOS_MIME:
+            abort(404)
+        gerar, parametros = graficos[id_grafico]
+        versao = impressao() if callable(impressao) else impressao
+        imagem = cache.obter_ou_renderizar(id_grafico, gerar, parametros, versao, formato)
+        resposta = make_response(imagem)
+        resposta.mimetype = TIPOS_MIME[formato]
+        resposta.headers["Cache-Control"] = CACHE_CONTROL_GRAFICOS
+        resposta.set_etag(hashlib.sha1(imagem).hexdigest()[:20])
+        return resposta.make_conditional(request)
+
+    app.server.add_url_rule(rota, endpoint=f"graficos_{id(app)}", view_func=servir_grafico)
+    return cache
@@ -0,0 +1,14 @@
+import os
+
+# Configuração de produção dos dashboards (ver wsgi.py)
+wsgi_app = "wsgi:server"
+bind = os.environ.get("BIND", "0.0.0.0:8050")
+
+# Importa o dashboard (dados, cubo, gráficos) uma vez no mestre e compartilha com os workers
+preload_app = True
+
+workers = int(os.environ.get("WEB_CONCURRENCY", min(4, os.cpu_count() or 1)))
+worker_class = "gthread"
+threads = int(os.environ.get("THREADS", 4))
+timeout = 60
+keepalive = 5
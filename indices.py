@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# Colunas de filtro de baixa cardinalidade indexadas na carga ("Ano" é derivado de "Data")
+COLUNAS_INDEXADAS = ["ClientePaís", "ClientePaísID", "CategoriaNome", "Ano"]
+
+
+# Índice bitmap de uma coluna: para cada valor distinto, um bitmap compactado
+# (np.packbits, 1 bit por linha) das linhas com esse valor. Um filtro de
+# igualdade vira uma consulta ao dicionário e um isin vira o OR dos bitmaps,
+# sem comparar strings linha a linha. Na construção a coluna só é fatorada em
+# códigos inteiros (colunas categóricas já os têm); o bitmap de cada valor é
+# montado na primeira consulta a ele e guardado, então indexar uma coluna custa
+# pouco mais que uma comparação mesmo quando só um valor é consultado
+class IndiceBitmap:
+    def __init__(self, serie):
+        self.linhas = len(serie)
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            self._codigos = serie.cat.codes.to_numpy()
+            valores = serie.cat.categories
+        else:
+            self._codigos, valores = pd.factorize(serie, sort=True)
+        self._posicoes = {valor: i for i, valor in enumerate(np.asarray(valores).tolist())}
+        self.bitmaps = {}
+        self._vazio = np.zeros((self.linhas + 7) // 8, dtype=np.uint8)
+
+    def _bitmap(self, valor):
+        if valor not in self._posicoes:
+            return None
+        if valor not in self.bitmaps:
+            self.bitmaps[valor] = np.packbits(self._codigos == self._posicoes[valor])
+        return self.bitmaps[valor]
+
+    # Bitmap das linhas iguais a `valor` (ou a qualquer um dos valores de uma coleção)
+    def bitmap(self, valor):
+        if isinstance(valor, (list, tuple, set, frozenset, range)):
+            presentes = [b for b in map(self._bitmap, valor) if b is not None]
+            if not presentes:
+                return self._vazio
+            return np.bitwise_or.reduce(presentes) if len(presentes) > 1 else presentes[0]
+        bitmap = self._bitmap(valor)
+        return self._vazio if bitmap is None else bitmap
+
+    def tamanho_bytes(self):
+        return sum(b.nbytes for b in self.bitmaps.values())
+
+
+# Índices bitmap das colunas de filtro da tabela fato, construídos uma vez na
+# carga. Filtros compostos (categoria E país E ano) viram AND dos bitmaps
+# compactados, e só o resultado é expandido na máscara booleana da agregação
+class IndicesVendas:
+    def __init__(self, vendas, colunas=COLUNAS_INDEXADAS):
+        self.linhas = len(vendas)
+        self.indices = {}
+        for coluna in colunas:
+            if coluna == "Ano" and "Ano" not in vendas and "Data" in vendas:
+                self.indices[coluna] = IndiceBitmap(vendas["Data"].dt.year)
+            elif coluna in vendas:
+                self.indices[coluna] = IndiceBitmap(vendas[coluna])
+
+    def __contains__(self, coluna):
+        return coluna in self.indices
+
+    def bitmap(self, coluna, valor):
+        return self.indices[coluna].bitmap(valor)
+
+    # AND dos bitmaps de {coluna: valor} (todas as colunas precisam estar indexadas)
+    def bitmap_filtros(self, filtros):
+        resultado = None
+        for coluna, valor in filtros.items():
+            bitmap = self.bitmap(coluna, valor)
+            resultado = bitmap if resultado is None else resultado & bitmap
+        return resultado
+
+    # Expande um bitmap compactado na máscara booleana usada para filtrar as linhas
+    def mascara(self, bitmap):
+        return np.unpackbits(bitmap, count=self.linhas).view(bool)
+
+    def tamanho_bytes(self):
+        return sum(indice.tamanho_bytes() for indice in self.indices.values())
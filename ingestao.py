@@ -0,0 +1,218 @@
+import glob
+import hashlib
+import itertools
+import os
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+
+from dados import CAMINHO_VENDAS, carregar_vendas, concatenar, hash_arquivo, ler_vendas
+
+# Pasta onde arquivos delta (mesmo formato do VendasGlobais.csv) podem ser depositados
+PASTA_DELTAS = "csv/deltas"
+
+# Política para uma linha já ingerida: ignorar a linha nova ou substituir a antiga
+REJEITAR = "rejeitar"
+SUBSTITUIR = "substituir"
+
+# Chave de uma linha de pedido. Um pedido tem várias linhas (uma por produto), que
+# podem chegar em lotes diferentes (duas leituras da cauda, dois deltas): só a mesma
+# (PedidoID, ProdutoID) conta como repetida, e as outras linhas do pedido entram
+# normalmente. Um pedido corrigido é reenviado linha a linha; linhas que não vêm de
+# novo continuam como estavam. A tabela inicial precisa ter essas colunas
+CHAVE_LINHA = ("PedidoID", "ProdutoID")
+
+
+# Modo de anexação: acompanha o crescimento do VendasGlobais.csv (novas linhas no
+# final do arquivo) e arquivos delta em PASTA_DELTAS, lê apenas as linhas novas e
+# atualiza os agregados do cubo no lugar. O custo de cada atualização é
+# proporcional ao lote novo, e não ao histórico.
+class IngestorIncremental:
+    def __init__(self, cubo, vendas, caminho=CAMINHO_VENDAS, preparar=None,
+                 pasta_deltas=PASTA_DELTAS, duplicados=REJEITAR, intervalo_minimo=2.0):
+        if duplicados not in (REJEITAR, SUBSTITUIR):
+            raise ValueError(f"duplicados deve ser '{REJEITAR}' ou '{SUBSTITUIR}'")
+        self.cubo = cubo
+        self.caminho = caminho
+        self.preparar = preparar or (lambda df: df)
+        self.pasta_deltas = pasta_deltas
+        self.duplicados = duplicados
+        self.intervalo_minimo = intervalo_minimo
+        self._trava = threading.Lock()
+        self._ultima_verificacao = 0.0
+        self._iniciar(vendas)
+
+    # Estado a partir de uma tabela fato completa (carga inicial ou recarga).
+    # A cauda começa onde a leitura da tabela parou (vendas.attrs["fonte"], gravado
+    # por dados.carregar_tabela), então linhas anexadas entre a carga e a criação do
+    # ingestor entram no primeiro lote. Tabela sem essa informação: vale o arquivo agora
+    def _iniciar(self, vendas, fonte=None):
+        # Lotes novos ficam só com as colunas da tabela inicial (que pode ter sido
+        # carregada com projeção de colunas)
+        faltando = [col for col in CHAVE_LINHA if col not in vendas.columns]
+        if faltando:
+            raise KeyError(f"Colunas da chave das linhas ausentes na tabela: {faltando}")
+        self.colunas = list(vendas.columns)
+        fonte = fonte or vendas.attrs.get("fonte") or {
+            "tamanho": os.stat(self.caminho).st_size, "sha1": hash_arquivo(self.caminho),
+        }
+        self._offset = fonte["tamanho"]
+        self._cabecalho = self._ler_cabecalho()
+        self._deltas_lidos = set()
+        self.partes = []
+        self._excluidos = []
+        self.linhas = {}
+        self._registrar_parte(vendas)
+        self._historico = hashlib.sha1(fonte["sha1"].encode("ascii"))
+        self.versao = self._historico.hexdigest()
+
+    def _ler_cabecalho(self):
+        with open(self.caminho, "rb") as f:
+            return f.readline()
+
+    # Guarda a parte e o índice chave da linha -> (parte, posição)
+    def _registrar_parte(self, df):
+        indice = len(self.partes)
+        self.partes.append(df)
+        self._excluidos.append(np.zeros(len(df), dtype=bool))
+        self.linhas.update(zip(self._chaves(df), zip(itertools.repeat(indice), range(len(df)))))
+
+    def _chaves(self, df):
+        return zip(*(df[col].tolist() for col in CHAVE_LINHA))
+
+    # Lê as linhas anexadas ao CSV desde a última leitura (só até a última quebra de linha completa)
+    def _ler_cauda(self):
+        st = os.stat(self.caminho)
+        if st.st_size == self._offset:
+            return None
+        if st.st_size < self._offset or self._ler_cabecalho() != self._cabecalho:
+            # Arquivo truncado ou reescrito: não é anexação, é preciso recarregar
+            raise _ArquivoReescrito()
+        with open(self.caminho, "rb") as f:
+            f.seek(self._offset)
+            cauda = f.read(st.st_size - self._offset)
+        fim = cauda.rfind(b"\n") + 1
+        if fim == 0:
+            return None
+        inicio = self._offset
+        self._offset += fim
+        colunas = ler_vendas(BytesIO(self._cabecalho), nrows=0).columns.tolist()
+        lote = ler_vendas(BytesIO(cauda[:fim]), header=None, names=colunas)
+        return lote, f"cauda:{inicio}:{self._offset}"
+
+    def _novos_deltas(self):
+        if not self.pasta_deltas or not os.path.isdir(self.pasta_deltas):
+            return []
+        novos = []
+        for arquivo in sorted(glob.glob(os.path.join(self.pasta_deltas, "*.csv"))):
+            st = os.stat(arquivo)
+            chave = (os.path.basename(arquivo), st.st_mtime_ns, st.st_size)
+            if chave not in self._deltas_lidos:
+                novos.append((arquivo, chave))
+        return novos
+
+    # Aplica um lote: trata linhas já conhecidas (CHAVE_LINHA) e soma as aceitas no cubo.
+    # Linhas sem chave são descartadas e contadas em "sem_chave"; a mesma chave
+    # repetida dentro do lote fica uma vez só (a primeira ao rejeitar, a última ao
+    # substituir) e as demais contam como rejeitadas.
+    # Um lote que não muda nada (vazio, todo rejeitado ou vazio depois de `preparar`)
+    # não entra no histórico, e a versão continua a mesma. Com substituições, os
+    # grupos do cubo tocados pelas linhas antigas ou novas são recalculados a partir
+    # das partes atuais (Cubo.recalcular) em vez de subtraídos e somados
+    def _aplicar(self, lote, descricao):
+        resumo = {"linhas": 0, "rejeitadas": 0, "substituidas": 0, "sem_chave": 0}
+        com_chave = lote[list(CHAVE_LINHA)].notna().all(axis=1).to_numpy()
+        resumo["sem_chave"] = int((~com_chave).sum())
+        lote = lote[com_chave]
+        if len(lote) == 0:
+            return resumo
+        manter = "first" if self.duplicados == REJEITAR else "last"
+        repetidas = lote.duplicated(list(CHAVE_LINHA), keep=manter).to_numpy()
+        if repetidas.any():
+            resumo["rejeitadas"] = int(repetidas.sum())
+            lote = lote[~repetidas]
+
+        # Consulta no dicionário de linhas: O(lote), sem percorrer o histórico
+        chaves = list(self._chaves(lote))
+        conhecidas = np.fromiter((chave in self.linhas for chave in chaves), dtype=bool, count=len(chaves))
+        removidas = []
+        if conhecidas.any():
+            if self.duplicados == REJEITAR:
+                resumo["rejeitadas"] += int(conhecidas.sum())
+                lote = lote[~conhecidas]
+                if len(lote) == 0:
+                    return resumo
+            else:
+                antigas = {}
+                for chave in itertools.compress(chaves, conhecidas):
+                    indice, posicao = self.linhas.pop(chave)
+                    antigas.setdefault(indice, []).append(posicao)
+                for indice, posicoes in antigas.items():
+                    posicoes = np.sort(posicoes)
+                    removidas.append(self.partes[indice].iloc[posicoes])
+                    self._excluidos[indice][posicoes] = True
+                    resumo["substituidas"] += len(posicoes)
+
+        lote = self.preparar(lote[[col for col in self.colunas if col in lote]].reset_index(drop=True))
+        if len(lote) == 0 and not removidas:
+            return resumo
+        self._registrar_parte(lote)
+        if removidas:
+            self.cubo.recalcular(self._ativas(), concatenar(removidas + [lote]))
+        else:
+            self.cubo.adicionar(lote)
+        resumo["linhas"] = len(lote)
+        self._historico.update(descricao.encode("utf-8"))
+        self.versao = self._historico.hexdigest()
+        return resumo
+
+    # Verifica cauda do CSV e pasta de deltas; devolve o resumo do que foi ingerido.
+    # Chamadas mais próximas que intervalo_minimo segundos não fazem nada (forcar=True ignora)
+    def atualizar(self, forcar=False):
+        with self._trava:
+            agora = time.monotonic()
+            if not forcar and agora - self._ultima_verificacao < self.intervalo_minimo:
+                return None
+            self._ultima_verificacao = agora
+
+            total = {"linhas": 0, "rejeitadas": 0, "substituidas": 0, "sem_chave": 0, "recarregado": False}
+            lotes = []
+            try:
+                cauda = self._ler_cauda()
+            except _ArquivoReescrito:
+                self._recarregar()
+                total["recarregado"] = True
+                cauda = None
+            if cauda is not None:
+                lotes.append(cauda)
+            for arquivo, chave in self._novos_deltas():
+                lotes.append((ler_vendas(arquivo), "delta:" + ":".join(map(str, chave))))
+                self._deltas_lidos.add(chave)
+
+            for lote, descricao in lotes:
+                for campo, valor in self._aplicar(lote, descricao).items():
+                    total[campo] += valor
+            return total
+
+    # Recarga completa (o arquivo fonte foi substituído em vez de crescer)
+    def _recarregar(self):
+        vendas = carregar_vendas(self.caminho, colunas=self.colunas)
+        fonte = vendas.attrs["fonte"]
+        vendas = self.preparar(vendas)
+        self.cubo.recarregar(vendas)
+        self._iniciar(vendas, fonte)
+
+    # Tabela fato atual (histórico + lotes, sem as linhas substituídas).
+    # Materializa uma cópia: use só quando o cubo não bastar
+    def tabela(self):
+        return concatenar(self._ativas())
+
+    # Partes sem as linhas substituídas
+    def _ativas(self):
+        return [p[~excl] if excl.any() else p for p, excl in zip(self.partes, self._excluidos)]
+
+
+class _ArquivoReescrito(Exception):
+    pass
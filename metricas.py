@@ -0,0 +1,181 @@
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+
+# Limites (em segundos) dos buckets dos histogramas de duração
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Log de cada requisição HTTP (rota, status, duração); desligado por padrão
+LOG_REQUISICOES = os.environ.get("METRICAS_LOG", "0") != "0"
+
+log = logging.getLogger("bi.metricas")
+
+
+def _rotulos(rotulos):
+    if not rotulos:
+        return ""
+    pares = ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in sorted(rotulos))
+    return "{" + pares + "}"
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# Memória residente do processo (RSS) em bytes, e o pico desde o início
+def memoria_processo():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    try:
+        with open("/proc/self/statm") as f:
+            atual = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        atual = pico
+    return atual, pico
+
+
+# Registro de métricas do processo no formato texto do Prometheus, sem dependências:
+#   - histogramas de duração por etapa (carga, cubo, ingestão, série, renderização...)
+#   - medidores (último valor): linhas lidas, tamanho do resultado, bytes por imagem
+#   - contadores: acertos/falhas de cache, requisições por rota e status
+# Cada worker do gunicorn tem o seu registro; o Prometheus raspa cada worker
+# (ou a soma fica por conta das consultas, como de costume com processos)
+class Metricas:
+    def __init__(self, prefixo="bi", buckets=BUCKETS_SEGUNDOS):
+        self.prefixo = prefixo
+        self.buckets = tuple(buckets)
+        self._trava = threading.Lock()
+        self._ajuda = {}
+        self._histogramas = {}
+        self._medidores = {}
+        self._contadores = {}
+
+    def _nome(self, nome):
+        return f"{self.prefixo}_{nome}"
+
+    # Registra uma duração no histograma `nome` (ex.: etapa_segundos{etapa="carga_vendas"})
+    def observar(self, nome, segundos, ajuda="", **rotulos):
+        chave = (self._nome(nome), tuple(sorted(rotulos.items())))
+        with self._trava:
+            self._ajuda.setdefault(chave[0], ajuda)
+            contagens, soma, total = self._histogramas.get(chave, ([0] * len(self.buckets), 0.0, 0))
+            contagens = [c + (segundos <= limite) for c, limite in zip(contagens, self.buckets)]
+            self._histogramas[chave] = (contagens, soma + segundos, total + 1)
+
+    # Medidor: guarda o último valor (linhas, bytes, tamanho do resultado)
+    def definir(self, nome, valor, ajuda="", **rotulos):
+        chave = (self._nome(nome), tuple(sorted(rotulos.items())))
+        with self._trava:
+            self._ajuda.setdefault(chave[0], ajuda)
+            self._medidores[chave] = valor
+
+    # Contador: só cresce
+    def contar(self, nome, valor=1, ajuda="", **rotulos):
+        chave = (self._nome(nome), tuple(sorted(rotulos.items())))
+        with self._trava:
+            self._ajuda.setdefault(chave[0], ajuda)
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    # Mede a duração de uma etapa do pipeline. O bloco pode informar as linhas
+    # processadas e o tamanho do resultado em medida["linhas"] / medida["resultado"]:
+    #   with metricas.etapa("carga_vendas") as medida:
+    #       vendas = carregar_vendas(); medida["linhas"] = len(vendas)
+    @contextmanager
+    def etapa(self, nome, **rotulos):
+        medida = {}
+        inicio = time.perf_counter()
+        try:
+            yield medida
+        finally:
+            segundos = time.perf_counter() - inicio
+            self.observar("etapa_segundos", segundos, "Duração das etapas do pipeline", etapa=nome, **rotulos)
+            if "linhas" in medida:
+                self.definir("etapa_linhas", medida["linhas"], "Linhas lidas na última execução da etapa",
+                             etapa=nome, **rotulos)
+            if "resultado" in medida:
+                self.definir("etapa_resultado_linhas", medida["resultado"],
+                             "Linhas do resultado na última execução da etapa", etapa=nome, **rotulos)
+            self.definir("etapa_rss_bytes", memoria_processo()[0],
+                         "Memória residente do processo ao fim da última execução da etapa", etapa=nome, **rotulos)
+
+    # Texto no formato de exposição do Prometheus (text/plain; version=0.0.4)
+    def texto(self):
+        rss, pico = memoria_processo()
+        self.definir("processo_rss_bytes", rss, "Memória residente do processo")
+        self.definir("processo_rss_pico_bytes", pico, "Pico de memória residente do processo")
+        with self._trava:
+            histogramas = dict(self._histogramas)
+            medidores = dict(self._medidores)
+            contadores = dict(self._contadores)
+            ajuda = dict(self._ajuda)
+
+        linhas = []
+        for tipo, series in (("gauge", medidores), ("counter", contadores)):
+            for nome in sorted({n for n, _ in series}):
+                linhas.append(f"# HELP {nome} {ajuda.get(nome, '')}")
+                linhas.append(f"# TYPE {nome} {tipo}")
+                for (n, rotulos), valor in sorted(series.items()):
+                    if n == nome:
+                        linhas.append(f"{nome}{_rotulos(rotulos)} {_numero(valor)}")
+        for nome in sorted({n for n, _ in histogramas}):
+            linhas.append(f"# HELP {nome} {ajuda.get(nome, '')}")
+            linhas.append(f"# TYPE {nome} histogram")
+            for (n, rotulos), (contagens, soma, total) in sorted(histogramas.items()):
+                if n != nome:
+                    continue
+                for limite, contagem in zip(self.buckets, contagens):
+                    linhas.append(f"{nome}_bucket{_rotulos(rotulos + (('le', _numero(limite)),))} {contagem}")
+                linhas.append(f"{nome}_bucket{_rotulos(rotulos + (('le', '+Inf'),))} {total}")
+                linhas.append(f"{nome}_sum{_rotulos(rotulos)} {_numero(soma)}")
+                linhas.append(f"{nome}_count{_rotulos(rotulos)} {total}")
+        return "\n".join(linhas) + "\n"
+
+
+# Registro compartilhado do processo (usado por graficos.py, filtros.py e pelos dashboards)
+metricas = Metricas()
+
+
+# Registra a rota GET <prefixo>/metrics no servidor Flask do app e, opcionalmente,
+# o log e a medição de cada requisição (duração e contagem por rota e status)
+def registrar_metricas(app, registro=None, log_requisicoes=LOG_REQUISICOES):
+    registro = registro or metricas
+    servidor = app.server
+    if log_requisicoes:
+        log.setLevel(logging.INFO)
+        logging.basicConfig(format="%(asctime)s %(name)s %(message)s")
+
+    def servir_metricas():
+        return registro.texto(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+    servidor.add_url_rule(app.config.routes_pathname_prefix + "metrics",
+                          endpoint=f"metricas_{id(app)}", view_func=servir_metricas)
+
+    @servidor.before_request
+    def _inicio_requisicao():
+        g.inicio_metricas = time.perf_counter()
+
+    @servidor.after_request
+    def _fim_requisicao(resposta):
+        inicio = g.pop("inicio_metricas", None)
+        if inicio is None:
+            return resposta
+        segundos = time.perf_counter() - inicio
+        rota = request.url_rule.rule if request.url_rule is not None else "desconhecida"
+        registro.observar("requisicao_segundos", segundos, "Duração das requisições HTTP", rota=rota)
+        registro.contar("requisicoes_total", 1, "Requisições HTTP", rota=rota, status=resposta.status_code)
+        if log_requisicoes:
+            log.info("%s %s %d %.1fms %sB", request.method, request.path, resposta.status_code,
+                     segundos * 1000, resposta.calculate_content_length() or 0)
+        return resposta
+
+    return registro
@@ -0,0 +1,229 @@
+import numpy as np
+import pandas as pd
+
+# Limite do código combinado de chaves compostas (produto das cardinalidades);
+# acima dele os códigos parciais são refatorados antes de combinar a próxima chave
+LIMITE_CODIGO = 1 << 62
+
+
+# Códigos inteiros de uma coluna (-1 = nulo) e os valores de cada código, em ordem.
+# Colunas categóricas já têm os códigos e não são refatoradas
+def _fatorar_coluna(coluna):
+    if isinstance(coluna.dtype, pd.CategoricalDtype):
+        return coluna.cat.codes.to_numpy().astype(np.int64), coluna.cat.categories
+    codigos, unicos = pd.factorize(coluna, sort=True)
+    return codigos.astype(np.int64), unicos
+
+
+def _rotulos(dtype, unicos, codigos):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(codigos, dtype=dtype)
+    return unicos.take(codigos)
+
+
+# Chaves de agrupamento fatoradas uma única vez em códigos inteiros de grupo
+# (0..n-1, na ordem das chaves, como groupby(sort=True)); linhas com alguma
+# chave nula ficam com -1 e não entram em grupo nenhum. As somas de qualquer
+# medida, com ou sem máscara de filtro, saem de somar_codigos sobre os códigos,
+# sem refatorar as chaves. Com uma chave só, os códigos da coluna já são
+# os dos grupos (grupos sem linhas somam zero e são descartados em tabela/top);
+# chaves compostas (ex.: ClienteNome x ClienteCidade) são combinadas num único
+# código inteiro. Os rótulos do índice só são montados para os grupos do resultado
+class Grupos:
+    def __init__(self, chaves):
+        chaves = chaves.to_frame() if isinstance(chaves, pd.Series) else chaves
+        self.nomes = list(chaves.columns)
+        self._tipos = [chaves[c].dtype for c in self.nomes]
+        colunas = [_fatorar_coluna(chaves[c]) for c in self.nomes]
+        self._unicos = [unicos for _, unicos in colunas]
+        if len(colunas) == 1:
+            self.codigos = colunas[0][0]
+            self.n = len(self._unicos[0])
+            self._niveis = None
+            return
+
+        validos = np.ones(len(chaves), dtype=bool)
+        combinado = np.zeros(len(chaves), dtype=np.int64)
+        cardinalidade = 1
+        for codigos, unicos in colunas:
+            tamanho = len(unicos)
+            validos &= codigos >= 0
+            if cardinalidade * max(tamanho, 1) >= LIMITE_CODIGO:
+                combinado, distintos = pd.factorize(combinado, sort=True)
+                cardinalidade = len(distintos)
+            combinado = combinado * tamanho + codigos
+            cardinalidade *= max(tamanho, 1)
+
+        self.codigos = np.full(len(chaves), -1, dtype=np.int64)
+        linhas = np.flatnonzero(validos)
+        grupos, distintos = pd.factorize(combinado[linhas], sort=True)
+        self.codigos[linhas] = grupos
+        self.n = len(distintos)
+        # Códigos de cada chave em cada grupo, a partir de uma linha representante
+        representante = np.empty(self.n, dtype=np.int64)
+        representante[grupos] = linhas
+        self._niveis = [codigos[representante] for codigos, _ in colunas]
+
+    # Índice (Index ou MultiIndex, como o do groupby) dos grupos `posicoes`
+    def rotulos(self, posicoes):
+        niveis = [posicoes] if self._niveis is None else [codigos[posicoes] for codigos in self._niveis]
+        niveis = [_rotulos(tipo, unicos, codigos) for tipo, unicos, codigos in zip(self._tipos, self._unicos, niveis)]
+        if len(niveis) == 1:
+            return pd.Index(niveis[0], name=self.nomes[0])
+        return pd.MultiIndex.from_arrays(niveis, names=self.nomes)
+
+    def _selecionar(self, mascara):
+        if mascara is None:
+            return self.codigos >= 0
+        return mascara & (self.codigos >= 0)
+
+    # Número de linhas de cada grupo (só as linhas de `mascara`, se houver)
+    def contar(self, mascara=None):
+        return np.bincount(self.codigos[self._selecionar(mascara)], minlength=self.n)
+
+    # Soma de `pesos` por grupo; nulos contam como zero, como no sum() do pandas
+    def somar(self, pesos, mascara=None):
+        selecionadas = self._selecionar(mascara)
+        return somar_codigos(self.codigos[selecionadas], {None: _valores(pesos, selecionadas)}, self.n)[None]
+
+    # Equivalente a tabela[mascara].groupby(chaves, observed=True)[medidas].sum()
+    # (medidas: {nome: valores}): um DataFrame só com os grupos que têm linhas na seleção
+    def tabela(self, medidas, mascara=None):
+        selecionadas = self._selecionar(mascara)
+        codigos = self.codigos[selecionadas]
+        presentes = np.flatnonzero(np.bincount(codigos, minlength=self.n))
+        somas = somar_codigos(codigos, {nome: _valores(pesos, selecionadas) for nome, pesos in medidas.items()},
+                              self.n)
+        return pd.DataFrame({nome: somas[nome][presentes] for nome in medidas}, index=self.rotulos(presentes))
+
+    # Os n maiores grupos de `pesos` (só os que têm linhas na seleção), em ordem decrescente
+    def top(self, pesos, n, mascara=None):
+        selecionadas = self._selecionar(mascara)
+        codigos = self.codigos[selecionadas]
+        presentes = np.flatnonzero(np.bincount(codigos, minlength=self.n))
+        somas = somar_codigos(codigos, {None: _valores(pesos, selecionadas)}, self.n)[None][presentes]
+        posicoes = top_k(somas, n)
+        return pd.Series(somas[posicoes], index=self.rotulos(presentes[posicoes]), name=getattr(pesos, "name", None))
+
+
+def _valores(pesos, selecionadas):
+    return np.asarray(pesos, dtype=np.float64)[selecionadas]
+
+
+# Somas por código de grupo (0..n-1) das colunas de `valores` ({nome: array}),
+# pelo kernel de groupby do pandas, sem refatorar os códigos (categorias =
+# posições). É a mesma soma compensada (Kahan), na ordem das linhas, do
+# groupby(chaves).sum(): o resultado é idêntico bit a bit, o que um bincount não
+# garante. Devolve {nome: array de n somas}; grupos sem linhas somam zero
+def somar_codigos(codigos, valores, n):
+    categorias = pd.Categorical.from_codes(codigos, categories=pd.RangeIndex(n), validate=False)
+    colunas = list(valores)
+    somas = pd.DataFrame(dict(enumerate(valores.values())), copy=False).groupby(categorias, observed=False).sum()
+    return {nome: somas[i].to_numpy() for i, nome in enumerate(colunas)}
+
+
+# Grupos com mais linhas que isto (num bloco) são somados linha a linha em
+# somar_compensado; os demais, vetorizados pela posição da linha no grupo
+LIMITE_VETORIZADO = 64
+
+
+# Soma compensada (Kahan) por código de grupo que continua de um estado anterior:
+# `somas` e `compensacoes` (arrays de n posições) são atualizados no lugar. É o
+# mesmo algoritmo do kernel de groupby do pandas (nulos ignorados, compensação
+# zerada quando vira NaN com infinitos), aplicado às linhas de cada grupo na
+# ordem em que vêm; somar uma tabela em blocos, levando o estado de um bloco ao
+# seguinte, dá o mesmo resultado, bit a bit, do groupby da tabela inteira.
+# Grupos pequenos andam juntos, uma posição por vez (a k-ésima linha de todos os
+# grupos que a têm); os grandes, em laço escalar
+def somar_compensado(codigos, valores, somas, compensacoes):
+    valores = np.asarray(valores, dtype=np.float64)
+    validas = (codigos >= 0) & ~np.isnan(valores)
+    codigos, valores = codigos[validas], valores[validas]
+    ordem = np.argsort(codigos, kind="stable")
+    codigos, valores = codigos[ordem], valores[ordem]
+    inicios = np.searchsorted(codigos, codigos)
+    posicoes = np.arange(len(codigos)) - inicios
+    tamanhos = np.bincount(codigos, minlength=len(somas))
+
+    grandes = tamanhos[codigos] > LIMITE_VETORIZADO
+    for grupo in np.flatnonzero(tamanhos > LIMITE_VETORIZADO).tolist():
+        soma, compensacao = float(somas[grupo]), float(compensacoes[grupo])
+        inicio = np.searchsorted(codigos, grupo)
+        for valor in valores[inicio:inicio + tamanhos[grupo]].tolist():
+            y = valor - compensacao
+            t = soma + y
+            compensacao = (t - soma) - y
+            if compensacao != compensacao:
+                compensacao = 0.0
+            soma = t
+        somas[grupo], compensacoes[grupo] = soma, compensacao
+
+    pequenos = np.flatnonzero(~grandes)
+    pequenos = pequenos[np.argsort(posicoes[pequenos], kind="stable")]
+    limites = np.searchsorted(posicoes[pequenos], np.arange(LIMITE_VETORIZADO + 2))
+    for inicio, fim in zip(limites[:-1], limites[1:]):
+        if inicio == fim:
+            break
+        grupos = codigos[pequenos[inicio:fim]]
+        soma = somas[grupos]
+        y = valores[pequenos[inicio:fim]] - compensacoes[grupos]
+        t = soma + y
+        compensacao = (t - soma) - y
+        compensacoes[grupos] = np.where(np.isnan(compensacao), 0.0, compensacao)
+        somas[grupos] = t
+
+
+# Somas agrupadas de várias seleções numa única passada do kernel de soma:
+# cada item (grupos, mascara, pesos) ganha uma faixa própria de códigos,
+# deslocada pelo número de grupos dos itens anteriores, e as linhas selecionadas
+# de todos os itens são somadas juntas por somar_codigos. Cada grupo continua
+# recebendo as suas linhas na ordem da tabela, então as somas são as mesmas de um
+# groupby por item. Devolve uma Series por item, com o índice do groupby e só os
+# grupos que têm linhas na seleção
+def somar_selecoes(itens):
+    codigos, valores, faixas = [], [], []
+    deslocamento = 0
+    for grupos, mascara, pesos in itens:
+        selecionadas = grupos._selecionar(mascara)
+        codigos_item = grupos.codigos[selecionadas]
+        codigos.append(codigos_item + deslocamento)
+        valores.append(_valores(pesos, selecionadas))
+        faixas.append((deslocamento, np.flatnonzero(np.bincount(codigos_item, minlength=grupos.n))))
+        deslocamento += grupos.n
+    if not itens:
+        return []
+    somas = somar_codigos(np.concatenate(codigos), {None: np.concatenate(valores)}, deslocamento)[None]
+    return [
+        pd.Series(somas[inicio + presentes], index=grupos.rotulos(presentes), name=getattr(pesos, "name", None))
+        for (grupos, _, pesos), (inicio, presentes) in zip(itens, faixas)
+    ]
+
+
+# Posições dos k maiores valores, em ordem decrescente, por seleção parcial
+# (np.partition, O(n)) em vez de ordenar todos os grupos. Empates saem na ordem
+# das posições, como em Series.nlargest(keep="first")
+def top_k(valores, k):
+    valores = np.asarray(valores)
+    n = len(valores)
+    if k >= n:
+        posicoes = np.arange(n)
+    elif k <= 0:
+        return np.empty(0, dtype=np.int64)
+    else:
+        corte = np.partition(valores, n - k)[n - k]
+        maiores = np.flatnonzero(valores > corte)
+        iguais = np.flatnonzero(valores == corte)[:k - len(maiores)]
+        posicoes = np.concatenate([maiores, iguais])
+    return posicoes[np.lexsort((posicoes, -valores[posicoes]))]
+
+
+# Soma de `pesos` por `chaves` (Series ou DataFrame): mesmo resultado de
+# pesos.groupby(chaves, observed=True).sum()
+def somar_por(chaves, pesos, mascara=None):
+    grupos = Grupos(chaves)
+    return grupos.tabela({getattr(pesos, "name", None): pesos}, mascara).iloc[:, 0]
+
+
+# Os n maiores grupos: mesmo resultado de pesos.groupby(chaves, observed=True).sum().nlargest(n)
+def top_por(chaves, pesos, n, mascara=None):
+    return Grupos(chaves).top(pesos, n, mascara)
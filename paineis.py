@@ -0,0 +1,23 @@
+import importlib.util
+import os
+import sys
+
+# Arquivos dos dashboards, pelo nome usado em DASHBOARD (wsgi.py) e na exportação estática
+DASHBOARDS = {
+    "12345": "dashboard-12345.py",
+    "678910": "dashboard-678910.py",
+}
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+
+# Importa um dashboard (os arquivos têm hífen no nome, então não dá para usar import)
+def carregar_dashboard(nome):
+    if nome not in DASHBOARDS:
+        raise ValueError(f"DASHBOARD deve ser um de {sorted(DASHBOARDS)}")
+    modulo_nome = f"dashboard_{nome}"
+    spec = importlib.util.spec_from_file_location(modulo_nome, os.path.join(RAIZ, DASHBOARDS[nome]))
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[modulo_nome] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
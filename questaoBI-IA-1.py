@@ -1,17 +1,16 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas, carregar_dimensao
+from consultas import colunas_questoes, responder
 
 # Carregar os dados diretamente dos arquivos CSV
-vendas_df = pd.read_csv("csv/VendasGlobais.csv")
-vendedores_df = pd.read_csv("csv/Vendedores.csv")
-transportadoras_df = pd.read_csv("csv/Transportadoras.csv")
-fornecedores_df = pd.read_csv("csv/Fornecedores.csv")
+vendas_df = carregar_vendas(colunas=colunas_questoes("q1"))
+vendedores_df = carregar_dimensao("csv/Vendedores.csv")
+transportadoras_df = carregar_dimensao("csv/Transportadoras.csv")
+fornecedores_df = carregar_dimensao("csv/Fornecedores.csv")
 
-# Agrupar por nome do cliente e somar as vendas
-clientes_vendas = vendas_df.groupby("ClienteNome")["Vendas"].sum().sort_values(ascending=False)
-
-# Selecionar os 10 maiores clientes
-top_10_clientes = clientes_vendas.head(10)
+# Agrupar por nome do cliente, somar as vendas e selecionar os 10 maiores clientes
+# (consulta "q1" do motor de consultas em consultas.py)
+top_10_clientes = responder("q1", vendas=vendas_df)
 
 # Criar gráfico de barras
 plt.figure(figsize=(10, 6))
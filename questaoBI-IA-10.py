@@ -1,21 +1,13 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
 # Carregar o arquivo CSV
-df = pd.read_csv("csv/VendasGlobais.csv")
+df = carregar_vendas(colunas=colunas_questoes("q10"))
 
-# Lista de países europeus presentes no arquivo
-paises_europeus = [
-    "Germany", "France", "UK", "Ireland", "Denmark", "Sweden", "Austria",
-    "Spain", "Portugal", "Belgium", "Switzerland", "Italy", "Finland",
-    "Poland", "Norway"
-]
-
-# Filtrar apenas os registros de países europeus
-df_europa = df[df["ClientePaís"].isin(paises_europeus)]
-
-# Agrupar por país e somar as vendas
-vendas_por_pais = df_europa.groupby("ClientePaís")["Vendas"].sum().sort_values(ascending=False)
+# Filtrar apenas os registros de países europeus (códigos da região "Europa" em geografia.py),
+# agrupar por país e somar as vendas (consulta "q10" do motor de consultas)
+vendas_por_pais = responder("q10", vendas=df)
 
 # Exibir os valores
 print("Total de vendas por país europeu:")
@@ -1,14 +1,13 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
 # Carregar o arquivo de vendas
-vendas_df = pd.read_csv("csv/VendasGlobais.csv")
+vendas_df = carregar_vendas(colunas=colunas_questoes("q2"))
 
-# Agrupar por país e somar as vendas
-vendas_por_pais = vendas_df.groupby("ClientePaís")["Vendas"].sum().sort_values(ascending=False)
-
-# Selecionar os três maiores países
-top_3_paises = vendas_por_pais.head(3)
+# Agrupar por país, somar as vendas e selecionar os três maiores países
+# (consulta "q2" do motor de consultas em consultas.py)
+top_3_paises = responder("q2", vendas=vendas_df)
 
 # Criar gráfico de barras
 plt.figure(figsize=(8, 5))
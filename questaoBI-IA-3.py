@@ -1,14 +1,13 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
 # Carregar o arquivo CSV
-vendas_df = pd.read_csv("csv/VendasGlobais.csv")
+vendas_df = carregar_vendas(colunas=colunas_questoes("q3"))
 
-# Filtrar apenas os registros do Brasil
-vendas_brasil = vendas_df[vendas_df["ClientePaísID"].astype(str).str.upper() == "BRA"]
-
-# Agrupar por categoria e somar as vendas
-faturamento_por_categoria = vendas_brasil.groupby("CategoriaNome")["Vendas"].sum().sort_values(ascending=False)
+# Filtrar apenas os registros do Brasil (ClientePaísID == "BRA"), agrupar por
+# categoria e somar as vendas (consulta "q3" do motor de consultas em consultas.py)
+faturamento_por_categoria = responder("q3", vendas=vendas_df)
 
 # Criar gráfico de barras
 plt.figure(figsize=(10, 6))
@@ -1,22 +1,18 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
 # Carregar os arquivos CSV
-vendas_df = pd.read_csv("csv/VendasGlobais.csv")
-transportadoras_df = pd.read_csv("csv/Transportadoras.csv")
+vendas_df = carregar_vendas(colunas=colunas_questoes("q4"))
 
-# Agrupar os dados de vendas por TransportadoraID e somar os valores de frete
-frete_por_transportadora = vendas_df.groupby("TransportadoraID")["Frete"].sum().reset_index()
-
-# Mesclar com os nomes das transportadoras
-frete_por_transportadora = frete_por_transportadora.merge(transportadoras_df, on="TransportadoraID")
-
-# Ordenar por despesa de frete
-frete_por_transportadora = frete_por_transportadora.sort_values(by="Frete", ascending=False)
+# Agrupar os dados de vendas por TransportadoraID, somar os valores de frete,
+# trocar os IDs pelos nomes das transportadoras e ordenar por despesa de frete
+# (consulta "q4" do motor de consultas em consultas.py)
+frete_por_transportadora = responder("q4", vendas=vendas_df)
 
 # Criar gráfico de barras
 plt.figure(figsize=(8, 5))
-plt.bar(frete_por_transportadora["TransportadoraNome"], frete_por_transportadora["Frete"], color='steelblue')
+plt.bar(frete_por_transportadora.index, frete_por_transportadora.values, color='steelblue')
 plt.title("Despesa com Frete por Transportadora")
 plt.xlabel("Transportadora")
 plt.ylabel("Despesa Total com Frete ($)")
@@ -1,18 +1,14 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
 # Carregar o arquivo CSV
-df = pd.read_csv("csv/VendasGlobais.csv")
+df = carregar_vendas(colunas=colunas_questoes("q5"))
 
-# Filtrar registros da categoria "Men´s Footwear" e país "Germany"
-filtro = (df["CategoriaNome"] == "Men´s Footwear") & (df["ClientePaís"] == "Germany")
-df_filtrado = df[filtro]
-
-# Agrupar por cliente e somar as vendas
-clientes_vendas = df_filtrado.groupby("ClienteNome")["Vendas"].sum().sort_values(ascending=False)
-
-# Selecionar os principais clientes
-top_clientes = clientes_vendas.head(10)
+# Filtrar registros da categoria "Men´s Footwear" e país "Germany", agrupar por
+# cliente, somar as vendas e selecionar os principais clientes
+# (consulta "q5" do motor de consultas em consultas.py)
+top_clientes = responder("q5", vendas=df)
 
 # Criar gráfico de barras
 plt.figure(figsize=(10, 6))
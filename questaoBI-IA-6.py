@@ -1,25 +1,18 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
 # Carregar os arquivos CSV
-vendas_df = pd.read_csv("csv/VendasGlobais.csv")
-vendedores_df = pd.read_csv("csv/Vendedores.csv")
+vendas_df = carregar_vendas(colunas=colunas_questoes("q6"))
 
-# Filtrar apenas os registros dos Estados Unidos
-vendas_eua = vendas_df[vendas_df["ClientePaís"] == "USA"]
-
-# Agrupar por VendedorID e somar os descontos
-descontos_por_vendedor = vendas_eua.groupby("VendedorID")["Desconto"].sum().reset_index()
-
-# Mesclar com os nomes dos vendedores
-descontos_por_vendedor = descontos_por_vendedor.merge(vendedores_df, on="VendedorID")
-
-# Ordenar por valor de desconto
-descontos_por_vendedor = descontos_por_vendedor.sort_values(by="Desconto", ascending=False)
+# Filtrar apenas os registros dos Estados Unidos, agrupar por VendedorID, somar
+# os descontos, trocar os IDs pelos nomes dos vendedores e ordenar por desconto
+# (consulta "q6" do motor de consultas em consultas.py)
+descontos_por_vendedor = responder("q6", vendas=vendas_df)
 
 # Criar gráfico de barras
 plt.figure(figsize=(10, 6))
-plt.bar(descontos_por_vendedor["VendedorNome"], descontos_por_vendedor["Desconto"], color='salmon')
+plt.bar(descontos_por_vendedor.index, descontos_por_vendedor.values, color='salmon')
 plt.title("Vendedores que Mais Concedem Descontos nos Estados Unidos")
 plt.xlabel("Vendedor")
 plt.ylabel("Total de Descontos ($)")
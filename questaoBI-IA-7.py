@@ -1,25 +1,18 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
 # Carregar os arquivos CSV
-vendas_df = pd.read_csv("csv/VendasGlobais.csv")
-fornecedores_df = pd.read_csv("csv/Fornecedores.csv")
+vendas_df = carregar_vendas(colunas=colunas_questoes("q7"))
 
-# Filtrar apenas registros da categoria "Womens wear"
-womens_wear_df = vendas_df[vendas_df["CategoriaNome"] == "Womens wear"]
-
-# Agrupar por FornecedorID e somar a Margem Bruta
-margem_por_fornecedor = womens_wear_df.groupby("FornecedorID")["Margem Bruta"].sum().reset_index()
-
-# Mesclar com os nomes dos fornecedores
-margem_por_fornecedor = margem_por_fornecedor.merge(fornecedores_df, on="FornecedorID")
-
-# Ordenar por margem de lucro decrescente
-margem_por_fornecedor = margem_por_fornecedor.sort_values(by="Margem Bruta", ascending=False)
+# Filtrar apenas registros da categoria "Womens wear", agrupar por FornecedorID,
+# somar a Margem Bruta, trocar os IDs pelos nomes dos fornecedores e ordenar
+# por margem de lucro decrescente (consulta "q7" do motor de consultas em consultas.py)
+margem_por_fornecedor = responder("q7", vendas=vendas_df)
 
 # Criar gráfico de barras
 plt.figure(figsize=(10, 6))
-plt.bar(margem_por_fornecedor["FornecedorNome"], margem_por_fornecedor["Margem Bruta"], color='mediumseagreen')
+plt.bar(margem_por_fornecedor.index, margem_por_fornecedor.values, color='mediumseagreen')
 plt.title("Fornecedores com Maior Margem de Lucro no Segmento 'Womens wear'")
 plt.xlabel("Fornecedor")
 plt.ylabel("Margem de Lucro Total ($)")
@@ -1,23 +1,14 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
-# Carregar o arquivo CSV
-df = pd.read_csv("csv/VendasGlobais.csv")
+# Carregar o arquivo CSV (a coluna "Data" já vem convertida para datetime);
+# só as partições de 2009 a 2012 são lidas do cache
+df = carregar_vendas(colunas=colunas_questoes("q8"), anos=range(2009, 2013))
 
-# Converter a coluna 'Data' para datetime
-df["Data"] = pd.to_datetime(df["Data"], errors="coerce", dayfirst=True)
-
-# Remover linhas com datas inválidas
-df = df.dropna(subset=["Data"])
-
-# Extrair o ano da data
-df["Ano"] = df["Data"].dt.year
-
-# Filtrar vendas entre 2009 e 2012
-df_periodo = df[df["Ano"].between(2009, 2012)]
-
-# Agrupar por ano e somar as vendas
-vendas_anuais = df_periodo.groupby("Ano")["Vendas"].sum().sort_index()
+# Extrair o ano da data, filtrar vendas entre 2009 e 2012 (datas inválidas ficam
+# de fora), agrupar por ano e somar as vendas (consulta "q8" do motor de consultas em consultas.py)
+vendas_anuais = responder("q8", vendas=df)
 
 # Total vendido em 2009
 vendas_2009 = vendas_anuais.loc[2009]
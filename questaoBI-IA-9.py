@@ -1,24 +1,15 @@
-import pandas as pd
 import matplotlib.pyplot as plt
+from dados import carregar_vendas
+from consultas import colunas_questoes, responder
 
-# Carregar o arquivo CSV
-df = pd.read_csv("csv/VendasGlobais.csv")
+# Carregar o arquivo CSV (a coluna "Data" já vem convertida para datetime);
+# só a partição de 2012 é lida do cache
+df = carregar_vendas(colunas=colunas_questoes("q9", "q9_cidades"), anos=[2012])
 
-# Converter a coluna de data para datetime
-df["Data"] = pd.to_datetime(df["Data"], errors="coerce", dayfirst=True)
-
-# Extrair o ano
-df["Ano"] = df["Data"].dt.year
-
-# Filtrar registros da categoria "Men´s Footwear" no ano de 2012
-filtro = (df["CategoriaNome"] == "Men´s Footwear") & (df["Ano"] == 2012)
-df_filtrado = df[filtro]
-
-# Agrupar por cliente e somar as vendas
-clientes_vendas = df_filtrado.groupby("ClienteNome")["Vendas"].sum().sort_values(ascending=False)
-
-# Agrupar por cidade e somar as vendas
-cidades_vendas = df_filtrado.groupby("ClienteCidade")["Vendas"].sum().sort_values(ascending=False)
+# Filtrar registros da categoria "Men´s Footwear" no ano de 2012 e somar as vendas
+# por cliente e por cidade (consultas "q9" e "q9_cidades" do motor de consultas em
+# consultas.py, respondidas na mesma varredura e com a mesma máscara de filtro)
+clientes_vendas, cidades_vendas = responder("q9", "q9_cidades", vendas=df)
 
 # Gráfico de barras - principais clientes
 plt.figure(figsize=(10, 6))
@@ -0,0 +1,180 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from banco import BancoVendas
+from consultas import MotorConsultas
+from dados import CAMINHO_VENDAS, carregar_vendas, impressao_digital
+from graficos import PROCESSOS_GRAFICOS, RenderizadorParalelo
+from indices import IndicesVendas
+
+# Pasta padrão da saída do relatório
+PASTA_RELATORIO = "relatorio"
+
+# Gráfico de cada questão, com os mesmos títulos, cores e eixos dos scripts questaoBI-IA-*.py
+ESTILO = dict(figsize=(10, 6), ajustar=True, rotacao=45)
+
+GRAFICOS_QUESTOES = {
+    "q1": dict(ESTILO, kind="bar", color="skyblue", title="Top 10 Maiores Clientes em Termos de Vendas ($)",
+               xlabel="Cliente", ylabel="Vendas Totais ($)"),
+    "q2": dict(ESTILO, kind="bar", color="orange", title="Top 3 Países em Termos de Vendas ($)",
+               xlabel="País", ylabel="Vendas Totais ($)", figsize=(8, 5), rotacao=0),
+    "q3": dict(ESTILO, kind="bar", color="green", title="Categorias de Produtos com Maior Faturamento no Brasil",
+               xlabel="Categoria", ylabel="Faturamento Total (Vendas $)"),
+    "q4": dict(ESTILO, kind="bar", color="steelblue", title="Despesa com Frete por Transportadora",
+               xlabel="Transportadora", ylabel="Despesa Total com Frete ($)", figsize=(8, 5)),
+    "q5": dict(ESTILO, kind="bar", color="teal", title="Principais Clientes do Segmento 'Men´s Footwear' na Alemanha",
+               xlabel="Cliente", ylabel="Vendas Totais ($)"),
+    "q6": dict(ESTILO, kind="bar", color="salmon", title="Vendedores que Mais Concedem Descontos nos Estados Unidos",
+               xlabel="Vendedor", ylabel="Total de Descontos ($)"),
+    "q7": dict(ESTILO, kind="bar", color="mediumseagreen",
+               title="Fornecedores com Maior Margem de Lucro no Segmento 'Womens wear'",
+               xlabel="Fornecedor", ylabel="Margem de Lucro Total ($)"),
+    "q8": dict(ESTILO, kind="line", color="blue", title="Vendas Anuais (2009–2012)",
+               xlabel="Ano", ylabel="Vendas Totais ($)", figsize=(8, 5), rotacao=0),
+    "q9": dict(ESTILO, kind="bar", color="royalblue", title="Principais Clientes - Men´s Footwear em 2012",
+               xlabel="Cliente", ylabel="Vendas ($)"),
+    "q9_cidades": dict(ESTILO, kind="bar", color="darkorange", title="Cidades com Vendas - Men´s Footwear em 2012",
+                       xlabel="Cidade", ylabel="Vendas ($)"),
+    "q10": dict(ESTILO, kind="bar", color="cornflowerblue", title="Vendas Totais por País na Europa",
+                xlabel="País", ylabel="Vendas ($)"),
+}
+
+
+# Grava a tabela de resultado de uma questão em CSV e/ou JSON
+def gravar_tabela(serie, pasta, nome, formatos):
+    arquivos = []
+    tabela = serie.reset_index()
+    if "csv" in formatos:
+        arquivos.append(os.path.join(pasta, f"{nome}.csv"))
+        tabela.to_csv(arquivos[-1], index=False)
+    if "json" in formatos:
+        arquivos.append(os.path.join(pasta, f"{nome}.json"))
+        tabela.to_json(arquivos[-1], orient="records", force_ascii=False, indent=1)
+    return arquivos
+
+
+# Título do gráfico de uma questão aproximada, com o erro máximo de cada soma (a
+# estimativa nunca fica abaixo do valor real) e o número estimado de chaves distintas
+def titulo_aproximado(titulo, info):
+    return (f"{titulo}\n(aproximado: erro ≤ {info['erro_maximo']:,.2f} por barra, "
+            f"~{info['distintos']:,.0f} distintos ±{info['erro_distintos']:.1%})")
+
+
+# Relatório em lote: carrega os dados uma vez, responde as dez questões numa
+# única varredura (consultas.MotorConsultas) e renderiza os gráficos de todas
+# em paralelo no pool de processos, gravando imagens e tabelas em `pasta`.
+# Com `aproximado`, as questões top-N saem dos esboços (esbocos.py): os limites de
+# erro vão no título do gráfico, nas colunas minimo/maximo/garantido da tabela e no resumo.
+# Com `banco`, as questões são respondidas em SQL no banco SQLite (banco.BancoVendas),
+# sem carregar a tabela fato; o banco é construído na primeira vez e depois reaproveitado.
+# Com `memoria_blocos` (bytes), o CSV é lido em blocos dentro desse orçamento de
+# memória (MotorConsultas.executar_em_blocos), também sem carregar a tabela fato
+def gerar_relatorio(pasta=PASTA_RELATORIO, formatos_grafico=("png",), formatos_tabela=("csv", "json"),
+                    processos=PROCESSOS_GRAFICOS, caminho=CAMINHO_VENDAS, aproximado=False, banco=False,
+                    memoria_blocos=None):
+    os.makedirs(pasta, exist_ok=True)
+    tempos = {}
+
+    inicio = time.perf_counter()
+    renderizador = RenderizadorParalelo(processos)
+    tempos["pool"] = time.perf_counter() - inicio
+
+    try:
+        inicio = time.perf_counter()
+        if banco:
+            base = BancoVendas(fonte=caminho)
+            linhas = base.linhas()
+        elif memoria_blocos is None:
+            vendas = carregar_vendas(caminho)
+            indices = IndicesVendas(vendas)
+            linhas = len(vendas)
+        tempos["carga"] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        motor = MotorConsultas()
+        if banco:
+            resultados = {nome: base.executar(consulta) for nome, consulta in motor.consultas.items()}
+        elif memoria_blocos is not None:
+            resultados = motor.executar_em_blocos(caminho, memoria_max=memoria_blocos)
+            linhas = motor.estatisticas["linhas"]
+        else:
+            resultados = motor.executar(vendas, indices=indices, aproximado=aproximado)
+        tempos["consultas"] = time.perf_counter() - inicio
+        graficos = {
+            nome: dict(opcoes, title=titulo_aproximado(opcoes["title"], motor.aproximacoes[nome]))
+            if nome in motor.aproximacoes else opcoes
+            for nome, opcoes in GRAFICOS_QUESTOES.items()
+        }
+        tabelas = {
+            nome: pd.concat([serie, motor.aproximacoes[nome]["limites"]], axis=1)
+            if nome in motor.aproximacoes else serie
+            for nome, serie in resultados.items()
+        }
+
+        inicio = time.perf_counter()
+        futuros = {
+            (nome, formato): renderizador.submeter(resultados[nome], opcoes, formato)
+            for nome, opcoes in graficos.items()
+            for formato in formatos_grafico
+        }
+        arquivos = {nome: gravar_tabela(tabela, pasta, nome, formatos_tabela) for nome, tabela in tabelas.items()}
+        for (nome, formato), futuro in futuros.items():
+            arquivo = os.path.join(pasta, f"{nome}.{formato}")
+            with open(arquivo, "wb") as f:
+                f.write(futuro.result())
+            arquivos[nome].append(arquivo)
+        tempos["graficos"] = time.perf_counter() - inicio
+    finally:
+        renderizador.encerrar()
+
+    resumo = {
+        "fonte": caminho,
+        "impressao_digital": impressao_digital(caminho),
+        "backend": "sqlite" if banco else "blocos" if memoria_blocos is not None else "pandas",
+        "linhas": linhas,
+        "processos": processos,
+        "segundos": {etapa: round(segundos, 3) for etapa, segundos in tempos.items()},
+        "questoes": {nome: {"linhas": len(serie), "arquivos": arquivos[nome]} for nome, serie in resultados.items()},
+    }
+    for nome, info in motor.aproximacoes.items():
+        resumo["questoes"][nome]["aproximacao"] = {
+            chave: info[chave] for chave in ("erro_maximo", "garantidos", "contadores", "distintos", "erro_distintos")
+        }
+    with open(os.path.join(pasta, "resumo.json"), "w", encoding="utf-8") as f:
+        json.dump(resumo, f, ensure_ascii=False, indent=1)
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relatório em lote das dez questões de BI (sem janelas, backend Agg)")
+    parser.add_argument("--saida", default=PASTA_RELATORIO, help="pasta de saída")
+    parser.add_argument("--graficos", nargs="*", default=["png"], choices=["png", "svg"])
+    parser.add_argument("--tabelas", nargs="*", default=["csv", "json"], choices=["csv", "json"])
+    parser.add_argument("--processos", type=int, default=PROCESSOS_GRAFICOS,
+                        help="processos de renderização (0 = no próprio processo)")
+    parser.add_argument("--fonte", default=CAMINHO_VENDAS, help="CSV de vendas, ou pasta/glob de CSVs no mesmo formato")
+    parser.add_argument("--aproximado", action="store_true",
+                        help="questões top-N por esboços em memória fixa, com limites de erro")
+    parser.add_argument("--banco", action="store_true",
+                        help="responder as questões em SQL no banco SQLite (banco.py), sem carregar a tabela fato")
+    parser.add_argument("--blocos", type=float, metavar="MB",
+                        help="ler o CSV em blocos com este orçamento de memória (MB), sem carregar a tabela fato")
+    args = parser.parse_args(argv)
+    if sum([args.banco, args.aproximado, args.blocos is not None]) > 1:
+        parser.error("--banco, --aproximado e --blocos não podem ser usados juntos")
+    if args.blocos is not None and args.blocos <= 0:
+        parser.error("--blocos precisa ser um orçamento positivo (MB)")
+
+    memoria = None if args.blocos is None else int(args.blocos * 1024 * 1024)
+    resumo = gerar_relatorio(args.saida, args.graficos, args.tabelas, args.processos, args.fonte,
+                            args.aproximado, args.banco, memoria)
+    print(json.dumps({k: resumo[k] for k in ("linhas", "processos", "segundos")}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import threading
+from io import BytesIO
+
+import matplotlib
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import AutoLocator, FixedLocator
+from pandas.api.types import is_any_real_numeric_dtype
+
+# Renderização sem pyplot: cada figura é um matplotlib.figure.Figure com seu
+# próprio FigureCanvasAgg, sem passar pelo gerenciador global de figuras do
+# pyplot. Threads diferentes podem renderizar ao mesmo tempo, desde que não
+# usem a mesma figura. O desenho reproduz o Series.plot do pandas
+# (barras de largura 0,5, rótulos do índice, nome do índice no eixo).
+
+# No SVG o texto fica como texto (e não como contornos), o que o deixa bem menor.
+# Definido uma vez aqui: rc_context alteraria o rcParams global a cada chamada
+matplotlib.rcParams["svg.fonttype"] = "none"
+
+# Moldes livres guardados por chave (tipo de gráfico, número de barras, tamanho da figura)
+MAX_MOLDES_POR_TIPO = 4
+
+LARGURA_BARRA = 0.5
+
+
+def _rotulo(chave):
+    if isinstance(chave, tuple):
+        return "(" + ", ".join(str(parte) for parte in chave) + ")"
+    return str(chave)
+
+
+def _nome_indice(serie):
+    nomes = [nome for nome in serie.index.names if nome is not None]
+    return ",".join(str(nome) for nome in nomes) if nomes else None
+
+
+# Eixo x de um gráfico de linha: índice numérico é plotado pelo valor; os
+# demais (ex.: anos como object) pelas posições, rotuladas com o índice
+def _x_linha(s):
+    if is_any_real_numeric_dtype(s.index.dtype):
+        return s.index.to_numpy(), False
+    return np.arange(len(s)), True
+
+
+# Como o pandas: marcas automáticas fixadas, rótulo só nas posições inteiras
+def _rotular_posicoes(ax, s):
+    ax.xaxis.set_major_locator(AutoLocator())
+    marcas = ax.get_xticks()
+    rotulos = [_rotulo(s.index[int(m)]) if float(m).is_integer() and 0 <= m < len(s) else "" for m in marcas]
+    ax.xaxis.set_major_locator(FixedLocator(marcas))
+    ax.set_xticklabels(rotulos)
+
+
+def _tipo(s, kind, horizontal):
+    if s is None or len(s) == 0:
+        return "vazio"
+    if horizontal or kind == "barh":
+        return "barh"
+    return kind
+
+
+# Desenha a Series num eixo limpo
+def _desenhar(ax, s, tipo, title="", color=None, texto_vazio="Sem dados",
+              xlabel=None, ylabel=None, rotacao=None):
+    if tipo == "vazio":
+        ax.text(0.5, 0.5, texto_vazio, ha="center", va="center", fontsize=12)
+        ax.set_title(title)
+        ax.axis("off")
+        return None
+    posicoes = np.arange(len(s))
+    valores = s.to_numpy(dtype=float)
+    nome = _nome_indice(s)
+    if tipo == "line":
+        x, posicoes = _x_linha(s)
+        artista = ax.plot(x, valores, color=color, marker="o")[0]
+        if posicoes:
+            _rotular_posicoes(ax, s)
+        if nome is not None:
+            ax.set_xlabel(nome)
+    elif tipo == "barh":
+        artista = ax.barh(posicoes, valores, LARGURA_BARRA, color=color)
+        ax.set_ylim(-0.5, len(s) - 0.5)
+        ax.set_yticks(posicoes)
+        ax.set_yticklabels([_rotulo(chave) for chave in s.index])
+        if nome is not None:
+            ax.set_ylabel(nome)
+    else:
+        artista = ax.bar(posicoes, valores, LARGURA_BARRA, color=color)
+        ax.set_xlim(-0.5, len(s) - 0.5)
+        ax.set_xticks(posicoes)
+        ax.set_xticklabels([_rotulo(chave) for chave in s.index], rotation=90)
+        if nome is not None:
+            ax.set_xlabel(nome)
+    ax.set_title(title)
+    _decorar(ax, xlabel, ylabel, rotacao)
+    return artista
+
+
+def _decorar(ax, xlabel, ylabel, rotacao):
+    if xlabel is not None:
+        ax.set_xlabel(xlabel)
+    if ylabel is not None:
+        ax.set_ylabel(ylabel)
+    if rotacao is not None:
+        ax.tick_params(axis="x", labelrotation=rotacao)
+
+
+# Helper para plotar Series com fallback quando vazia (figura nova, sem pyplot)
+def plot_series_safe(s, kind="bar", title="", color=None, horizontal=False, figsize=None,
+                     texto_vazio="Sem dados", ajustar=False, xlabel=None, ylabel=None, rotacao=None):
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    _desenhar(ax, s, _tipo(s, kind, horizontal), title, color, texto_vazio, xlabel, ylabel, rotacao)
+    if ajustar:
+        fig.tight_layout()
+    return fig
+
+
+# Converte uma figura matplotlib em bytes (PNG ou SVG)
+def fig_to_bytes(fig, formato="png"):
+    buf = BytesIO()
+    fig.savefig(buf, format=formato, bbox_inches="tight")
+    return buf.getvalue()
+
+
+# Figura pré-montada de um tipo de gráfico. Quando o gráfico seguinte tem o
+# mesmo tipo e o mesmo número de barras (ex.: o mesmo card com dados novos),
+# só as alturas, cores e textos são trocados, sem recriar eixos e barras.
+# O layout (tight_layout e a caixa do bbox_inches="tight") só depende dos textos
+# e dos limites dos eixos: enquanto eles não mudam, o layout anterior é reaproveitado
+class Molde:
+    def __init__(self, figsize=None):
+        self.figura = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figura)
+        self.ax = self.figura.subplots()
+        self.tipo = None
+        self.artista = None
+        self.assinatura = None
+        self._caixa = None
+
+    def _pode_atualizar(self, tipo, s):
+        if self.artista is None or tipo != self.tipo or tipo == "vazio":
+            return False
+        if tipo == "line":
+            return len(self.artista.get_xdata()) == len(s)
+        return len(self.artista.patches) == len(s)
+
+    def _atualizar(self, s, tipo, title, color, xlabel, ylabel, rotacao):
+        valores = s.to_numpy(dtype=float)
+        ax = self.ax
+        if tipo == "line":
+            self.artista.set_data(_x_linha(s)[0], valores)
+            self.artista.set_color(color or "C0")
+        else:
+            cor = color or "C0"
+            for barra, valor in zip(self.artista.patches, valores):
+                if tipo == "barh":
+                    barra.set_width(valor)
+                else:
+                    barra.set_height(valor)
+                barra.set_facecolor(cor)
+            rotulos = [_rotulo(chave) for chave in s.index]
+            if tipo == "barh":
+                ax.set_yticklabels(rotulos)
+            else:
+                ax.set_xticklabels(rotulos, rotation=90)
+        nome = _nome_indice(s)
+        if tipo == "barh":
+            ax.set_ylabel(nome or "")
+            ax.set_xlabel("")
+        else:
+            ax.set_xlabel(nome or "")
+            ax.set_ylabel("")
+        ax.set_title(title)
+        _decorar(ax, xlabel, ylabel, rotacao)
+        ax.relim()
+        ax.autoscale_view(scalex=(tipo != "bar"), scaley=(tipo != "barh"))
+        if tipo == "line" and _x_linha(s)[1]:
+            _rotular_posicoes(ax, s)
+
+    def desenhar(self, s, kind="bar", title="", color=None, horizontal=False, texto_vazio="Sem dados",
+                 ajustar=False, xlabel=None, ylabel=None, rotacao=None):
+        tipo = _tipo(s, kind, horizontal)
+        if self._pode_atualizar(tipo, s):
+            self._atualizar(s, tipo, title, color, xlabel, ylabel, rotacao)
+        else:
+            self.ax.clear()
+            self.ax.axis("on")
+            self.tipo = tipo
+            self.artista = _desenhar(self.ax, s, tipo, title, color, texto_vazio, xlabel, ylabel, rotacao)
+        ax = self.ax
+        assinatura = (tipo, texto_vazio, ajustar, rotacao, ax.get_title(), ax.get_xlabel(), ax.get_ylabel(),
+                      () if tipo == "vazio" else tuple(_rotulo(chave) for chave in s.index),
+                      ax.get_xlim(), ax.get_ylim())
+        if assinatura != self.assinatura:
+            self.assinatura = assinatura
+            self._caixa = None
+            # tight_layout parte das margens atuais: volta às padrão, como numa figura nova
+            self.figura.subplots_adjust(**{k: matplotlib.rcParams[f"figure.subplot.{k}"]
+                                           for k in ("left", "right", "bottom", "top")})
+            if ajustar:
+                self.figura.tight_layout()
+        return self.figura
+
+    # Caixa do bbox_inches="tight" (em polegadas, com a margem do savefig), calculada
+    # como o savefig faria. Só para formatos raster: o SVG mede os textos com o próprio renderizador
+    def caixa(self):
+        if self._caixa is None:
+            self.figura.draw_without_rendering()
+            caixa = self.figura.get_tightbbox(self.figura.canvas.get_renderer())
+            self._caixa = caixa.padded(matplotlib.rcParams["savefig.pad_inches"])
+        return self._caixa
+
+    def salvar(self, formato="png"):
+        buf = BytesIO()
+        self.figura.savefig(buf, format=formato, bbox_inches=self.caixa() if formato == "png" else "tight")
+        return buf.getvalue()
+
+
+# Moldes reaproveitados entre renderizações, por (tipo, número de barras,
+# tamanho da figura), para que gráficos diferentes não desmontem o molde um do outro.
+# Cada molde é usado por uma thread de cada vez: é retirado da lista livre,
+# desenhado, salvo e devolvido
+class Moldes:
+    def __init__(self, max_por_tipo=MAX_MOLDES_POR_TIPO):
+        self.max_por_tipo = max_por_tipo
+        self._livres = {}
+        self._trava = threading.Lock()
+
+    def renderizar(self, serie, opcoes, formato="png"):
+        opcoes = dict(opcoes)
+        figsize = opcoes.pop("figsize", None)
+        tipo = _tipo(serie, opcoes.get("kind", "bar"), opcoes.get("horizontal", False))
+        chave = (tipo, 0 if tipo == "vazio" else len(serie), tuple(figsize) if figsize else None)
+        with self._trava:
+            livres = self._livres.setdefault(chave, [])
+            molde = livres.pop() if livres else None
+        if molde is None:
+            molde = Molde(figsize)
+        try:
+            molde.desenhar(serie, **opcoes)
+            return molde.salvar(formato)
+        finally:
+            with self._trava:
+                if len(self._livres[chave]) < self.max_por_tipo:
+                    self._livres[chave].append(molde)
+
+
+_moldes = Moldes()
+
+
+# Renderiza uma Series já agregada direto em bytes, reaproveitando um molde do tipo do gráfico.
+# Pode ser chamada de várias threads ao mesmo tempo
+def renderizar(serie, opcoes, formato="png"):
+    return _moldes.renderizar(serie, opcoes, formato)
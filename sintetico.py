@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from dados import CAMINHO_VENDAS, PASTA_CACHE
+
+# Linhas do VendasGlobais.csv atual; os fatores de escala multiplicam este número
+LINHAS_BASE = 2360
+
+# Escalas usadas pelo benchmark (10.000x = 23,6 milhões de linhas, alguns GB de CSV)
+FATORES = (1, 100, 10000)
+
+# Arquivos sintéticos ficam no cache, ao lado dos CSVs (fora do git)
+PASTA_SINTETICO = os.path.join(os.path.dirname(CAMINHO_VENDAS), PASTA_CACHE, "sintetico")
+
+# Linhas geradas e gravadas por vez, para 10.000x não precisar caber em memória
+LINHAS_POR_LOTE = 500_000
+
+# Medidas em dinheiro recebem o mesmo fator por linha (Vendas = Vendas Custo + Margem Bruta continua valendo)
+MONETARIAS = ["Vendas Custo", "Margem Bruta", "Vendas", "Desconto"]
+
+# Desvio (em log) da variação de preço e de frete aplicada a cada linha sorteada
+VARIACAO = 0.15
+
+
+# Linhas reais do VendasGlobais.csv como texto, sem as linhas totalmente vazias
+def ler_base(caminho=CAMINHO_VENDAS):
+    base = pd.read_csv(caminho, dtype=str, keep_default_na=False)
+    return base[(base != "").any(axis=1)].reset_index(drop=True)
+
+
+# Gera `linhas` linhas no formato do VendasGlobais.csv por reamostragem das
+# linhas reais: cada linha sorteada leva junto cliente, país, cidade, categoria,
+# produto, data e os IDs de vendedor/fornecedor/transportadora, então as
+# distribuições (e as combinações entre elas) e as chaves estrangeiras
+# continuam as do arquivo real. As medidas variam por um fator lognormal e os
+# pedidos recebem PedidoIDs novos, com a mesma média de itens por pedido.
+def gerar_vendas(linhas, semente=0, base=None, primeiro_pedido=None):
+    base = ler_base() if base is None else base
+    rng = np.random.default_rng(semente)
+    amostra = base.iloc[rng.integers(0, len(base), linhas)].reset_index(drop=True)
+
+    preco = rng.lognormal(0, VARIACAO, linhas)
+    for col in MONETARIAS:
+        amostra[col] = (pd.to_numeric(amostra[col], errors="coerce") * preco).round(4)
+    frete = rng.lognormal(0, VARIACAO, linhas)
+    amostra["Frete"] = (pd.to_numeric(amostra["Frete"], errors="coerce") * frete).round(2)
+
+    pedidos = pd.to_numeric(base["PedidoID"])
+    if primeiro_pedido is None:
+        primeiro_pedido = int(pedidos.max()) + 1
+    itens_por_pedido = len(base) / pedidos.nunique()
+    novo_pedido = rng.random(linhas) < 1 / itens_por_pedido
+    novo_pedido[0] = True
+    amostra["PedidoID"] = primeiro_pedido + np.cumsum(novo_pedido) - 1
+    return amostra
+
+
+# Grava o CSV sintético de fator `fator` e devolve o caminho. O arquivo é
+# reaproveitado se já existir (mesmo fator e semente geram o mesmo conteúdo)
+def gravar_vendas(fator, semente=0, pasta=PASTA_SINTETICO, caminho_base=CAMINHO_VENDAS):
+    os.makedirs(pasta, exist_ok=True)
+    destino = os.path.join(pasta, f"VendasSinteticas_{fator}x_s{semente}.csv")
+    if os.path.exists(destino):
+        return destino
+
+    base = ler_base(caminho_base)
+    total = LINHAS_BASE * fator
+    sementes = np.random.SeedSequence(semente).spawn(-(-total // LINHAS_POR_LOTE))
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    proximo_pedido = None
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        for i, semente_lote in enumerate(sementes):
+            linhas = min(LINHAS_POR_LOTE, total - i * LINHAS_POR_LOTE)
+            lote = gerar_vendas(linhas, semente_lote, base, proximo_pedido)
+            proximo_pedido = int(lote["PedidoID"].iloc[-1]) + 1
+            lote.to_csv(f, header=(i == 0), index=False)
+    os.replace(tmp, destino)
+    return destino
+
+
+# Divide o CSV sintético de fator `fator` em um arquivo por mês (como as entregas
+# mensais da produção), numa pasta que pode ser passada a dados.carregar_vendas.
+# A pasta é reaproveitada se já existir
+def gravar_vendas_mensais(fator, semente=0, pasta=PASTA_SINTETICO, caminho_base=CAMINHO_VENDAS):
+    origem = gravar_vendas(fator, semente, pasta, caminho_base)
+    destino = os.path.join(pasta, f"VendasSinteticas_{fator}x_s{semente}_mensal")
+    if os.path.isdir(destino):
+        return destino
+
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    os.makedirs(tmp, exist_ok=True)
+    gravados = set()
+    for lote in pd.read_csv(origem, dtype=str, keep_default_na=False, chunksize=LINHAS_POR_LOTE):
+        # Data em DD/MM/YYYY: o mês é o trecho MM/YYYY
+        meses = lote["Data"].str[-4:] + "-" + lote["Data"].str[3:5]
+        for mes, parte in lote.groupby(meses, sort=False):
+            arquivo = os.path.join(tmp, f"Vendas_{mes or 'sem_data'}.csv")
+            parte.to_csv(arquivo, mode="a", header=arquivo not in gravados, index=False)
+            gravados.add(arquivo)
+    os.replace(tmp, destino)
+    return destino
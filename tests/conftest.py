@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+
+# Os módulos do projeto usam caminhos relativos à raiz (csv/...)
+@pytest.fixture(autouse=True)
+def na_raiz(monkeypatch):
+    monkeypatch.chdir(RAIZ)
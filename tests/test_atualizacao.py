@@ -0,0 +1,43 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from atualizacao import AtualizadorDados
+from cubo import Cubo
+from dados import CAMINHO_VENDAS, carregar_vendas
+from ingestao import IngestorIncremental
+
+
+@pytest.fixture
+def fonte(tmp_path):
+    caminho = tmp_path / "VendasGlobais.csv"
+    shutil.copy(CAMINHO_VENDAS, caminho)
+    os.makedirs(tmp_path / "deltas")
+    return str(caminho)
+
+
+def _atualizador(fonte, pasta):
+    vendas = carregar_vendas(fonte)
+    deltas = os.path.join(os.path.dirname(fonte), "deltas")
+    return AtualizadorDados(IngestorIncremental(Cubo(vendas), vendas, fonte, pasta_deltas=deltas), pasta=pasta)
+
+
+# Dois processos (aqui, dois atualizadores com a mesma pasta): só o líder ingere; o
+# outro carrega o instantâneo gravado e fica na mesma versão, com o mesmo cubo
+def test_seguidor_carrega_versao_do_lider(fonte, tmp_path):
+    pasta = str(tmp_path / "instantaneos")
+    lider, seguidor = _atualizador(fonte, pasta), _atualizador(fonte, pasta)
+    versao = lider.atual.versao
+    assert lider.verificar() is None and seguidor.verificar() is None
+    delta = pd.read_csv(fonte, dtype=str, nrows=30)
+    delta["PedidoID"] = "9" + delta["PedidoID"]
+    delta.to_csv(os.path.join(os.path.dirname(fonte), "deltas", "a.csv"), index=False)
+    novo = lider.verificar(notificado=True)
+    assert novo is not None and novo.versao != versao
+    assert seguidor.verificar().versao == novo.versao
+    assert seguidor.ingestor.versao == versao
+    for dims, tabela in novo.cubo.cuboides.items():
+        pd.testing.assert_frame_equal(seguidor.atual.cubo.cuboides[dims], tabela, check_exact=True, obj=str(dims))
+    assert seguidor.verificar() is None
@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+
+from banco import BancoVendas, responder_sql
+from consultas import QUESTOES, responder
+from dados import CAMINHO_VENDAS, carregar_vendas
+
+
+@pytest.fixture
+def banco(tmp_path):
+    return BancoVendas(str(tmp_path / "vendas.sqlite"))
+
+
+def test_responder_sql_igual_ao_responder(banco):
+    for consulta in QUESTOES:
+        pd.testing.assert_series_equal(responder_sql(consulta.nome, banco=banco), responder(consulta.nome),
+                                       check_exact=True, obj=consulta.nome)
+
+
+# Grupos que juntam várias linhas do resumo (anos e categorias somados) saem da tabela de vendas
+def test_consultar_igual_ao_pandas(banco):
+    vendas = carregar_vendas()
+    vendas = vendas.assign(Ano=vendas["Data"].dt.year)
+    categorias = list(vendas["CategoriaNome"].cat.categories[:3])
+    filtros = {"CategoriaNome": categorias, "Ano": [2011, 2012]}
+    mascara = vendas["CategoriaNome"].isin(categorias) & vendas["Ano"].isin([2011, 2012])
+    esperado = vendas[mascara].groupby("ClientePaís", observed=True)["Vendas"].sum()
+    pd.testing.assert_series_equal(banco.consultar("Vendas", ["ClientePaís"], filtros), esperado, check_exact=True)
+
+
+# Fonte só com o cabeçalho: o banco é criado com as tabelas vazias
+def test_fonte_sem_linhas(tmp_path):
+    fonte = tmp_path / "vendas.csv"
+    with open(CAMINHO_VENDAS, encoding="utf-8-sig") as f:
+        fonte.write_text(f.readline(), encoding="utf-8")
+    banco = BancoVendas(str(tmp_path / "vazio.sqlite"), str(fonte))
+    assert banco.linhas() == 0
+    assert len(banco.consultar("Vendas", ["ClientePaís"])) == 0
+    assert len(banco.consultar("Vendas", ["ClienteCidade"])) == 0
@@ -0,0 +1,26 @@
+import numpy as np
+
+from blocos import agregar_em_blocos, aplicar_filtros
+from consultas import QUESTOES, MotorConsultas
+from dados import carregar_vendas
+
+
+def test_agregar_em_blocos_igual_a_memoria():
+    vendas = carregar_vendas()
+    vendas["Ano"] = vendas["Data"].dt.year
+    for consulta in QUESTOES:
+        esperado = aplicar_filtros(vendas, consulta.filtros).groupby(list(consulta.por), observed=True)[
+            consulta.medida].sum()
+        obtido = agregar_em_blocos(consulta.por, consulta.medida, consulta.filtros, memoria_max=200_000)
+        assert [str(i) for i in obtido.index] == [str(i) for i in esperado.index], consulta.nome
+        assert np.array_equal(obtido.to_numpy(), esperado.to_numpy()), consulta.nome
+
+
+def test_motor_em_blocos_igual_ao_motor():
+    motor = MotorConsultas()
+    esperado = motor.executar(carregar_vendas())
+    obtido = motor.executar_em_blocos(memoria_max=200_000)
+    assert motor.estatisticas["blocos"] > 1
+    for nome, serie in esperado.items():
+        assert [str(i) for i in obtido[nome].index] == [str(i) for i in serie.index], nome
+        assert np.array_equal(obtido[nome].to_numpy(), serie.to_numpy()), nome
@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+
+from consultas import QUESTOES, MotorConsultas, responder
+from dados import carregar_vendas
+from dimensoes import Dimensoes
+
+
+@pytest.fixture(scope="module")
+def vendas():
+    vendas = carregar_vendas()
+    return vendas.assign(Ano=vendas["Data"].dt.year)
+
+
+# A questão escrita direto em pandas: filtro, groupby, nomes das dimensões, ordem e limite
+def _com_pandas(vendas, consulta):
+    mascara = pd.Series(True, index=vendas.index)
+    for coluna, valor in consulta.filtros.items():
+        if isinstance(valor, (list, tuple, set, frozenset, range)):
+            mascara &= vendas[coluna].isin(list(valor))
+        else:
+            mascara &= vendas[coluna] == valor
+    serie = Dimensoes().resolver(vendas[mascara].groupby(list(consulta.por), observed=True)[consulta.medida].sum())
+    if consulta.top_n():
+        return serie.nlargest(consulta.limite)
+    if consulta.ordem == "desc":
+        serie = serie.sort_values(ascending=False)
+    elif consulta.ordem == "indice":
+        serie = serie.sort_index()
+    return serie if consulta.limite is None else serie.head(consulta.limite)
+
+
+def test_motor_igual_ao_pandas(vendas):
+    motor = MotorConsultas()
+    resultados = motor.executar(vendas)
+    assert motor.estatisticas["passadas"] == 1
+    for consulta in QUESTOES:
+        pd.testing.assert_series_equal(resultados[consulta.nome], _com_pandas(vendas, consulta), check_exact=True,
+                                       obj=consulta.nome)
+
+
+def test_responder_com_tabela_carregada(vendas):
+    esperado = _com_pandas(vendas, next(c for c in QUESTOES if c.nome == "q3"))
+    pd.testing.assert_series_equal(responder("q3", vendas=vendas), esperado, check_exact=True)
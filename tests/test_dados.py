@@ -0,0 +1,23 @@
+import os
+import shutil
+
+import numpy as np
+
+from dados import CAMINHO_VENDAS, _ler_meta, _pasta_cache, carregar_vendas
+
+
+# Reconstruir o cache troca os arquivos em vez de regravá-los: colunas já mapeadas em memória não mudam
+def test_reconstruir_cache_preserva_colunas_mapeadas(tmp_path):
+    fonte = str(tmp_path / "VendasGlobais.csv")
+    shutil.copy(CAMINHO_VENDAS, fonte)
+    vendas = carregar_vendas(fonte)
+    antes = vendas["Vendas"].to_numpy().copy()
+    pasta = _pasta_cache(fonte)
+    arquivo = next(os.path.join(pasta, info["arquivo"]) for info in _ler_meta(pasta)["colunas"]
+                   if info["nome"] == "Vendas")
+    inode = os.stat(arquivo).st_ino
+    os.remove(os.path.join(pasta, "meta.json"))
+    carregar_vendas(fonte)
+    assert os.stat(arquivo).st_ino != inode
+    np.testing.assert_array_equal(vendas["Vendas"].to_numpy(), antes)
+    assert not [nome for nome in os.listdir(pasta) if nome.endswith(".tmp")]
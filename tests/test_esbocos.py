@@ -0,0 +1,22 @@
+import numpy as np
+import pandas as pd
+
+from dimensoes import Dimensoes
+from esbocos import top_aproximado
+
+
+# Categoria nula (código -1) não vira grupo nem é rotulada como a última categoria
+def test_top_aproximado_ignora_categoria_nula():
+    chaves = pd.Series(pd.Categorical(["a", None, "b", None, "a"], categories=["a", "b"]), name="Cliente")
+    serie, info = top_aproximado(chaves, pd.Series([1.0, 100.0, 2.0, 100.0, 3.0], name="Vendas"), 5)
+    assert serie.to_dict() == {"a": 4.0, "b": 2.0}
+    assert list(info["limites"].index) == ["a", "b"]
+
+
+# nomear troca os IDs linha a linha: IDs de mesmo nome não são somados e IDs sem nome saem da máscara
+def test_nomear_linha_a_linha():
+    dimensoes = Dimensoes(["VendedorID"])
+    dimensoes.nomes["VendedorID"] = pd.Series(["Ana", "Ana"], index=[1, 2], name="VendedorNome")
+    indice, validos = dimensoes.nomear(pd.Index([2, 3, 1], name="VendedorID"))
+    assert list(indice[validos]) == ["Ana", "Ana"]
+    np.testing.assert_array_equal(validos, [True, False, True])
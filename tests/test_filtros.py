@@ -0,0 +1,44 @@
+from cubo import Cubo
+from dados import carregar_vendas
+from filtros import DIMENSOES_FILTRO, _selecao_inicial, agrupamentos_filtros, dados_filtros
+from geografia import AGRUPAMENTOS_GEOGRAFIA
+
+CARTOES = {
+    "clientes": dict(titulo="Clientes", medida="Vendas", por=("ClienteNome", "ClienteCidade"), anos=(2012, 2012)),
+    "anos": dict(titulo="Anos", medida="Vendas", por="Ano", paises=["Brazil"]),
+}
+
+
+def test_dados_filtros_eixo_com_varias_dimensoes():
+    cubo = Cubo(carregar_vendas(), agrupamentos=agrupamentos_filtros(CARTOES))
+    dados = dados_filtros(cubo, CARTOES)
+    cartao = dados["cartoes"]["clientes"]
+    esperado = cubo.consultar("Vendas", ["ClienteNome", "ClienteCidade"])
+    assert sorted(cartao["rotulos"]) == sorted(f"{nome} ({cidade})" for nome, cidade in esperado.index)
+    totais = dict.fromkeys(cartao["rotulos"], 0.0)
+    for r, v in zip(cartao["r"], cartao["v"]):
+        totais[cartao["rotulos"][r]] += v
+    for (nome, cidade), valor in esperado.items():
+        assert abs(totais[f"{nome} ({cidade})"] - valor) < 0.01
+    assert set(dados) >= {"paises", "categorias", "anos"}
+    assert agrupamentos_filtros(CARTOES)[1] == DIMENSOES_FILTRO + ("ClienteNome", "ClienteCidade")
+
+
+# Países de uma região saem dos agregados do cubo de cada versão, não da importação
+def test_selecao_inicial_por_regiao():
+    vendas = carregar_vendas()
+    cartao = dict(titulo="Europa", medida="Vendas", por="ClientePaís", regiao="Europa")
+    antes = _selecao_inicial(cartao, Cubo(vendas, agrupamentos=AGRUPAMENTOS_GEOGRAFIA))["paises"]
+    assert "France" in antes and "Brazil" not in antes
+    sem_franca = vendas[vendas["ClientePaís"] != "France"]
+    depois = _selecao_inicial(cartao, Cubo(sem_franca, agrupamentos=AGRUPAMENTOS_GEOGRAFIA))["paises"]
+    assert depois == [pais for pais in antes if pais != "France"]
+
+
+# Cubo sem linhas: domínios vazios e uma faixa de anos válida para o slider
+def test_dados_filtros_cubo_vazio():
+    vendas = carregar_vendas().iloc[:0]
+    dados = dados_filtros(Cubo(vendas, agrupamentos=agrupamentos_filtros(CARTOES)), CARTOES)
+    assert dados["paises"] == [] and dados["categorias"] == []
+    assert len(dados["anos"]) == 2 and dados["anos"][0] == dados["anos"][1]
+    assert dados["cartoes"]["anos"]["v"] == []
@@ -0,0 +1,19 @@
+import os
+
+from graficos import CacheGraficos, RenderizadorParalelo, chave_grafico
+
+
+# O nível em disco fica abaixo do limite, apagando primeiro as imagens lidas há mais tempo
+def test_cache_em_disco_limitado(tmp_path):
+    cache = CacheGraficos(max_itens=1, pasta=str(tmp_path), renderizador=RenderizadorParalelo(0),
+                          max_bytes_disco=1000)
+    chaves = [chave_grafico("g", {}, f"versao{i}") for i in range(12)]
+    for i, chave in enumerate(chaves):
+        cache.guardar(chave, bytes(100))
+        os.utime(cache._arquivo(chave), ns=(i * 10 ** 9, i * 10 ** 9))
+        if i == 5:
+            assert cache.obter(chaves[0]) is not None
+    tamanho = sum(os.path.getsize(tmp_path / nome) for nome in os.listdir(tmp_path))
+    assert tamanho <= 1000
+    assert os.path.exists(cache._arquivo(chaves[0]))
+    assert not os.path.exists(cache._arquivo(chaves[1]))
@@ -0,0 +1,78 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from cubo import Cubo
+from dados import CAMINHO_VENDAS, carregar_vendas
+from ingestao import REJEITAR, SUBSTITUIR, IngestorIncremental
+
+
+@pytest.fixture
+def fonte(tmp_path):
+    caminho = tmp_path / "VendasGlobais.csv"
+    shutil.copy(CAMINHO_VENDAS, caminho)
+    os.makedirs(tmp_path / "deltas")
+    return str(caminho)
+
+
+def _ingestor(fonte, duplicados):
+    vendas = carregar_vendas(fonte)
+    pasta = os.path.join(os.path.dirname(fonte), "deltas")
+    return IngestorIncremental(Cubo(vendas), vendas, fonte, pasta_deltas=pasta, duplicados=duplicados)
+
+
+# Delta com pedidos já ingeridos, com as vendas alteradas
+def _gravar_delta(fonte, nome, linhas=40):
+    delta = pd.read_csv(fonte, dtype=str, nrows=linhas)
+    delta["Vendas"] = (delta["Vendas"].astype(float) * 1.1).round(3).astype(str)
+    delta.to_csv(os.path.join(os.path.dirname(fonte), "deltas", nome), index=False)
+
+
+def test_substituir_igual_a_cubo_novo(fonte):
+    ingestor = _ingestor(fonte, SUBSTITUIR)
+    _gravar_delta(fonte, "a.csv")
+    assert ingestor.atualizar(forcar=True)["substituidas"] >= 40
+    novo = Cubo(ingestor.tabela())
+    for dims, tabela in ingestor.cubo.cuboides.items():
+        pd.testing.assert_frame_equal(tabela.sort_index(), novo.cuboides[dims].sort_index(), check_exact=True,
+                                      obj=str(dims))
+
+
+def test_lote_todo_rejeitado_nao_muda_versao(fonte):
+    ingestor = _ingestor(fonte, REJEITAR)
+    versao, partes = ingestor.versao, len(ingestor.partes)
+    _gravar_delta(fonte, "a.csv")
+    assert ingestor.atualizar(forcar=True)["rejeitadas"] == 40
+    assert (ingestor.versao, len(ingestor.partes)) == (versao, partes)
+
+
+# Linhas anexadas ao CSV entre a carga e a criação do ingestor entram na primeira atualização
+def test_linhas_anexadas_antes_do_ingestor(fonte):
+    vendas = carregar_vendas(fonte)
+    with open(fonte, "rb") as f:
+        linhas = f.read().splitlines(keepends=True)
+    with open(fonte, "ab") as f:
+        f.writelines(linhas[1:31])
+    pasta = os.path.join(os.path.dirname(fonte), "deltas")
+    ingestor = IngestorIncremental(Cubo(vendas), vendas, fonte, pasta_deltas=pasta, duplicados=SUBSTITUIR)
+    assert ingestor.atualizar(forcar=True)["substituidas"] == 30
+
+
+# Linhas de um mesmo pedido em lotes diferentes não são repetidas; linhas sem PedidoID são contadas
+@pytest.mark.parametrize("duplicados", [REJEITAR, SUBSTITUIR])
+def test_pedido_em_dois_lotes(fonte, duplicados):
+    with open(fonte, "rb") as f:
+        cabecalho, *linhas = f.read().splitlines(keepends=True)
+    pedidos = [linha.split(b",", 1)[0] for linha in linhas]
+    # As duas últimas linhas de um pedido de várias linhas vão para um delta
+    segunda = next(i for i in range(2, len(linhas)) if pedidos[i] == pedidos[i - 2] != b"")
+    with open(fonte, "wb") as f:
+        f.writelines([cabecalho] + linhas[:segunda - 1] + linhas[segunda + 1:])
+    with open(os.path.join(os.path.dirname(fonte), "deltas", "a.csv"), "wb") as f:
+        f.writelines([cabecalho, linhas[segunda - 1], linhas[segunda], b"," + linhas[segunda].split(b",", 1)[1]])
+    ingestor = _ingestor(fonte, duplicados)
+    resumo = ingestor.atualizar(forcar=True)
+    assert (resumo["linhas"], resumo["rejeitadas"], resumo["substituidas"], resumo["sem_chave"]) == (2, 0, 0, 1)
+    assert len(ingestor.tabela()) == len(carregar_vendas(CAMINHO_VENDAS))
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dados import carregar_vendas
+from nucleos import Grupos
+
+MEDIDAS = ["Vendas", "Frete", "Desconto", "Margem Bruta"]
+
+
+@pytest.fixture(scope="module")
+def vendas():
+    vendas = carregar_vendas()
+    return vendas.assign(Ano=vendas["Data"].dt.year)
+
+
+@pytest.mark.parametrize("chaves", [
+    ["ClienteNome"],
+    ["ClientePaís"],
+    ["VendedorID"],
+    ["ClienteCidade"],
+    ["ClienteNome", "ClienteCidade"],
+    ["CategoriaNome", "Ano", "ClienteNome"],
+])
+def test_tabela_igual_ao_groupby(vendas, chaves):
+    esperado = vendas.groupby(chaves, observed=True)[MEDIDAS].sum()
+    obtido = Grupos(vendas[chaves]).tabela({m: vendas[m] for m in MEDIDAS})
+    pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+
+
+def test_tabela_com_mascara(vendas):
+    mascara = (vendas["CategoriaNome"] == "Men´s Footwear").to_numpy()
+    esperado = vendas[mascara].groupby("ClienteNome", observed=True)[MEDIDAS].sum()
+    obtido = Grupos(vendas[["ClienteNome"]]).tabela({m: vendas[m] for m in MEDIDAS}, mascara)
+    pd.testing.assert_frame_equal(obtido, esperado, check_exact=True)
+
+
+def test_top_igual_ao_nlargest(vendas):
+    esperado = vendas.groupby("ClienteNome", observed=True)["Vendas"].sum().nlargest(10)
+    obtido = Grupos(vendas[["ClienteNome"]]).top(vendas["Vendas"], 10)
+    assert obtido.index.equals(esperado.index)
+    assert np.array_equal(obtido.to_numpy(), esperado.to_numpy())